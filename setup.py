@@ -6,7 +6,15 @@ setup(
     packages=find_packages(),
     install_requires=[
         # List your package dependencies here
+        'pymongo>=4.10,<5',  # 4.10 brings the asyncio client used by the async search backend
+        'numpy>=2.0',
+        'aiohttp>=3.10.5',
+        'python-dotenv>=1.0.1',
     ],
+    extras_require={
+        # Keyword extraction for hybrid search and query pre-filters.
+        'nlp': ['nltk'],
+    },
     description='A set of custom packages used accross this code base',
     author='Cephas Soga',
     author_email='sogacephas@gmail.com',
@@ -0,0 +1,80 @@
+import asyncio
+
+from vector_search.builder.batching import EmbeddingCoalescer
+
+
+class FakeSend:
+    def __init__(self, delay=0.0, error=None):
+        self.delay = delay
+        self.error = error
+        self.batches = []
+
+    async def __call__(self, inputs):
+        self.batches.append(list(inputs))
+        await asyncio.sleep(self.delay)
+        if self.error is not None:
+            raise self.error
+        return [[float(len(text))] for text in inputs]
+
+
+def test_concurrent_queries_are_sent_together():
+    send = FakeSend()
+
+    async def main():
+        coalescer = EmbeddingCoalescer(send, max_batch_size=10, max_delay=0.01)
+        return await asyncio.gather(*(coalescer.submit(query) for query in ["a", "bb", "a", "ccc"]))
+
+    assert asyncio.run(main()) == [[1.0], [2.0], [1.0], [3.0]]
+    # Duplicates are only sent once.
+    assert send.batches == [["a", "bb", "ccc"]]
+
+
+def test_a_full_batch_is_sent_without_waiting():
+    send = FakeSend()
+
+    async def main():
+        coalescer = EmbeddingCoalescer(send, max_batch_size=2, max_delay=10)
+        return await asyncio.wait_for(asyncio.gather(coalescer.submit("a"), coalescer.submit("bb")), 1)
+
+    assert asyncio.run(main()) == [[1.0], [2.0]]
+    assert send.batches == [["a", "bb"]]
+
+
+def test_errors_reach_every_caller():
+    send = FakeSend(error=RuntimeError("boom"))
+
+    async def main():
+        coalescer = EmbeddingCoalescer(send, max_batch_size=10, max_delay=0.001)
+        return await asyncio.gather(coalescer.submit("a"), coalescer.submit("b"), return_exceptions=True)
+
+    assert [type(result) for result in asyncio.run(main())] == [RuntimeError, RuntimeError]
+
+
+def test_cancelled_batch_cancels_its_callers():
+    send = FakeSend(delay=10)
+
+    async def main():
+        coalescer = EmbeddingCoalescer(send, max_batch_size=2, max_delay=10)
+        callers = [asyncio.create_task(coalescer.submit(query)) for query in ["a", "b"]]
+        while not send.batches:
+            await asyncio.sleep(0)
+        for task in coalescer._in_flight:
+            task.cancel()
+        return await asyncio.wait_for(asyncio.gather(*callers, return_exceptions=True), 1)
+
+    results = asyncio.run(main())
+    assert all(isinstance(result, asyncio.CancelledError) for result in results)
+
+
+def test_close_sends_the_pending_queries():
+    send = FakeSend()
+
+    async def main():
+        coalescer = EmbeddingCoalescer(send, max_batch_size=10, max_delay=10)
+        caller = asyncio.create_task(coalescer.submit("a"))
+        await asyncio.sleep(0)
+        await coalescer.close()
+        return await caller
+
+    assert asyncio.run(main()) == [1.0]
+    assert send.batches == [["a"]]
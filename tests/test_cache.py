@@ -0,0 +1,117 @@
+import asyncio
+
+import pytest
+
+from vector_search.builder import cache
+from vector_search.builder.cache import DiskEmbeddingCache, EmbeddingCache, MemoryEmbeddingCache, make_key
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 1000.0
+
+    def monotonic(self):
+        return self.now
+
+    def time(self):
+        return self.now
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    clock = FakeClock()
+    monkeypatch.setattr(cache, "time", clock)
+    return clock
+
+
+@pytest.fixture
+def disk(tmp_path):
+    disk = DiskEmbeddingCache(str(tmp_path / "cache" / "embeddings.sqlite"), max_size=2, ttl=60, touch_batch=1)
+    yield disk
+    disk.close()
+
+
+def test_queries_are_normalized():
+    assert make_key("m", "  What is  AAPL?? ") == make_key("m", "what is aapl")
+    assert make_key("m", "aapl") != make_key("other", "aapl")
+
+
+def test_memory_entries_expire(clock):
+    memory = MemoryEmbeddingCache(ttl=10)
+    memory.set("a", [1.0])
+    clock.now += 10
+    assert memory.get("a") == [1.0]
+    clock.now += 1
+    assert memory.get("a") is None
+    assert len(memory) == 0
+    assert (memory.stats.hits, memory.stats.misses, memory.stats.evictions) == (1, 1, 1)
+
+
+def test_memory_evicts_the_least_recently_used(clock):
+    memory = MemoryEmbeddingCache(max_size=2, ttl=None)
+    memory.set("a", [1.0])
+    memory.set("b", [2.0])
+    memory.get("a")
+    memory.set("c", [3.0])
+    assert memory.get("b") is None
+    assert memory.get("a") == [1.0] and memory.get("c") == [3.0]
+    assert memory.stats.evictions == 1
+
+
+def test_disk_entries_expire(clock, disk):
+    disk.set("a", [0.1, 0.2])
+    clock.now += 60
+    assert disk.get("a") == [0.1, 0.2]
+    clock.now += 1
+    assert disk.get("a") is None
+    # Replaced by the next insert rather than deleted on read.
+    assert len(disk) == 1
+
+
+def test_disk_evicts_the_least_recently_accessed(clock, disk):
+    disk.set("a", [1.0])
+    clock.now += 1
+    disk.set("b", [2.0])
+    clock.now += 1
+    assert disk.get("a") == [1.0]
+    clock.now += 1
+    disk.set("c", [3.0])
+    assert disk.get("b") is None
+    assert disk.get("a") == [1.0] and disk.get("c") == [3.0]
+    assert len(disk) == 2 and disk.stats.evictions == 1
+
+
+def test_disk_entries_survive_reopening(tmp_path):
+    path = str(tmp_path / "embeddings.sqlite")
+    disk = DiskEmbeddingCache(path)
+    disk.set("a", [0.1, 0.2, 0.3])
+    disk.close()
+    reopened = DiskEmbeddingCache(path)
+    try:
+        assert len(reopened) == 1
+        # Packed doubles: the embedding comes back exactly.
+        assert reopened.get("a") == [0.1, 0.2, 0.3]
+    finally:
+        reopened.close()
+
+
+def test_disk_hits_are_promoted_to_memory(clock, disk):
+    embeddings = EmbeddingCache(MemoryEmbeddingCache(), disk)
+    disk.set(make_key("m", "aapl"), [1.0])
+    assert embeddings.get("m", "AAPL") == [1.0]
+    assert embeddings.memory.get(make_key("m", "aapl")) == [1.0]
+    assert embeddings.get("m", "msft") is None
+    assert (embeddings.stats.hits, embeddings.stats.misses) == (1, 1)
+
+
+def test_async_lookups_go_through_both_tiers(clock, disk):
+    embeddings = EmbeddingCache(MemoryEmbeddingCache(), disk)
+
+    async def main():
+        await embeddings.aset_many("m", [("aapl", [1.0]), ("msft", [2.0])])
+        embeddings.memory.clear()
+        embeddings.memory.set(make_key("m", "tsla"), [3.0])
+        return await embeddings.aget_many("m", ["msft", "tsla", "nvda"])
+
+    assert asyncio.run(main()) == [[2.0], [3.0], None]
+    assert (embeddings.stats.hits, embeddings.stats.misses) == (2, 1)
@@ -0,0 +1,87 @@
+import bson
+import numpy as np
+import pytest
+from bson.binary import Binary, BinaryVectorDtype
+from bson.int64 import Int64
+from bson.raw_bson import RawBSONDocument
+
+from vector_search.builder.decode import RAW_CODEC_OPTIONS, DecodedBatch, decode_batch
+
+
+def raw(document):
+    return RawBSONDocument(bson.encode(document), RAW_CODEC_OPTIONS)
+
+
+def vector(dim, seed=0):
+    return np.random.default_rng(seed).normal(size=dim).tolist()
+
+
+@pytest.mark.parametrize("dim", [1, 10, 11, 105])
+def test_array_of_doubles(dim):
+    values = vector(dim)
+    batch = decode_batch([raw({"_id": 1, "emb": values})], dim, ["emb"])
+    np.testing.assert_array_equal(batch.embeddings[0], np.asarray(values, dtype=np.float32))
+    assert "emb" not in batch.documents[0]
+    assert batch.documents[0]["_id"] == 1
+
+
+def test_embedded_documents_and_arrays_are_kept():
+    values = vector(12)
+    document = {
+        "_id": "a",
+        "meta": {"symbol": "AAPL", "tags": ["x", "y"], "nested": {"emb": [1.0, 2.0]}},
+        "scores": [1, 2.5, "three"],
+        "emb": values,
+        "content": "text",
+    }
+    batch = decode_batch([raw(document)], 12, ["emb"])
+    np.testing.assert_array_equal(batch.embeddings[0], np.asarray(values, dtype=np.float32))
+    # The nested "emb" is not an embedding field: only the top-level one is dropped.
+    assert bson.decode(batch.documents[0].raw) == {key: value for key, value in document.items() if key != "emb"}
+
+
+def test_missing_embedding_gives_a_zero_row():
+    document = raw({"_id": 1, "content": "text"})
+    batch = decode_batch([document], 4, ["emb"])
+    np.testing.assert_array_equal(batch.embeddings[0], np.zeros(4, dtype=np.float32))
+    assert batch.documents[0] is document
+
+
+def test_short_embedding_gives_a_zero_row():
+    batch = decode_batch([raw({"_id": 1, "emb": [1.0, 2.0, 3.0]})], 4, ["emb"])
+    np.testing.assert_array_equal(batch.embeddings[0], np.zeros(4, dtype=np.float32))
+    assert "emb" not in batch.documents[0]
+
+
+def test_first_present_field_wins_and_all_are_dropped():
+    batch = decode_batch([
+        raw({"_id": 1, "name_emb": [1.0, 1.0], "price_emb": [2.0, 2.0]}),
+        raw({"_id": 2, "price_emb": [3.0, 3.0]}),
+    ], 2, ["name_emb", "price_emb"])
+    np.testing.assert_array_equal(batch.embeddings, [[1.0, 1.0], [3.0, 3.0]])
+    assert [set(document) for document in batch.documents] == [{"_id"}, {"_id"}]
+
+
+@pytest.mark.parametrize("values", [
+    [1, 2.0, 3, 4.5],  # int32 elements: the array is shorter than one of doubles
+    [Int64(1), 2.0, Int64(3), 4.5],  # int64 elements: as long as doubles, only their type differs
+    [Int64(i) for i in range(12)],
+])
+def test_non_double_elements_are_decoded(values):
+    batch = decode_batch([raw({"_id": 1, "emb": values})], len(values), ["emb"])
+    np.testing.assert_array_equal(batch.embeddings[0], np.asarray([float(value) for value in values], dtype=np.float32))
+
+
+def test_binary_vector():
+    values = [0.5, -1.0, 2.0]
+    document = raw({"_id": 1, "emb": Binary.from_vector(values, BinaryVectorDtype.FLOAT32)})
+    batch = decode_batch([document], 3, ["emb"])
+    np.testing.assert_array_equal(batch.embeddings[0], np.asarray(values, dtype=np.float32))
+
+
+def test_concat_keeps_order():
+    first = decode_batch([raw({"_id": 1, "emb": [1.0, 0.0]})], 2, ["emb"])
+    second = decode_batch([raw({"_id": 2, "emb": [0.0, 1.0]}), raw({"_id": 3})], 2, ["emb"])
+    batch = DecodedBatch.concat([first, DecodedBatch.empty(2), second])
+    assert batch.ids == [1, 2, 3]
+    np.testing.assert_array_equal(batch.embeddings, [[1.0, 0.0], [0.0, 1.0], [0.0, 0.0]])
@@ -0,0 +1,86 @@
+import itertools
+
+import numpy as np
+import pytest
+
+from vector_search.filters.constraints import Filter, KeywordIndex, Parser
+
+
+class WordParser(Parser):
+    """Keywords are the lower-cased words: the index is tested without the NLTK data."""
+    def __init__(self):
+        self.batches = 0
+
+    def keywords(self, text):
+        return text.lower().split()
+
+    def keywords_batch(self, texts):
+        self.batches += 1
+        return [self.keywords(text) for text in texts]
+
+
+CONTEXTS = [
+    "apple earnings beat",
+    "apple stock falls",
+    "tesla earnings miss",
+    "bitcoin rallies",
+    "",
+    "apple apple earnings",
+]
+
+
+@pytest.fixture
+def parser():
+    return WordParser()
+
+
+@pytest.mark.parametrize("target", ["apple earnings", "tesla", "bitcoin rallies again", "unknown", ""])
+def test_scores_match_parser_similarity(parser, target):
+    index = KeywordIndex(parser)
+    index.add(CONTEXTS)
+    expected = [parser.similarity(parser.keywords(target), parser.keywords(context)) for context in CONTEXTS]
+    np.testing.assert_allclose(index.similarities(parser.keywords(target)), expected)
+
+
+def test_search_keeps_index_order(parser):
+    index = KeywordIndex(parser)
+    index.add(CONTEXTS)
+    assert index.search("earnings apple", 1.0) == ["apple earnings beat", "apple apple earnings"]
+    assert index.search("apple", 0.5) == ["apple earnings beat", "apple stock falls", "apple apple earnings"]
+
+
+def test_contexts_are_indexed_incrementally(parser):
+    index = KeywordIndex(parser)
+    assert index.add(CONTEXTS[:2]) == [0, 1]
+    assert index.add(CONTEXTS[2:]) == [2, 3, 4, 5]
+    assert len(index) == len(CONTEXTS)
+    assert index.postings["earnings"] == [0, 2, 5]
+
+
+@pytest.mark.parametrize("threshold", [0.3, 0.5, 1.0])
+def test_indexed_filter_matches_the_scan(parser, threshold):
+    targets = ["apple earnings", "tesla stock", "bitcoin"]
+    scanned = Filter(list(CONTEXTS), threshold, parser)
+    indexed = Filter(list(CONTEXTS), threshold, parser, indexed=True)
+    for target in targets:
+        assert indexed(target) == scanned(target)
+    # The index is built once and reused across targets.
+    assert parser.batches == len(targets) + 1
+
+
+def test_indexed_filter_indexes_added_contexts(parser):
+    indexed = Filter(list(CONTEXTS), 1.0, parser, indexed=True)
+    indexed("apple")
+    indexed.add(["apple pie"])
+    assert indexed("apple")[-1] == "apple pie"
+    assert indexed.ctx[-1] == "apple pie"
+
+
+def test_similarity_of_keyword_sets(parser):
+    assert parser.similarity() == 0.0
+    assert parser.similarity(["a"]) == 1.0
+    assert parser.similarity(["a", "b"], []) == 0.0
+    assert parser.similarity(["a", "b"], ["b", "c", "d"]) == 0.5
+    for size in range(1, 4):
+        for kwds in itertools.combinations(["a", "b", "c"], size):
+            assert parser.similarity(list(kwds), list(kwds)) == 1.0
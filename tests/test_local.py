@@ -0,0 +1,128 @@
+import asyncio
+
+import numpy as np
+import pytest
+
+from vector_search.builder.decode import DecodedBatch
+from vector_search.builder.local import LocalVectorSearchManager, write_local_index
+
+DIM = 16
+SYMBOLS = ("AAPL", "MSFT", "TSLA")
+
+
+def clustered_vectors(n, clusters=8, seed=0):
+    rng = np.random.default_rng(seed)
+    centers = rng.standard_normal((clusters, DIM))
+    vectors = centers[rng.integers(clusters, size=n)] + 0.3 * rng.standard_normal((n, DIM))
+    return (vectors / np.linalg.norm(vectors, axis=1, keepdims=True)).astype(np.float32)
+
+
+def documents(vectors):
+    for i, vector in enumerate(vectors):
+        yield {"_id": i, "symbol": SYMBOLS[i % len(SYMBOLS)], "content": f"item {i}", "emb": vector.tolist()}
+
+
+@pytest.fixture
+def vectors():
+    return clustered_vectors(400)
+
+
+@pytest.fixture
+def directory(tmp_path, vectors):
+    write_local_index(str(tmp_path), "db", "items", "emb", documents(vectors))
+    return str(tmp_path)
+
+
+def manager(directory, **kwargs):
+    return LocalVectorSearchManager("db", "items", "emb", "index", local_path=directory, **kwargs)
+
+
+def exact_top(vectors, query, k, rows=None):
+    rows = np.arange(len(vectors)) if rows is None else rows
+    cosine = vectors[rows] @ (query / np.linalg.norm(query))
+    return rows[np.argsort(-cosine, kind="stable")[:k]].tolist()
+
+
+def test_exact_search_returns_the_nearest_first(directory, vectors):
+    query = vectors[7] + 0.1
+    hits = manager(directory, limit=5).search(query)
+    assert [row for row, _ in hits] == exact_top(vectors, query, 5)
+    # Atlas' cosine `vectorSearchScore`.
+    cosine = vectors[hits[0][0]] @ query / np.linalg.norm(query)
+    assert hits[0][1] == pytest.approx((1 + cosine) / 2, rel=1e-5)
+    assert [score for _, score in hits] == sorted((score for _, score in hits), reverse=True)
+
+
+def test_limit_can_be_overridden(directory, vectors):
+    assert len(manager(directory, limit=5).search(vectors[0], limit=12)) == 12
+
+
+def test_prefilter_restricts_the_search(directory, vectors):
+    query = vectors[0]
+    hits = manager(directory, limit=5).search(query, {"symbol": {"$eq": "MSFT"}})
+    msft = np.arange(1, len(vectors), len(SYMBOLS))
+    assert [row for row, _ in hits] == exact_top(vectors, query, 5, msft)
+
+
+def test_ivf_with_every_candidate_is_exact(directory, vectors):
+    ivf = manager(directory, limit=10, local_mode="ivf")
+    query = vectors[3]
+    assert [row for row, _ in ivf.search(query, num_candidates=len(vectors))] == exact_top(vectors, query, 10)
+
+
+def test_ivf_recall(directory, vectors):
+    ivf = manager(directory, limit=10, num_candidates=100, local_mode="ivf")
+    queries = clustered_vectors(20, seed=1)
+    recall = np.mean([
+        len({row for row, _ in ivf.search(query)} & set(exact_top(vectors, query, 10))) / 10 for query in queries
+    ])
+    assert recall >= 0.9
+
+
+def test_ivf_prefilter_only_returns_matching_documents(directory, vectors):
+    ivf = manager(directory, limit=10, num_candidates=30, local_mode="ivf")
+    hits = ivf.search(vectors[0], {"symbol": {"$in": ["TSLA"]}})
+    assert len(hits) == 10
+    assert all(ivf.documents[row]["symbol"] == "TSLA" for row, _ in hits)
+
+
+def test_ivf_index_is_saved_and_reloaded(directory, vectors):
+    first = manager(directory, local_mode="ivf")
+    first.prepare()
+    assert first.files["ivf"].exists()
+    second = manager(directory, local_mode="ivf")
+    second.prepare()
+    np.testing.assert_array_equal(second.centroids, first.centroids)
+    np.testing.assert_array_equal(second.list_order, first.list_order)
+
+
+def test_rewriting_the_index_drops_the_stale_ivf(directory, vectors):
+    manager(directory, local_mode="ivf").prepare()
+    written = write_local_index(directory, "db", "items", "emb", list(documents(vectors[:50])) + [{"_id": "no vector"}])
+    assert written == 50
+    reloaded = manager(directory, local_mode="ivf")
+    assert not reloaded.files["ivf"].exists()
+    assert len(reloaded.search(vectors[0])) == len(reloaded.vectors) == 50
+
+
+def test_corrupt_index_is_rejected(directory):
+    with open(manager(directory).files["documents"], "a", encoding="utf-8") as f:
+        f.write('{"_id": "extra"}\n')
+    with pytest.raises(ValueError):
+        manager(directory)
+
+
+def test_requests_project_like_atlas(directory, vectors):
+    local = manager(directory, limit=3)
+
+    async def main():
+        return (
+            await local.request(vectors[0], content=1, score={"$meta": "vectorSearchScore"}),
+            await local.request_decoded(vectors[0], ["emb"], content=1),
+        )
+
+    results, decoded = asyncio.run(main())
+    assert results[0] == {"_id": 0, "content": "item 0", "score": pytest.approx(1.0)}
+    assert isinstance(decoded, DecodedBatch)
+    assert decoded.ids == [result["_id"] for result in results]
+    np.testing.assert_array_equal(decoded.embeddings[0], vectors[0])
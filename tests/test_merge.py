@@ -0,0 +1,111 @@
+import itertools
+
+import numpy as np
+import pytest
+
+from vector_search.builder.fusion import FusionMethod, fuse
+from vector_search.builder.merge import ScoreNormalization, TopKMerger, dedup_key, normalize_scores
+
+
+def docs(*ids, **fields):
+    return [{"_id": i, **fields} for i in ids]
+
+
+def merged(merger):
+    return [(item["_id"], score, source) for item, score, source in merger.results()]
+
+
+def test_minmax_and_zscore():
+    scores = np.array([1.0, 3.0, 2.0])
+    np.testing.assert_allclose(normalize_scores(scores, ScoreNormalization.MINMAX), [0.0, 1.0, 0.5])
+    np.testing.assert_allclose(normalize_scores(scores, ScoreNormalization.ZSCORE), (scores - 2.0) / scores.std())
+    np.testing.assert_array_equal(normalize_scores([5.0, 5.0], ScoreNormalization.MINMAX), [1.0, 1.0])
+    np.testing.assert_array_equal(normalize_scores([5.0, 5.0], ScoreNormalization.ZSCORE), [0.0, 0.0])
+    assert len(normalize_scores([], ScoreNormalization.MINMAX)) == 0
+
+
+def test_documents_without_id_are_identified_by_content():
+    assert dedup_key({"_id": "a"}) == ("id", "a")
+    assert dedup_key({"_id": ["unhashable"]}) == ("id", "['unhashable']")
+    assert dedup_key({"content": "x"}) == dedup_key({"content": "x", "other": 1})
+    assert dedup_key({"content": "x"}) != dedup_key({"content": "y"})
+
+
+def test_keeps_the_k_best_above_the_threshold():
+    merger = TopKMerger(3)
+    merger.add(0, docs("a", "b", "c"), np.array([0.9, 0.2, 0.5]), threshold=0.3)
+    merger.add(1, docs("d", "e"), np.array([0.6, 0.95]), threshold=0.3)
+    assert merged(merger) == [("e", 0.95, 1), ("a", 0.9, 0), ("d", 0.6, 1)]
+    assert merger.offered == {0: 2, 1: 2}
+
+
+def test_duplicates_keep_their_best_occurrence():
+    merger = TopKMerger(None)
+    merger.add(0, docs("a", "b"), np.array([0.5, 0.4]))
+    merger.add(1, docs("a", "c"), np.array([0.8, 0.1]))
+    assert merged(merger) == [("a", 0.8, 1), ("b", 0.4, 0), ("c", 0.1, 1)]
+
+    merger = TopKMerger(None, dedup=False)
+    merger.add(0, docs("a"), np.array([0.5]))
+    merger.add(1, docs("a"), np.array([0.8]))
+    assert len(merger) == 2
+
+
+def test_normalization_lets_targets_compete():
+    merger = TopKMerger(2, normalization=ScoreNormalization.MINMAX)
+    merger.add(0, docs("a", "b"), np.array([0.90, 0.80]))
+    merger.add(1, docs("c", "d"), np.array([12.0, 3.0]))
+    # Each target's best normalizes to 1.0; ties go to the first target. Raw scores are returned.
+    assert merged(merger) == [("a", 0.9, 0), ("c", 12.0, 1)]
+
+
+def test_ranking_does_not_depend_on_the_order_targets_are_added():
+    rng = np.random.default_rng(0)
+    targets = [(source, docs(*rng.choice(30, 10, replace=False).tolist()), rng.random(10).round(1)) for source in range(3)]
+    rankings = set()
+    for order in itertools.permutations(targets):
+        merger = TopKMerger(8)
+        for source, items, scores in order:
+            merger.add(source, items, scores)
+        rankings.add(tuple(merged(merger)))
+    assert len(rankings) == 1
+
+
+def test_replaced_entries_do_not_count_towards_k():
+    merger = TopKMerger(2)
+    for source in range(5):
+        merger.add(source, docs("a"), np.array([0.1 * (source + 1)]))
+    merger.add(5, docs("b", "c"), np.array([0.3, 0.2]))
+    assert merged(merger) == [("a", 0.5, 4), ("b", 0.3, 5)]
+
+
+def test_rrf():
+    vector = docs("a", "b", "c")
+    text = docs("c", "d")
+    fused = fuse([vector, text], FusionMethod.RECIPROCAL_RANK, k=60)
+    assert [doc["_id"] for doc in fused] == ["c", "a", "b", "d"]
+    assert fused[0]["score"] == pytest.approx(1 / 63 + 1 / 61)
+    assert fused[1]["score"] == pytest.approx(1 / 61)
+
+
+def test_rrf_weights_and_top_k():
+    fused = fuse([docs("a", "b"), docs("b", "a")], weights=[1.0, 3.0], top_k=1, k=1)
+    assert [doc["_id"] for doc in fused] == ["b"]
+    assert fused[0]["score"] == pytest.approx(1 / 3 + 3 / 2)
+
+
+def test_weighted_fusion_normalizes_each_list():
+    vector = [{"_id": "a", "score": 0.9}, {"_id": "b", "score": 0.7}, {"_id": "c", "score": 0.5}]
+    text = [{"_id": "c", "score": 20.0}, {"_id": "d", "score": 10.0}]
+    fused = {doc["_id"]: doc["score"] for doc in fuse([vector, text], FusionMethod.WEIGHTED)}
+    assert fused == pytest.approx({"a": 1.0, "b": 0.5, "c": 1.0, "d": 0.0})
+
+    # A list whose documents share one score contributes fully to each.
+    flat = fuse([[{"_id": "a", "score": 2.0}, {"_id": "b", "score": 2.0}]], FusionMethod.WEIGHTED)
+    assert [doc["score"] for doc in flat] == [1.0, 1.0]
+
+
+def test_fuse_keeps_the_first_occurrence_and_best_rank():
+    fused = fuse([[{"_id": "a", "v": 1}, {"_id": "a", "v": 2}], []], k=0)
+    assert fused == [{"_id": "a", "v": 1, "score": 1.0}]
+    assert fuse([[], []]) == []
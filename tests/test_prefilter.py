@@ -0,0 +1,107 @@
+from datetime import datetime, timedelta, timezone
+
+import pytest
+
+from vector_search.filters.prefilter import FilterSpec, extract_dates, extract_filter_spec, match_filter, target_prefilters
+
+NOW = datetime(2024, 5, 15, 13, 30, tzinfo=timezone.utc)
+TODAY = datetime(2024, 5, 15, tzinfo=timezone.utc)
+
+
+def test_spec_fields_are_normalized():
+    spec = FilterSpec(symbols=("msft", "AAPL", "aapl"), asset_classes=("Crypto",))
+    assert spec.symbols == ("AAPL", "MSFT")
+    assert spec.asset_classes == ("crypto",)
+    assert spec == FilterSpec(symbols=("AAPL", "MSFT"), asset_classes=("crypto",))
+    assert not FilterSpec() and spec
+
+
+def test_updated_replaces_the_fields_set():
+    extracted = FilterSpec(symbols=("AAPL",), date_from=TODAY)
+    assert extracted.updated(FilterSpec(symbols=("MSFT",))) == FilterSpec(symbols=("MSFT",), date_from=TODAY)
+    assert extracted.updated(None) is extracted
+
+
+def test_compile_uses_the_target_fields():
+    spec = FilterSpec(symbols=("AAPL",), asset_classes=("equity",), date_from=TODAY)
+    assert spec.compile({"symbols": "symbol"}) == {"symbol": {"$in": ["AAPL"]}}
+    assert spec.compile({"symbols": "symbol", "date": "published_at"}) == {
+        "$and": [{"symbol": {"$in": ["AAPL"]}}, {"published_at": {"$gte": TODAY}}]
+    }
+    assert spec.compile({"other": "field"}) is None
+
+
+def test_target_prefilters():
+    targets = [{"collection_name": name} for name in ("articles", "tickers", "unknown")]
+    prefilters = target_prefilters(targets, {"tickers": FilterSpec(asset_classes=("equity",))}, FilterSpec(symbols=("AAPL",)))
+    assert prefilters == {
+        "articles": {"symbols": {"$in": ["AAPL"]}},
+        "tickers": {"$and": [{"symbol": {"$in": ["AAPL"]}}, {"asset_class": {"$in": ["equity"]}}]},
+    }
+    assert target_prefilters(targets) == {}
+
+
+def test_symbols_and_asset_classes_are_extracted():
+    spec = extract_filter_spec("Is $tsla or NVDA stock a buy? Ask the CEO", now=NOW)
+    assert spec.symbols == ("NVDA", "TSLA")
+    assert spec.asset_classes == ("equity",)
+    assert not extract_filter_spec("what moved the markets", now=NOW)
+
+
+@pytest.mark.parametrize("query, expected", [
+    ("news today", (TODAY, None)),
+    ("news yesterday", (TODAY - timedelta(days=1), TODAY)),
+    ("the last 3 days", (NOW - timedelta(days=3), None)),
+    ("past week", (NOW - timedelta(weeks=1), None)),
+    ("this month", (datetime(2024, 5, 1, tzinfo=timezone.utc), None)),
+    ("this week", (datetime(2024, 5, 13, tzinfo=timezone.utc), None)),
+    ("in 2023", (datetime(2023, 1, 1, tzinfo=timezone.utc), datetime(2024, 1, 1, tzinfo=timezone.utc) - timedelta(microseconds=1))),
+    ("since 2024-01-02 until 2024-03-04", (datetime(2024, 1, 2, tzinfo=timezone.utc), datetime(2024, 3, 4, tzinfo=timezone.utc))),
+    ("no date here", (None, None)),
+])
+def test_dates_are_extracted(query, expected):
+    assert extract_dates(query, NOW) == expected
+
+
+DOCUMENT = {
+    "symbol": "AAPL",
+    "symbols": ["AAPL", "MSFT"],
+    "price": 190.5,
+    "published_at": datetime(2024, 5, 10),  # naive: UTC, as BSON dates are
+    "meta": {"exchange": "NASDAQ"},
+}
+
+
+@pytest.mark.parametrize("prefilter, expected", [
+    ({"symbol": "AAPL"}, True),
+    ({"symbol": {"$eq": "MSFT"}}, False),
+    ({"symbol": {"$ne": "MSFT"}}, True),
+    ({"symbols": {"$in": ["MSFT", "TSLA"]}}, True),  # an array matches when one of its elements does
+    ({"symbols": {"$nin": ["MSFT"]}}, False),
+    ({"symbols": ["AAPL", "MSFT"]}, True),
+    ({"price": {"$gt": 190, "$lte": 190.5}}, True),
+    ({"price": {"$lt": 190}}, False),
+    ({"price": {"$gte": "190"}}, False),  # values of different types never compare
+    ({"published_at": {"$gte": datetime(2024, 5, 1, tzinfo=timezone.utc)}}, True),
+    ({"missing": {"$gt": 1}}, False),
+    ({"missing": None}, True),
+    ({"meta.exchange": "NASDAQ"}, True),
+    ({"price": {"$not": {"$gt": 200}}}, True),
+    ({"$and": [{"symbol": "AAPL"}, {"price": {"$gt": 200}}]}, False),
+    ({"$or": [{"symbol": "TSLA"}, {"price": {"$gt": 100}}]}, True),
+    ({"$nor": [{"symbol": "TSLA"}, {"price": {"$gt": 200}}]}, True),
+])
+def test_match_filter(prefilter, expected):
+    assert match_filter(DOCUMENT, prefilter) is expected
+
+
+def test_compiled_specs_match_like_atlas():
+    spec = FilterSpec(symbols=("msft",), date_from=datetime(2024, 5, 1, tzinfo=timezone.utc))
+    assert match_filter(DOCUMENT, spec.compile({"symbols": "symbols", "date": "published_at"}))
+    assert not match_filter(DOCUMENT, spec.compile({"symbols": "symbol"}))
+
+
+@pytest.mark.parametrize("prefilter", [{"$where": "true"}, {"symbol": {"$regex": "A.*"}}])
+def test_unsupported_operators_raise(prefilter):
+    with pytest.raises(ValueError):
+        match_filter(DOCUMENT, prefilter)
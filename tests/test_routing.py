@@ -0,0 +1,105 @@
+import asyncio
+
+import numpy as np
+
+from vector_search.builder.routing import PrioritySemaphore, TargetRouter
+
+
+async def wait_until(condition):
+    while not condition():
+        await asyncio.sleep(0)
+
+
+def test_slots_go_to_the_highest_priority_first():
+    async def main():
+        semaphore = PrioritySemaphore(1)
+        order = []
+
+        async def worker(name, priority):
+            async with semaphore.slot(priority):
+                order.append(name)
+
+        await semaphore.acquire()
+        tasks = [asyncio.create_task(worker(name, priority)) for name, priority in
+                 [("low", 0), ("high", 2), ("first mid", 1), ("second mid", 1)]]
+        await wait_until(lambda: len(semaphore._waiters) == len(tasks))
+        semaphore.release()
+        await asyncio.gather(*tasks)
+        return order, semaphore.locked()
+
+    order, locked = asyncio.run(main())
+    assert order == ["high", "first mid", "second mid", "low"]
+    assert not locked
+
+
+def test_free_slots_are_taken_without_waiting():
+    async def main():
+        semaphore = PrioritySemaphore(2)
+        await semaphore.acquire()
+        await semaphore.acquire()
+        return semaphore.locked()
+
+    assert asyncio.run(main())
+
+
+def test_cancelled_waiter_does_not_take_a_slot():
+    async def main():
+        semaphore = PrioritySemaphore(1)
+        order = []
+
+        async def worker(name, priority):
+            async with semaphore.slot(priority):
+                order.append(name)
+
+        await semaphore.acquire()
+        cancelled = asyncio.create_task(worker("cancelled", 5))
+        waiting = asyncio.create_task(worker("waiting", 0))
+        await wait_until(lambda: len(semaphore._waiters) == 2)
+        cancelled.cancel()
+        await asyncio.gather(cancelled, return_exceptions=True)
+        semaphore.release()
+        await waiting
+        return order, semaphore.locked()
+
+    order, locked = asyncio.run(main())
+    assert order == ["waiting"]
+    assert not locked
+
+
+def test_waiter_cancelled_after_the_handoff_gives_the_slot_back():
+    async def main():
+        semaphore = PrioritySemaphore(1)
+        await semaphore.acquire()
+        waiter = asyncio.create_task(semaphore.acquire())
+        await wait_until(lambda: semaphore._waiters)
+        # The slot is handed over, but the waiter is cancelled before it resumes.
+        semaphore.release()
+        waiter.cancel()
+        await asyncio.gather(waiter, return_exceptions=True)
+        return semaphore.locked()
+
+    assert not asyncio.run(main())
+
+
+TARGETS = [{"collection_name": name} for name in ("tickers", "articles", "forex", "cryptos")]
+
+
+def names(targets):
+    return [target["collection_name"] for target in targets]
+
+
+def test_optional_targets_need_centroids():
+    router = TargetRouter()
+    assert names(router.route(TARGETS, np.ones(4))) == ["tickers", "articles"]
+
+    router.set_centroids("tickers", np.ones((1, 4)))
+    assert names(router.route(TARGETS, np.ones(4))) == ["tickers", "articles"]
+
+
+def test_routed_to_the_closest_targets():
+    router = TargetRouter(margin=0.0, max_targets=1)
+    router.set_centroids("tickers", -np.ones((1, 4)))
+    router.set_centroids("forex", np.ones((1, 4)))
+    router.set_centroids("cryptos", -np.ones((1, 4)))
+    # Articles are searched for every query (`always`).
+    assert names(router.route(TARGETS, np.ones(4))) == ["articles", "forex"]
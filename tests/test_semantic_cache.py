@@ -0,0 +1,95 @@
+import numpy as np
+import pytest
+
+from vector_search.builder import cache
+from vector_search.builder.cache import SemanticResultCache
+from vector_search.filters.prefilter import FilterSpec
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 1000.0
+
+    def monotonic(self):
+        return self.now
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    clock = FakeClock()
+    monkeypatch.setattr(cache, "time", clock)
+    return clock
+
+
+def unit(i, dim=8):
+    vector = np.zeros(dim)
+    vector[i] = 1.0
+    return vector
+
+
+def test_similar_queries_hit(clock):
+    results = SemanticResultCache(similarity=0.95)
+    results.set(unit(0), [{"_id": 1}])
+    paraphrase = unit(0) + 0.1 * unit(1)  # cosine ~0.995
+    assert results.get(paraphrase) == [{"_id": 1}]
+    assert results.get(unit(0) + unit(1)) is None  # cosine ~0.71
+    assert (results.stats.hits, results.stats.misses) == (1, 1)
+
+
+def test_hits_need_the_same_key(clock):
+    results = SemanticResultCache()
+    results.set(unit(0), ["aapl"], key=FilterSpec(symbols=("AAPL",)))
+    assert results.get(unit(0), key=FilterSpec(symbols=("aapl",))) == ["aapl"]
+    assert results.get(unit(0), key=FilterSpec(symbols=("MSFT",))) is None
+    assert results.get(unit(0)) is None
+
+
+def test_results_are_copied(clock):
+    results = SemanticResultCache()
+    result = [{"_id": 1, "tags": ["a"]}]
+    results.set(unit(0), result)
+    result[0]["tags"].append("set")
+    results.get(unit(0))[0]["tags"].append("hit")
+    assert results.get(unit(0)) == [{"_id": 1, "tags": ["a"]}]
+
+
+def test_entries_expire(clock):
+    results = SemanticResultCache(ttl=60)
+    results.set(unit(0), ["a"])
+    clock.now += 60
+    assert results.get(unit(0)) == ["a"]
+    clock.now += 1
+    assert results.get(unit(0)) is None
+
+
+def test_least_recently_used_entry_is_evicted(clock):
+    results = SemanticResultCache(max_entries=2)
+    results.set(unit(0), ["a"])
+    results.set(unit(1), ["b"])
+    results.get(unit(0))
+    results.set(unit(2), ["c"])
+    assert results.get(unit(1)) is None
+    assert results.get(unit(0)) == ["a"] and results.get(unit(2)) == ["c"]
+    assert len(results) == 2 and results.stats.evictions == 1
+
+
+def test_memory_budget_evicts(clock):
+    results = SemanticResultCache(max_entries=8)
+    results.set(unit(0), ["x" * 1000])
+    results.max_bytes = results.size + 100
+    results.set(unit(1), ["y" * 1000])
+    assert results.get(unit(0)) is None and results.get(unit(1)) == ["y" * 1000]
+    # Larger than the whole budget: not cached at all.
+    results.set(unit(2), ["z" * 10_000])
+    assert results.get(unit(2)) is None and len(results) == 1
+
+
+def test_invalidate_drops_the_results_of_a_collection(clock):
+    results = SemanticResultCache()
+    results.set(unit(0), ["a"], collections=["tickers", "articles"])
+    results.set(unit(1), ["b"], collections=["articles"])
+    results.set(unit(2), ["c"], collections=["forex"])
+    assert results.invalidate("tickers") == 1
+    assert results.get(unit(0)) is None and results.get(unit(1)) == ["b"]
+    assert results.invalidate() == 2
+    assert len(results) == 0
@@ -0,0 +1,84 @@
+import json
+
+from vector_search.builder.tuning import AdaptiveTuner, TargetParameters
+
+TARGET = {"collection_name": "tickers", "num_candidates": 100, "limit": 20}
+
+
+def tuner(**kwargs):
+    kwargs = {"adjust_every": 4, "target_recall": 0.75, "margin": 0.0, "step": 1.25, **kwargs}
+    return AdaptiveTuner(**kwargs)
+
+
+def observe(tuner, returned, selected, latency=None, target=TARGET):
+    """Records one adjustment period of identical searches, and returns the adjustment."""
+    for _ in range(tuner.adjust_every):
+        if latency is not None:
+            tuner.observe_latency(target, latency)
+        parameters = tuner.observe(target, returned, returned, selected)
+    return parameters
+
+
+def test_parameters_start_from_the_target():
+    assert tuner().parameters(TARGET) == TargetParameters(100, 20)
+    assert tuner().parameters({"collection_name": "articles"}) == TargetParameters(50, 50)
+
+
+def test_adjusts_only_every_few_searches():
+    adaptive = tuner()
+    assert [adaptive.observe(TARGET, 20, 20, 20) for _ in range(3)] == [None] * 3
+    assert adaptive.observe(TARGET, 20, 20, 20) == TargetParameters(125, 25)
+    snapshot = adaptive.snapshot()["tickers"]
+    assert (snapshot["adjustments"], snapshot["searches"]) == (1, 0)
+
+
+def test_saturated_searches_grow_the_limit():
+    adaptive = tuner()
+    # Every result returned made the final results: deeper ones might have too.
+    assert observe(adaptive, returned=20, selected=20) == TargetParameters(125, 25)
+    assert observe(adaptive, returned=25, selected=25) == TargetParameters(157, 32)
+    # Searches that returned fewer results than the limit are not saturated.
+    assert observe(adaptive, returned=25, selected=25) == TargetParameters(125, 25)
+
+
+def test_limit_shrinks_towards_the_results_used():
+    adaptive = tuner()
+    assert observe(adaptive, returned=20, selected=4) == TargetParameters(80, 16)
+    for _ in range(10):
+        observe(adaptive, returned=adaptive.parameters(TARGET).limit, selected=4)
+    # Down to the minimum limit, and `candidate_ratio` candidates per result.
+    assert adaptive.parameters(TARGET) == TargetParameters(25, 5)
+
+
+def test_candidates_shrink_over_the_latency_budget():
+    adaptive = tuner(latency_budget=0.1, candidate_ratio=10)
+    assert observe(adaptive, returned=20, selected=10, latency=0.2) == TargetParameters(80, 16)
+    # Once num_candidates reached the limit, the limit shrinks too.
+    adaptive = tuner(latency_budget=0.1)
+    target = {"collection_name": "forex", "num_candidates": 20, "limit": 20}
+    assert observe(adaptive, returned=20, selected=20, latency=0.2, target=target) == TargetParameters(16, 16)
+
+
+def test_candidates_only_grow_with_latency_headroom():
+    target = {"collection_name": "forex", "num_candidates": 50, "limit": 20}
+    adaptive = tuner(latency_budget=0.1, headroom=0.5, margin=0.25)
+    assert observe(adaptive, returned=20, selected=19, latency=0.07, target=target) is None
+    adaptive = tuner(latency_budget=0.1, headroom=0.5, margin=0.25)
+    assert observe(adaptive, returned=20, selected=19, latency=0.01, target=target) == TargetParameters(63, 20)
+
+
+def test_parameters_stay_within_their_bounds():
+    adaptive = tuner(limit_bounds=(5, 22), num_candidates_bounds=(10, 60))
+    assert observe(adaptive, returned=20, selected=20) == TargetParameters(60, 22)
+
+
+def test_seeded_parameters_replace_the_current_ones(tmp_path):
+    adaptive = tuner()
+    observe(adaptive, returned=20, selected=20)
+    adaptive.seed("tickers", 40, 10)
+    assert adaptive.parameters(TARGET) == TargetParameters(40, 10)
+
+    path = tmp_path / "sweep.json"
+    path.write_text(json.dumps({"recommendations": {"articles": {"num_candidates": 300, "limit": 30}}}))
+    assert adaptive.load(str(path)) == 1
+    assert adaptive.parameters({"collection_name": "articles"}) == TargetParameters(300, 30)
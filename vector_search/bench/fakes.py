@@ -0,0 +1,273 @@
+import zlib
+import time
+import random
+import asyncio
+import threading
+from typing import Any, Callable, Dict, Iterator, List, Optional, Tuple
+
+import numpy as np
+from aiohttp import web
+from bson import decode, encode
+from bson.codec_options import CodecOptions
+from pymongo.errors import ConnectionFailure, ExecutionTimeout
+
+from vector_search.builder.local import LocalVectorSearchManager, write_local_index
+
+
+def parse_distribution(spec: str, seed: int = 0) -> Callable[[], float]:
+    """
+    Builds a sampler of delays, in seconds, from a spec such as:
+
+        "0.02" or "const:0.02"       always 20 ms
+        "uniform:0.01,0.05"          uniform between 10 and 50 ms
+        "exp:0.02"                   exponential with a 20 ms mean
+        "lognormal:0.02,0.5"         log-normal with a 20 ms median and shape 0.5 (long tail)
+    """
+    kind, _, params = spec.partition(":")
+    if not params:
+        kind, params = "const", kind
+    values = [float(value) for value in params.split(",")]
+    rng = random.Random(seed)
+    lock = threading.Lock()  # samplers are shared by the event loop and executor threads
+
+    samplers: Dict[str, Callable[[], float]] = {
+        "const": lambda: values[0],
+        "uniform": lambda: rng.uniform(values[0], values[1]),
+        "exp": lambda: rng.expovariate(1.0 / values[0]) if values[0] > 0 else 0.0,
+        "lognormal": lambda: rng.lognormvariate(np.log(values[0]), values[1]),
+    }
+    if kind not in samplers:
+        raise ValueError(f"Unknown distribution {kind!r}; expected one of {sorted(samplers)}.")
+    sampler = samplers[kind]
+
+    def sample() -> float:
+        with lock:
+            return sampler()
+    return sample
+
+
+def fake_embedding(text: str, dim: int) -> List[float]:
+    """
+    Returns a deterministic unit vector for `text`: the same text always maps to the same vector.
+    """
+    rng = np.random.default_rng(zlib.crc32(text.encode("utf-8")))
+    vector = rng.standard_normal(dim)
+    return (vector / np.linalg.norm(vector)).tolist()
+
+
+class FakeEmbeddingServer:
+    """
+    A local stand-in for the OpenAI embeddings endpoint, speaking the same request/response format.
+
+    Latency and failures can be injected: `latency` is called once per request and returns the delay to add,
+    in seconds, and a request fails with HTTP 500 with probability `error_rate`.
+    """
+    def __init__(self,
+        dim: int = 1536,
+        latency: Optional[Callable[[], float]] = None,
+        error_rate: float = 0.0,
+        host: str = "127.0.0.1",
+        port: int = 0,
+        seed: int = 0
+        ):
+        self.dim = dim
+        self.latency = latency
+        self.error_rate = error_rate
+        self.host = host
+        self.port = port
+        self.requests = 0
+        self.inputs = 0
+        self.failures = 0
+        self._random = random.Random(seed)
+        self._runner: Optional[web.AppRunner] = None
+
+    @property
+    def url(self) -> str:
+        return f"http://{self.host}:{self.port}/v1/embeddings"
+
+    async def handle(self, request: web.Request) -> web.Response:
+        payload = await request.json()
+        self.requests += 1
+        if self.latency is not None:
+            await asyncio.sleep(max(0.0, self.latency()))
+        if self.error_rate and self._random.random() < self.error_rate:
+            self.failures += 1
+            return web.json_response({"error": {"message": "injected failure"}}, status=500)
+
+        inputs = payload["input"] if isinstance(payload["input"], list) else [payload["input"]]
+        self.inputs += len(inputs)
+        return web.json_response({
+            "object": "list",
+            "model": payload.get("model"),
+            "data": [
+                {"object": "embedding", "index": i, "embedding": fake_embedding(text, self.dim)}
+                for i, text in enumerate(inputs)
+            ]
+        })
+
+    async def start(self) -> "FakeEmbeddingServer":
+        app = web.Application()
+        app.router.add_post("/v1/embeddings", self.handle)
+        self._runner = web.AppRunner(app, access_log=None)
+        await self._runner.setup()
+        site = web.TCPSite(self._runner, self.host, self.port)
+        await site.start()
+        self.port = self._runner.addresses[0][1]  # resolves port 0
+        return self
+
+    async def stop(self):
+        if self._runner is not None:
+            await self._runner.cleanup()
+            self._runner = None
+
+    async def __aenter__(self) -> "FakeEmbeddingServer":
+        return await self.start()
+
+    async def __aexit__(self, *exc):
+        await self.stop()
+
+
+def synthetic_documents(n: int, dim: int, path: str, seed: int = 0, clusters: int = 0, spread: float = 0.5) -> Iterator[Dict]:
+    """
+    Yields `n` documents shaped like the market collections, with random unit vectors at `path`.
+
+    With `clusters`, vectors are drawn around that many random centers (`spread` scales the noise relative to
+    the centers), as real embeddings are: approximate indexes only make sense on such data.
+    """
+    rng = np.random.default_rng(seed)
+    centers = rng.standard_normal((clusters, dim)) if clusters else None
+    for i in range(n):
+        vector = rng.standard_normal(dim).astype(np.float32)
+        if centers is not None:
+            vector = (centers[rng.integers(clusters)] + spread * vector).astype(np.float32)
+        yield {
+            "_id": f"doc-{seed}-{i}",
+            "name": f"Name {i}",
+            "description": f"Description of item {i}",
+            "content": f"Synthetic content number {i}",
+            path: (vector / np.linalg.norm(vector)).tolist(),
+        }
+
+
+def build_synthetic_index(directory: str, database_name: str, collection_name: str, path: str, n: int, dim: int, seed: int = 0, clusters: int = 0) -> int:
+    """
+    Writes a synthetic local index readable by `LocalVectorSearchManager`.
+    """
+    return write_local_index(directory, database_name, collection_name, path, synthetic_documents(n, dim, path, seed, clusters))
+
+
+def synthetic_candidates(n: int, dim: int, path: str = "content_embedding", seed: int = 0) -> List[Dict]:
+    """
+    Returns `n` search results carrying their embedding, as `$vectorSearch` returns them for local re-scoring.
+    """
+    return list(synthetic_documents(n, dim, path, seed))
+
+
+class FakeCollection:
+    """
+    Answers `$vectorSearch` pipelines from a local index, like an Atlas collection would.
+
+    `aggregate` blocks for the injected latency (as pymongo does while waiting on the server) and raises
+    `ConnectionFailure` with probability `error_rate`. Like the server, it gives up on a query at its `maxTimeMS`
+    with `ExecutionTimeout`.
+    """
+    def __init__(self, client: "FakeMongoClient", database_name: str, collection_name: str):
+        self.client = client
+        self.database_name = database_name
+        self.collection_name = collection_name
+        self._managers: Dict[str, LocalVectorSearchManager] = {}
+        self._lock = threading.Lock()
+        self.codec_options: Optional[CodecOptions] = None
+
+    def _manager(self, path: str, index: str) -> LocalVectorSearchManager:
+        with self._lock:
+            if path not in self._managers:
+                self._managers[path] = LocalVectorSearchManager(
+                    self.database_name, self.collection_name, path, index,
+                    local_path=self.client.directory, local_mode=self.client.local_mode
+                )
+            return self._managers[path]
+
+    def with_options(self, codec_options: Optional[CodecOptions] = None, **kwargs) -> "FakeCollection":
+        collection = FakeCollection(self.client, self.database_name, self.collection_name)
+        collection._managers, collection._lock, collection.codec_options = self._managers, self._lock, codec_options
+        return collection
+
+    def aggregate(self, pipeline: List[Dict[str, Any]], maxTimeMS: Optional[int] = None, **options) -> List[Dict]:
+        self.client.calls += 1
+        if self.client.latency is not None:
+            latency = max(0.0, self.client.latency())
+            if maxTimeMS is not None and latency * 1000 > maxTimeMS:
+                time.sleep(maxTimeMS / 1000)
+                self.client.timeouts += 1
+                raise ExecutionTimeout("operation exceeded time limit", 50)
+            time.sleep(latency)
+        if self.client.error_rate and self.client.should_fail():
+            self.client.failures += 1
+            raise ConnectionFailure("injected failure")
+
+        stages = {name: spec for stage in pipeline for name, spec in stage.items()}
+        if "$vectorSearch" not in stages:
+            raise NotImplementedError(f"FakeCollection only answers $vectorSearch pipelines, got {list(stages)}.")
+        search = stages["$vectorSearch"]
+        manager = self._manager(search["path"], search["index"])
+        results = manager._request(search["queryVector"], search.get("filter"), num_candidates=search["numCandidates"],
+                                   limit=search["limit"], **stages.get("$project", {}))
+        if self.codec_options is not None:
+            # Encoded as the server would send them, e.g. as `RawBSONDocument`s with `RAW_CODEC_OPTIONS`.
+            return [decode(encode(result), self.codec_options) for result in results]
+        return results
+
+
+class FakeMongoClient:
+    """
+    A stand-in for `MongoClient` serving `$vectorSearch` from the local indexes in `directory`
+    (see `build_synthetic_index`), with injectable latency and connection failures.
+    """
+    def __init__(self,
+        directory: str,
+        latency: Optional[Callable[[], float]] = None,
+        error_rate: float = 0.0,
+        local_mode: str = "exact",
+        seed: int = 0
+        ):
+        self.directory = directory
+        self.latency = latency
+        self.error_rate = error_rate
+        self.local_mode = local_mode
+        self.calls = 0
+        self.failures = 0
+        self.timeouts = 0
+        self._random = random.Random(seed)
+        self._lock = threading.Lock()
+        self._collections: Dict[Tuple[str, str], FakeCollection] = {}
+        self.admin = self  # `client.admin.command("ping")`
+
+    def should_fail(self) -> bool:
+        with self._lock:
+            return self._random.random() < self.error_rate
+
+    def command(self, name: str, *args, **kwargs) -> Dict[str, Any]:
+        return {"ok": 1.0}
+
+    def __getitem__(self, database_name: str) -> "_FakeDatabase":
+        return _FakeDatabase(self, database_name)
+
+    def collection(self, database_name: str, collection_name: str) -> FakeCollection:
+        with self._lock:
+            key = (database_name, collection_name)
+            if key not in self._collections:
+                self._collections[key] = FakeCollection(self, database_name, collection_name)
+            return self._collections[key]
+
+    def close(self):
+        self._collections.clear()
+
+
+class _FakeDatabase:
+    def __init__(self, client: FakeMongoClient, name: str):
+        self.client = client
+        self.name = name
+
+    def __getitem__(self, collection_name: str) -> FakeCollection:
+        return self.client.collection(self.name, collection_name)
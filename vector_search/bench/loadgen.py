@@ -0,0 +1,312 @@
+"""
+End-to-end load generator for `search()`, run against local stand-ins for OpenAI and Atlas.
+
+Queries are replayed, in order and cycling, from a file holding one query per line (or JSON lines with a
+"query" key). Embeddings come from `FakeEmbeddingServer` and `$vectorSearch` from `FakeMongoClient`, both
+with injectable latency distributions (see `parse_distribution`) and error rates, so the real pipeline
+(shared embedder, `ContextBuilder` and its retry policy, executor threads, filtering) is exercised on one box.
+
+    python -m vector_search.bench.loadgen queries.txt --qps 50 --duration 30
+    python -m vector_search.bench.loadgen queries.txt --concurrency 16 --requests 2000 \\
+        --embed-latency lognormal:0.08,0.4 --search-latency exp:0.03 --search-error-rate 0.01
+
+The report (JSON) holds the throughput, client-side latency percentiles, the exact p50/p95/p99 of every stage
+and target (from the values observed by the metrics registry during the run), the error and retry counts,
+and the event-loop lag.
+"""
+import os
+import sys
+import json
+import time
+import asyncio
+import argparse
+import itertools
+import tempfile
+import collections
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Dict, Iterator, List, Optional
+
+import numpy as np
+
+from vector_search.bench.fakes import FakeEmbeddingServer, FakeMongoClient, build_synthetic_index, parse_distribution
+from vector_search.calls import on_query
+from vector_search.builder.retry import default_policy
+from vector_search.builder.routing import TargetRouter, compute_centroids
+from vector_search.builder.local import LocalVectorSearchManager
+from vector_search.builder.cache import EmbeddingCache, MemoryEmbeddingCache, SemanticResultCache
+from vector_search.config.static import SearchBalancer, TuningBalancer
+from vector_search.utils.metrics import STAGE_SECONDS, TARGET_SECONDS, RETRIES, HEDGES, TARGET_FAILURES, ROUTED_TARGETS
+
+QUANTILES = (0.5, 0.95, 0.99)
+STAGES = ("embed", "rescore", "merge", "total")
+
+
+def load_queries(path: str) -> List[str]:
+    queries = []
+    with open(path, encoding="utf-8") as f:
+        for line in f:
+            line = line.strip()
+            if line:
+                queries.append(json.loads(line)["query"] if line.startswith("{") else line)
+    if not queries:
+        raise ValueError(f"No queries found in {path}.")
+    return queries
+
+
+def percentiles(samples: List[float]) -> Dict[str, Optional[float]]:
+    if not samples:
+        return {f"p{int(q * 100)}": None for q in QUANTILES} | {"max": None}
+    values = np.percentile(samples, [q * 100 for q in QUANTILES])
+    return {f"p{int(q * 100)}": float(v) for q, v in zip(QUANTILES, values)} | {"max": float(max(samples))}
+
+
+class LoopLagMonitor:
+    """
+    Measures event-loop lag: how late a task that sleeps for `interval` wakes up.
+    Sustained lag means callbacks (filtering, JSON decoding, ...) are blocking the loop.
+    """
+    def __init__(self, interval: float = 0.01):
+        self.interval = interval
+        self.samples: List[float] = []
+        self._task: Optional[asyncio.Task] = None
+
+    async def _run(self):
+        loop = asyncio.get_running_loop()
+        while True:
+            start = loop.time()
+            await asyncio.sleep(self.interval)
+            self.samples.append(max(0.0, loop.time() - start - self.interval))
+
+    def start(self):
+        self._task = asyncio.create_task(self._run())
+
+    async def stop(self):
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+
+
+class LoadStats:
+    def __init__(self):
+        self.latencies: List[float] = []
+        self.errors: collections.Counter = collections.Counter()
+        self.in_flight = 0
+        self.max_in_flight = 0
+
+    async def run_one(self, search, client: Any, query: str):
+        self.in_flight += 1
+        self.max_in_flight = max(self.max_in_flight, self.in_flight)
+        start = time.perf_counter()
+        try:
+            await search(client, query)
+            self.latencies.append(time.perf_counter() - start)
+        except Exception as e:
+            self.errors[type(e).__name__] += 1
+        finally:
+            self.in_flight -= 1
+
+
+async def closed_loop(stats: LoadStats, search, client: Any, queries: Iterator[str], concurrency: int, deadline: float, requests: Optional[int]):
+    """`concurrency` workers each issue their next query as soon as the previous one completes."""
+    issued = itertools.count()
+
+    async def worker():
+        while time.perf_counter() < deadline and (requests is None or next(issued) < requests):
+            await stats.run_one(search, client, next(queries))
+
+    await asyncio.gather(*(worker() for _ in range(concurrency)))
+
+
+async def open_loop(stats: LoadStats, search, client: Any, queries: Iterator[str], qps: float, deadline: float, requests: Optional[int], poisson: bool, seed: int):
+    """Queries arrive at `qps` regardless of how fast they complete, as user traffic does."""
+    rng = np.random.default_rng(seed)
+    tasks = set()
+    next_at = time.perf_counter()
+    for issued in itertools.count():
+        if time.perf_counter() >= deadline or (requests is not None and issued >= requests):
+            break
+        delay = next_at - time.perf_counter()
+        if delay > 0:
+            await asyncio.sleep(delay)
+        task = asyncio.create_task(stats.run_one(search, client, next(queries)))
+        tasks.add(task)
+        task.add_done_callback(tasks.discard)
+        next_at += rng.exponential(1.0 / qps) if poisson else 1.0 / qps
+    if tasks:
+        await asyncio.gather(*tasks)
+
+
+def stage_report(targets: List[str]) -> Dict[str, Any]:
+    # Exact percentiles of the values kept during the run (see `run`): bucket estimates are too coarse here.
+    def report(samples: List[float]) -> Dict[str, Any]:
+        return percentiles(samples) | {"count": len(samples)}
+
+    stages = {stage: report(STAGE_SECONDS.samples(stage=stage)) for stage in STAGES}
+    collections_ = {target: report(TARGET_SECONDS.samples(collection=target)) for target in targets}
+    return {"stages": stages, "targets": collections_}
+
+
+async def run(args: argparse.Namespace) -> Dict[str, Any]:
+    queries = load_queries(args.queries)
+    directory = tempfile.TemporaryDirectory()
+    targets = [search_args.value for search_args in on_query.SEARCHED_TARGETS]
+    for seed, target in enumerate(targets):
+        build_synthetic_index(directory.name, target["database_name"], target["collection_name"], target["path"], args.documents, args.dim, seed)
+    if args.route:
+        # Centroids of the synthetic indexes, as `bench.routing` computes them for real ones.
+        on_query.router = TargetRouter()
+        for target in targets:
+            manager = LocalVectorSearchManager(**target, local_path=directory.name)
+            on_query.router.set_centroids(target["collection_name"], compute_centroids(manager.vectors))
+            manager.close()
+
+    server = FakeEmbeddingServer(
+        dim=args.dim,
+        latency=parse_distribution(args.embed_latency, args.seed),
+        error_rate=args.embed_error_rate,
+        seed=args.seed
+    )
+    await server.start()
+    # Read by the shared embedder when `startup` creates it.
+    os.environ["OPENAI_EMBEDDINGS_URL"] = server.url
+
+    if not args.cache:
+        # Entries expire immediately: every query pays for the full pipeline, as with distinct queries.
+        on_query.embedding_cache = EmbeddingCache(MemoryEmbeddingCache(ttl=0))
+        on_query.result_cache = SemanticResultCache(ttl=0)
+    if args.quiet:
+        on_query.logger.set_level("CRITICAL")
+    if args.hedge:
+        default_policy.hedge = True
+    if args.rescore:
+        SearchBalancer.SERVER_SCORED = False
+    if args.tune:
+        TuningBalancer.ENABLED = True
+
+    loop = asyncio.get_running_loop()
+    if args.executor_workers:
+        loop.set_default_executor(ThreadPoolExecutor(max_workers=args.executor_workers))
+
+    client = FakeMongoClient(
+        directory.name,
+        latency=parse_distribution(args.search_latency, args.seed + 1),
+        error_rate=args.search_error_rate,
+        seed=args.seed + 1
+    )
+    stats = LoadStats()
+    monitor = LoopLagMonitor(args.lag_interval)
+    cycle = itertools.cycle(queries)
+    STAGE_SECONDS.keep_samples()
+    TARGET_SECONDS.keep_samples()
+
+    await on_query.startup()
+    monitor.start()
+    start = time.perf_counter()
+    deadline = start + args.duration if args.duration else float("inf")
+    try:
+        if args.qps:
+            await open_loop(stats, on_query.search, client, cycle, args.qps, deadline, args.requests, args.poisson, args.seed)
+        else:
+            await closed_loop(stats, on_query.search, client, cycle, args.concurrency, deadline, args.requests)
+        elapsed = time.perf_counter() - start
+    finally:
+        await monitor.stop()
+        await on_query.shutdown()
+        await server.stop()
+        directory.cleanup()
+
+    completed = len(stats.latencies)
+    return {
+        "config": vars(args),
+        "elapsed": elapsed,
+        "completed": completed,
+        "failed": sum(stats.errors.values()),
+        "errors": dict(stats.errors),
+        "throughput": completed / elapsed if elapsed else 0.0,
+        "max_in_flight": stats.max_in_flight,
+        "latency": percentiles(stats.latencies),
+        **stage_report([target["collection_name"] for target in targets]),
+        "retries": sum(RETRIES.value(scope=target["collection_name"]) for target in targets),
+        "target_failures": sum(TARGET_FAILURES.value(collection=target["collection_name"]) for target in targets),
+        "hedges": sum(HEDGES.value(collection=target["collection_name"]) for target in targets),
+        "embedding_requests": server.requests,
+        "search_calls": client.calls,
+        "injected_failures": {"embed": server.failures, "search": client.failures},
+        "search_time_limits": client.timeouts,
+        "loop_lag": percentiles(monitor.samples),
+        "tuning": on_query.tuner.snapshot() if on_query.tuner is not None else {},
+        "routed": {
+            target["collection_name"]: {decision: ROUTED_TARGETS.value(collection=target["collection_name"], decision=decision) for decision in ("searched", "skipped")}
+            for target in targets
+        },
+    }
+
+
+def print_summary(report: Dict[str, Any]):
+    def ms(value: Optional[float]) -> str:
+        return "-" if value is None else f"{value * 1000:.1f}ms"
+
+    lines = [
+        f"completed {report['completed']} failed {report['failed']} in {report['elapsed']:.1f}s "
+        f"-> {report['throughput']:.1f} queries/s (max in flight {report['max_in_flight']}, retries {report['retries']:.0f}, "
+        f"target failures {report['target_failures']:.0f}, hedges {report['hedges']:.0f})",
+        "latency   " + " ".join(f"{k} {ms(v)}" for k, v in report["latency"].items()),
+    ]
+    for name, quantiles in {**report["stages"], **report["targets"]}.items():
+        lines.append(f"{name:<9} " + " ".join(f"{k} {ms(v)}" for k, v in quantiles.items() if k != "count"))
+    lines.append("loop lag  " + " ".join(f"{k} {ms(v)}" for k, v in report["loop_lag"].items()))
+    for name, state in report["tuning"].items():
+        lines.append(f"{name:<9} num_candidates {state['num_candidates']} limit {state['limit']} ({state['adjustments']} adjustments)")
+    for name, decisions in report["routed"].items():
+        if decisions["skipped"]:
+            lines.append(f"{name:<9} routed {decisions['searched']:.0f} skipped {decisions['skipped']:.0f}")
+    if report["errors"]:
+        lines.append(f"errors    {report['errors']}")
+    print("\n".join(lines), file=sys.stderr)
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description="Drives search() against local stand-ins for OpenAI and Atlas.")
+    parser.add_argument("queries", help="A file of queries, one per line (or JSON lines with a 'query' key), replayed in order.")
+    mode = parser.add_mutually_exclusive_group()
+    mode.add_argument("--qps", type=float, help="Open loop: issues queries at this rate.")
+    mode.add_argument("--concurrency", type=int, default=8, help="Closed loop: the number of queries kept in flight. Defaults to 8.")
+    parser.add_argument("--poisson", action="store_true", help="With --qps, draws exponential inter-arrival times instead of a fixed interval.")
+    parser.add_argument("--duration", type=float, default=10.0, help="Seconds to generate load for. 0 runs until --requests. Defaults to 10.")
+    parser.add_argument("--requests", type=int, help="Stops after this many queries.")
+    parser.add_argument("--embed-latency", default="exp:0.05", help="Delay distribution of the embeddings stub. Defaults to exp:0.05.")
+    parser.add_argument("--embed-error-rate", type=float, default=0.0, help="Fraction of embedding calls answered with HTTP 500.")
+    parser.add_argument("--search-latency", default="exp:0.03", help="Delay distribution of $vectorSearch. Defaults to exp:0.03.")
+    parser.add_argument("--search-error-rate", type=float, default=0.0, help="Fraction of $vectorSearch calls raising ConnectionFailure.")
+    parser.add_argument("--documents", type=int, default=10_000, help="Documents per synthetic collection. Defaults to 10000.")
+    parser.add_argument("--dim", type=int, default=1536, help="Embedding dimension. Defaults to 1536.")
+    parser.add_argument("--executor-workers", type=int, help="Size of the default thread pool running blocking searches.")
+    parser.add_argument("--hedge", action="store_true", help="Hedges slow target searches (see `RetryBalancer.HEDGE`).")
+    parser.add_argument("--rescore", action="store_true", help="Fetches the embeddings and re-scores them locally (SERVER_SCORED off).")
+    parser.add_argument("--tune", action="store_true", help="Tunes num_candidates/limit per target while running (see `TuningBalancer`).")
+    parser.add_argument("--route", action="store_true", help="Routes queries with centroids of the synthetic indexes (see `RoutingBalancer`).")
+    parser.add_argument("--cache", action="store_true", help="Keeps the embedding and result caches (off by default).")
+    parser.add_argument("--lag-interval", type=float, default=0.01, help="Sampling interval of the event-loop lag monitor.")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--quiet", action="store_true", help="Silences the search logs during the run.")
+    parser.add_argument("--output", help="Writes the JSON report to this file (default: stdout).")
+    args = parser.parse_args(argv)
+    if not args.duration and args.requests is None:
+        parser.error("--duration 0 requires --requests.")
+
+    report = asyncio.run(run(args))
+    print_summary(report)
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            json.dump(report, f, indent=2)
+    else:
+        json.dump(report, sys.stdout, indent=2)
+        print()
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
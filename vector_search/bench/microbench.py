@@ -0,0 +1,315 @@
+"""
+Offline microbenchmarks of the search pipeline stages.
+
+Nothing here touches the network: searches run against synthetic local indexes (`SearchBackend.LOCAL`)
+and embeddings come from `FakeEmbeddingServer` on localhost.
+
+    python -m vector_search.bench.microbench --output bench.json
+    python -m vector_search.bench.microbench --baseline bench.json --tolerance 0.2
+
+With `--baseline`, each benchmark's median is compared with the baseline's and the exit status is 1
+if any of them regressed by more than `--tolerance`.
+"""
+import sys
+import json
+import time
+import asyncio
+import argparse
+import platform
+import tempfile
+import itertools
+import contextlib
+import io
+import logging
+from dataclasses import dataclass, field, asdict
+from typing import Any, Awaitable, Callable, Dict, Iterator, List, Optional
+
+import bson
+import numpy as np
+from bson.raw_bson import RawBSONDocument
+
+from vector_search.bench.fakes import FakeEmbeddingServer, build_synthetic_index, fake_embedding, synthetic_candidates
+from vector_search.builder.context import ContextBuilder, Filter
+from vector_search.builder.decode import RAW_CODEC_OPTIONS, decode_batch
+from vector_search.builder.embeddings import VectorEmbeddingManager
+from vector_search.builder.registry import TargetRegistry
+from vector_search.config.static import SearchBalancer, SearchBackend
+
+
+@dataclass
+class Result:
+    name: str
+    params: Dict[str, Any]
+    number: int
+    repeat: int
+    # Seconds per call
+    min: float = 0.0
+    median: float = 0.0
+    p95: float = 0.0
+    mean: float = 0.0
+    skipped: Optional[str] = None
+
+    @classmethod
+    def from_samples(cls, name: str, params: Dict[str, Any], number: int, samples: List[float]) -> "Result":
+        per_call = np.asarray(samples) / number
+        return cls(name, params, number, len(samples),
+                   min=float(per_call.min()), median=float(np.median(per_call)),
+                   p95=float(np.percentile(per_call, 95)), mean=float(per_call.mean()))
+
+
+def measure(name: str, params: Dict[str, Any], func: Callable[[], Any], number: int, repeat: int) -> Result:
+    """Times `repeat` samples of `number` calls of `func`, after one warm-up call."""
+    func()
+    samples = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        for _ in range(number):
+            func()
+        samples.append(time.perf_counter() - start)
+    return Result.from_samples(name, params, number, samples)
+
+
+async def measure_async(name: str, params: Dict[str, Any], func: Callable[[], Awaitable[Any]], number: int, repeat: int) -> Result:
+    """Like `measure`, for a coroutine function awaited on the running loop."""
+    await func()
+    samples = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        for _ in range(number):
+            await func()
+        samples.append(time.perf_counter() - start)
+    return Result.from_samples(name, params, number, samples)
+
+
+@dataclass
+class Sizes:
+    candidates: List[int] = field(default_factory=lambda: [100, 1_000, 10_000])
+    dims: List[int] = field(default_factory=lambda: [384, 1536])
+    contexts: List[int] = field(default_factory=lambda: [100, 1_000])
+    index_size: int = 20_000
+    repeat: int = 7
+
+    @classmethod
+    def quick(cls) -> "Sizes":
+        return cls(candidates=[100, 1_000], dims=[384], contexts=[100], index_size=2_000, repeat=3)
+
+
+def bench_filter(sizes: Sizes) -> Iterator[Result]:
+    for n, dim in itertools.product(sizes.candidates, sizes.dims):
+        items = synthetic_candidates(n, dim)
+        query = fake_embedding("query", dim)
+        number = max(1, 10_000 // n)
+        run = Filter(query, items, threshold=SearchBalancer.THRESHOLD, batch_size=SearchBalancer.BATCH_SIZE, top_k=SearchBalancer.STOP_INDEX)
+        yield measure("context.Filter", {"candidates": n, "dim": dim}, run, number, sizes.repeat)
+
+
+def bench_decode(sizes: Sizes) -> Iterator[Result]:
+    for n, dim in itertools.product(sizes.candidates, sizes.dims):
+        raw = [RawBSONDocument(bson.encode(item), RAW_CODEC_OPTIONS) for item in synthetic_candidates(n, dim)]
+        number = max(1, 1_000 // n)
+
+        def dicts():
+            # What pymongo's default decoding plus `Filter.stack_embeddings` cost.
+            return Filter.stack_embeddings([bson.decode(document.raw) for document in raw], dim)
+
+        yield measure("decode.dicts+stack", {"candidates": n, "dim": dim}, dicts, number, sizes.repeat)
+        yield measure("decode.decode_batch", {"candidates": n, "dim": dim}, lambda: decode_batch(raw, dim, Filter.EMBEDDING_FIELDS), number, sizes.repeat)
+
+
+def bench_flatten(sizes: Sizes) -> Iterator[Result]:
+    from vector_search.calls.on_query import flatten_list, logger
+
+    # Measured with the runtime logs off, as in production; they would otherwise dominate the timing.
+    logger.set_level(logging.WARNING)
+    for n in sizes.candidates:
+        # Two targets, as searched by `_on_query`
+        nested = [[{"_id": i} for i in range(n // 2)], [{"_id": i} for i in range(n - n // 2)]]
+        yield measure("on_query.flatten_list", {"items": n}, lambda: flatten_list(nested), max(1, 100_000 // n), sizes.repeat)
+
+
+def bench_merge(sizes: Sizes) -> Iterator[Result]:
+    from vector_search.calls.on_query import make_filter, merge_results
+
+    # Re-scored locally, as the candidates carry their embeddings.
+    server_scored, SearchBalancer.SERVER_SCORED = SearchBalancer.SERVER_SCORED, False
+    try:
+        for n, dim in itertools.product(sizes.candidates, sizes.dims):
+            # Two targets sharing a tenth of their documents.
+            first = synthetic_candidates(n - n // 2, dim, seed=0)
+            second = synthetic_candidates(n // 2, dim, seed=1)
+            for item, duplicate in zip(second[::10], first[::10]):
+                item.update(duplicate)
+            query = fake_embedding("query", dim)
+            number = max(1, 10_000 // n)
+            params = {"candidates": n, "dim": dim}
+            yield measure("merge.flatten+filter", params, lambda: make_filter(query, first + second)(), number, sizes.repeat)
+            yield measure("merge.merge_results", params, lambda: merge_results(query, [first, second]), number, sizes.repeat)
+    finally:
+        SearchBalancer.SERVER_SCORED = server_scored
+
+
+def bench_constraints(sizes: Sizes) -> Iterator[Result]:
+    from vector_search.filters.constraints import Filter as KeywordFilter, Parser
+
+    try:
+        parser = Parser(cache_size=0)
+        parser.keywords("Apple shares rallied after earnings")
+    except LookupError as e:
+        missing = next((line.strip() for line in str(e).splitlines() if "Resource" in line), "missing resource")
+        reason = f"NLTK data unavailable: {missing}"
+        for n in sizes.contexts:
+            for name in ("constraints.Parser.keywords_batch", "constraints.Filter", "constraints.Filter[indexed]"):
+                yield Result(name, {"contexts": n}, 0, 0, skipped=reason)
+        return
+
+    for n in sizes.contexts:
+        contexts = [f"Company {i} reported revenue growth in market segment {i % 17}" for i in range(n)]
+        yield measure("constraints.Parser.keywords_batch", {"contexts": n}, lambda: parser.keywords_batch(contexts), 1, sizes.repeat)
+
+        # `Filter.__call__` prints its own timing on every call.
+        with contextlib.redirect_stdout(io.StringIO()):
+            run = KeywordFilter(list(contexts), threshold=0.5, parser=parser)
+            yield measure("constraints.Filter", {"contexts": n}, lambda: run("market segment growth"), 1, sizes.repeat)
+            indexed = KeywordFilter(list(contexts), threshold=0.5, parser=parser, indexed=True)
+            yield measure("constraints.Filter[indexed]", {"contexts": n}, lambda: indexed("market segment growth"), 10, sizes.repeat)
+
+
+async def _bench_pipeline(sizes: Sizes, directory: str) -> List[Result]:
+    dim = max(sizes.dims)
+    targets = []
+    for seed, collection in enumerate(("tickers", "articles")):
+        build_synthetic_index(directory, "bench", collection, "content_embedding", sizes.index_size, dim, seed)
+        targets.append({
+            "backend": SearchBackend.LOCAL.value,
+            "local_path": directory,
+            "database_name": "bench",
+            "collection_name": collection,
+            "path": "content_embedding",
+            "index": "bench_index",
+            "num_candidates": SearchBalancer.DEFAULT_NUM_CANDIDATES,
+            "limit": SearchBalancer.DEFAULT_LIMIT,
+        })
+    builder = ContextBuilder(*targets, registry=TargetRegistry())
+    fields = {"_id": 1, "name": 1, "content": 1, "content_embedding": 1}
+    query = fake_embedding("query", dim)
+    params = {"targets": len(targets), "documents": sizes.index_size, "dim": dim}
+
+    results = [await measure_async("ContextBuilder.build", params, lambda: builder.build(query, fields), 10, sizes.repeat)]
+
+    async with FakeEmbeddingServer(dim=dim) as server:
+        embedder = VectorEmbeddingManager(api_url=server.url)
+        queries = (f"query {i}" for i in itertools.count())  # distinct queries: no cache, no coalescing
+
+        async def embed_and_build():
+            return await builder.build(await embedder.request(next(queries)), fields)
+
+        try:
+            results.append(await measure_async("embed+ContextBuilder.build", params, embed_and_build, 10, sizes.repeat))
+        finally:
+            await embedder.close()
+    return results
+
+
+def bench_pipeline(sizes: Sizes) -> Iterator[Result]:
+    with tempfile.TemporaryDirectory() as directory:
+        yield from asyncio.run(_bench_pipeline(sizes, directory))
+
+
+BENCHMARKS: Dict[str, Callable[[Sizes], Iterator[Result]]] = {
+    "filter": bench_filter,
+    "decode": bench_decode,
+    "flatten": bench_flatten,
+    "merge": bench_merge,
+    "constraints": bench_constraints,
+    "pipeline": bench_pipeline,
+}
+
+
+def result_key(result: Dict[str, Any]) -> str:
+    return result["name"] + json.dumps(result["params"], sort_keys=True)
+
+
+def compare(results: List[Dict[str, Any]], baseline: List[Dict[str, Any]], tolerance: float) -> List[Dict[str, Any]]:
+    """
+    Pairs each result with its baseline and returns the comparisons, flagging medians that grew by more
+    than `tolerance` (a fraction of the baseline median).
+    """
+    previous = {result_key(result): result for result in baseline if not result.get("skipped")}
+    comparisons = []
+    for result in results:
+        before = previous.get(result_key(result))
+        if result.get("skipped") or before is None:
+            continue
+        change = result["median"] / before["median"] - 1.0 if before["median"] else 0.0
+        comparisons.append({
+            "name": result["name"],
+            "params": result["params"],
+            "baseline_median": before["median"],
+            "median": result["median"],
+            "change": change,
+            "regression": change > tolerance,
+        })
+    return comparisons
+
+
+def format_seconds(seconds: float) -> str:
+    for unit, scale in (("s", 1.0), ("ms", 1e-3), ("us", 1e-6)):
+        if seconds >= scale:
+            return f"{seconds / scale:.3f} {unit}"
+    return f"{seconds / 1e-9:.1f} ns"
+
+
+def print_report(results: List[Dict[str, Any]], comparisons: List[Dict[str, Any]]):
+    changes = {result_key(c): c for c in comparisons}
+    for result in results:
+        label = f"{result['name']} {json.dumps(result['params'], sort_keys=True)}"
+        if result.get("skipped"):
+            print(f"{label:<75} skipped ({result['skipped']})", file=sys.stderr)
+            continue
+        line = f"{label:<75} median {format_seconds(result['median']):>12}  p95 {format_seconds(result['p95']):>12}"
+        change = changes.get(result_key(result))
+        if change is not None:
+            line += f"  {change['change']:+.1%}" + ("  REGRESSION" if change["regression"] else "")
+        print(line, file=sys.stderr)
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description="Offline microbenchmarks of the vector search pipeline.")
+    parser.add_argument("--only", nargs="+", choices=sorted(BENCHMARKS), help="Benchmark groups to run. Defaults to all.")
+    parser.add_argument("--quick", action="store_true", help="Smaller inputs and fewer samples, e.g. for CI smoke runs.")
+    parser.add_argument("--output", help="Writes the results as JSON to this file (default: stdout).")
+    parser.add_argument("--baseline", help="A previous JSON output to compare medians against.")
+    parser.add_argument("--tolerance", type=float, default=0.2, help="Allowed median slowdown versus the baseline. Defaults to 0.2 (20%%).")
+    args = parser.parse_args(argv)
+
+    sizes = Sizes.quick() if args.quick else Sizes()
+    results = [asdict(result) for group in (args.only or BENCHMARKS) for result in BENCHMARKS[group](sizes)]
+
+    comparisons = []
+    if args.baseline:
+        with open(args.baseline, encoding="utf-8") as f:
+            comparisons = compare(results, json.load(f)["results"], args.tolerance)
+    print_report(results, comparisons)
+
+    report = {
+        "meta": {
+            "python": platform.python_version(),
+            "numpy": np.__version__,
+            "machine": platform.machine(),
+            "timestamp": time.time(),
+            "quick": args.quick,
+        },
+        "results": results,
+        "comparisons": comparisons,
+    }
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            json.dump(report, f, indent=2)
+    else:
+        json.dump(report, sys.stdout, indent=2)
+        print()
+    return 1 if any(c["regression"] for c in comparisons) else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,114 @@
+"""
+Computes the target centroids used by query routing, and measures how much of the exact top `k` the routed
+targets keep and how many targets a query is searched on.
+
+Each target's local index is summarized by `--centroids` centroids (`builder.routing.compute_centroids`),
+written as an `.npz` file for `ROUTING_PATH`. Queries are stored vectors of every target plus noise; the
+exact top `k` over all targets is compared with the results of the targets each query is routed to.
+
+    python -m vector_search.bench.routing --output centroids.npz
+    python -m vector_search.bench.routing --local-path indexes --database market --output centroids.npz \\
+        --margins 0 0.02 0.05
+
+Without `--local-path`, every target gets a synthetic clustered index; real indexes come from
+`builder.local.export_collection`.
+"""
+import sys
+import json
+import heapq
+import argparse
+import platform
+import tempfile
+from typing import Any, Dict, List, Optional
+
+import numpy as np
+
+from vector_search.bench.fakes import build_synthetic_index
+from vector_search.bench.sweep import make_queries
+from vector_search.builder.local import LocalVectorSearchManager
+from vector_search.builder.routing import TargetRouter, compute_centroids
+from vector_search.calls.on_query import SEARCHED_TARGETS
+from vector_search.config.static import LocalIndexMode, RoutingBalancer, SearchBalancer
+
+
+def evaluate(router: TargetRouter, managers: Dict[str, LocalVectorSearchManager], queries: np.ndarray, k: int) -> Dict[str, float]:
+    """
+    Returns the mean share of the exact top `k` (over every target) found on the routed targets, and the
+    mean number of targets searched per query.
+    """
+    targets = [{"collection_name": collection} for collection in managers]
+    recalls, fan_out = [], []
+    for query in queries:
+        hits = [(score, collection) for collection, manager in managers.items() for _, score in manager.search(query)]
+        truth = [collection for _, collection in heapq.nlargest(k, hits)]
+        routed = {target["collection_name"] for target in router.route(targets, query)}
+        recalls.append(sum(collection in routed for collection in truth) / len(truth) if truth else 1.0)
+        fan_out.append(len(routed))
+    return {"recall": float(np.mean(recalls)), "targets": float(np.mean(fan_out))}
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description="Target centroids for query routing, and their recall/fan-out.")
+    parser.add_argument("--local-path", help="The directory of existing local indexes. Defaults to synthetic ones.")
+    parser.add_argument("--database", default="market")
+    parser.add_argument("--documents", type=int, default=10_000, help="Synthetic documents per target. Defaults to 10000.")
+    parser.add_argument("--dim", type=int, default=384, help="Synthetic embedding dimension. Defaults to 384.")
+    parser.add_argument("--clusters", type=int, default=16, help="Clusters of each synthetic index. Defaults to 16.")
+    parser.add_argument("--centroids", type=int, default=RoutingBalancer.CENTROIDS, help="Centroids per target.")
+    parser.add_argument("--queries", type=int, default=100, help="Queries per target. Defaults to 100.")
+    parser.add_argument("--noise", type=float, default=0.5, help="Relative noise added to the stored vectors used as queries.")
+    parser.add_argument("-k", type=int, default=SearchBalancer.STOP_INDEX, help="Recall is measured at k. Defaults to STOP_INDEX.")
+    parser.add_argument("--margins", type=float, nargs="+", default=[0.0, 0.01, RoutingBalancer.MARGIN, 0.05, 0.1])
+    parser.add_argument("--max-targets", type=int, default=RoutingBalancer.MAX_TARGETS)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--output", help="Writes the centroids to this `.npz` file, to be set as ROUTING_PATH.")
+    parser.add_argument("--report", help="Writes the results as JSON to this file (default: stdout).")
+    args = parser.parse_args(argv)
+
+    with tempfile.TemporaryDirectory() as directory:
+        managers: Dict[str, LocalVectorSearchManager] = {}
+        for seed, search_args in enumerate(SEARCHED_TARGETS, start=args.seed):
+            target = search_args.value
+            if args.local_path is None:
+                build_synthetic_index(directory, args.database, target["collection_name"], target["path"],
+                                      args.documents, args.dim, seed, args.clusters)
+            managers[target["collection_name"]] = LocalVectorSearchManager(
+                args.database, target["collection_name"], target["path"], target["index"], limit=args.k,
+                local_path=args.local_path or directory, local_mode=LocalIndexMode.EXACT.value
+            )
+
+        router = TargetRouter(max_targets=args.max_targets)
+        for collection, manager in managers.items():
+            router.set_centroids(collection, compute_centroids(manager.vectors, args.centroids, seed=args.seed))
+        queries = np.concatenate([
+            make_queries(manager.vectors, args.queries, args.noise, args.seed) for manager in managers.values()
+        ])
+
+        results: List[Dict[str, Any]] = []
+        for margin in sorted(args.margins):
+            router.margin = margin
+            results.append({"margin": margin, "max_targets": args.max_targets, **evaluate(router, managers, queries, args.k)})
+            print(f"margin {margin:.3f}  recall@{args.k} {results[-1]['recall']:.3f}  "
+                  f"targets per query {results[-1]['targets']:.2f} of {len(managers)}", file=sys.stderr)
+        documents = {collection: len(manager.vectors) for collection, manager in managers.items()}
+        for manager in managers.values():
+            manager.close()
+
+    if args.output:
+        router.save(args.output)
+    report = {
+        "meta": {"python": platform.python_version(), "numpy": np.__version__, "documents": documents, "k": args.k,
+                 "queries": len(queries), "centroids": args.centroids},
+        "results": results,
+    }
+    if args.report:
+        with open(args.report, "w", encoding="utf-8") as f:
+            json.dump(report, f, indent=2)
+    else:
+        json.dump(report, sys.stdout, indent=2)
+        print()
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,149 @@
+"""
+Cold-start benchmark: how long a fresh interpreter takes to import the search entry point and to be ready
+to serve (`startup()` done), and which modules the import pulls in.
+
+Each sample runs in a new process with `python -X importtime`, so nothing is cached in memory.
+
+    python -m vector_search.bench.startup --output startup.json
+    python -m vector_search.bench.startup --baseline startup.json
+
+Modules listed with `--forbid` (by default the heavy optional ones) must not be imported by the entry point,
+and the import must have no side effect: no file created in the working directory (such as the log file) and
+no thread started. The exit status is 1 if one of these fails, or if a median regressed beyond `--tolerance`
+of the baseline.
+"""
+import os
+import sys
+import json
+import argparse
+import tempfile
+import subprocess
+from dataclasses import asdict
+from typing import Dict, List, Optional, Tuple
+
+import numpy as np
+
+from vector_search.bench.microbench import Result, compare, print_report
+
+DEFAULT_MODULE = "vector_search.calls.on_query"
+DEFAULT_FORBIDDEN = ("nltk", "sklearn", "scipy", "aiohttp", "dotenv")
+
+# Run in an empty working directory: what it holds afterwards was created by the import.
+_IMPORT = """
+import os, json, threading
+import {module}
+print(json.dumps({{"threads": [thread.name for thread in threading.enumerate()][1:], "files": sorted(os.listdir("."))}}))
+"""
+
+_READY = """
+import time
+start = time.perf_counter()
+import asyncio
+import {module} as entry
+
+async def main():
+    await entry.startup()
+    ready = time.perf_counter()
+    await entry.shutdown()
+    return ready
+
+print(asyncio.run(main()) - start)
+"""
+
+
+def parse_importtime(stderr: str) -> Dict[str, Tuple[int, int]]:
+    """Maps each imported module to its `(self, cumulative)` import time in microseconds."""
+    times = {}
+    for line in stderr.splitlines():
+        if not line.startswith("import time:") or "|" not in line:
+            continue
+        own, cumulative, name = (part.strip() for part in line[len("import time:"):].split("|"))
+        if own.isdigit():
+            times[name] = (int(own), int(cumulative))
+    return times
+
+
+def sample_import(module: str) -> Tuple[Dict[str, Tuple[int, int]], Dict[str, List[str]]]:
+    """
+    Returns the import times of `module` in a fresh process, and the threads started and files created by
+    the import.
+    """
+    # The entry point is imported from an empty directory, so the current one is put on the path.
+    env = dict(os.environ, PYTHONPATH=os.pathsep.join(filter(None, (os.getcwd(), os.environ.get("PYTHONPATH")))))
+    with tempfile.TemporaryDirectory() as directory:
+        completed = subprocess.run(
+            [sys.executable, "-X", "importtime", "-c", _IMPORT.format(module=module)],
+            capture_output=True, text=True, check=True, cwd=directory, env=env
+        )
+    return parse_importtime(completed.stderr), json.loads(completed.stdout.strip().splitlines()[-1])
+
+
+def sample_ready(module: str) -> float:
+    completed = subprocess.run([sys.executable, "-c", _READY.format(module=module)], capture_output=True, text=True, check=True)
+    return float(completed.stdout.strip().splitlines()[-1])
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description="Cold-start benchmark of the vector search entry point.")
+    parser.add_argument("--module", default=DEFAULT_MODULE, help=f"The module to import. Defaults to {DEFAULT_MODULE}.")
+    parser.add_argument("--repeat", type=int, default=5, help="Fresh processes per measurement. Defaults to 5.")
+    parser.add_argument("--top", type=int, default=15, help="The number of slowest imports listed. Defaults to 15.")
+    parser.add_argument("--forbid", nargs="*", default=list(DEFAULT_FORBIDDEN), help="Top-level modules the import must not load.")
+    parser.add_argument("--no-ready", action="store_true", help="Only measures the import, not `startup()`.")
+    parser.add_argument("--output", help="Writes the results as JSON to this file (default: stdout).")
+    parser.add_argument("--baseline", help="A previous JSON output to compare medians against.")
+    parser.add_argument("--tolerance", type=float, default=0.2, help="Allowed median slowdown versus the baseline. Defaults to 0.2 (20%%).")
+    args = parser.parse_args(argv)
+
+    samples, side_effects = zip(*(sample_import(args.module) for _ in range(args.repeat)))
+    threads = sorted({name for effects in side_effects for name in effects["threads"]})
+    files = sorted({name for effects in side_effects for name in effects["files"]})
+    totals = [times[args.module][1] / 1e6 for times in samples]
+    results = [Result.from_samples("import", {"module": args.module}, 1, totals)]
+    if not args.no_ready:
+        ready = [sample_ready(args.module) for _ in range(args.repeat)]
+        results.append(Result.from_samples("import+startup", {"module": args.module}, 1, ready))
+    results = [asdict(result) for result in results]
+
+    # The slowest imports by cumulative time, as the median over the samples.
+    names = set.intersection(*(set(times) for times in samples))
+    cumulative = {name: float(np.median([times[name][1] for times in samples])) / 1e6 for name in names}
+    slowest = sorted(cumulative.items(), key=lambda item: -item[1])[:args.top]
+    loaded = sorted({name.split(".")[0] for name in names})
+    forbidden = sorted(set(args.forbid) & set(loaded))
+
+    comparisons = []
+    if args.baseline:
+        with open(args.baseline, encoding="utf-8") as f:
+            comparisons = compare(results, json.load(f)["results"], args.tolerance)
+    print_report(results, comparisons)
+    for name, seconds in slowest:
+        print(f"  {seconds * 1000:9.1f} ms  {name}", file=sys.stderr)
+    if forbidden:
+        print(f"Forbidden modules imported: {', '.join(forbidden)}", file=sys.stderr)
+    if threads:
+        print(f"Threads started by the import: {', '.join(threads)}", file=sys.stderr)
+    if files:
+        print(f"Files created by the import: {', '.join(files)}", file=sys.stderr)
+
+    report = {
+        "meta": {"python": sys.version.split()[0], "module": args.module, "repeat": args.repeat},
+        "results": results,
+        "comparisons": comparisons,
+        "slowest_imports": [{"module": name, "cumulative": seconds} for name, seconds in slowest],
+        "top_level_modules": loaded,
+        "forbidden_imported": forbidden,
+        "import_threads": threads,
+        "import_files": files,
+    }
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            json.dump(report, f, indent=2)
+    else:
+        json.dump(report, sys.stdout, indent=2)
+        print()
+    return 1 if forbidden or threads or files or any(c["regression"] for c in comparisons) else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
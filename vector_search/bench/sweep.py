@@ -0,0 +1,149 @@
+"""
+Offline recall/latency sweep of `num_candidates` and `limit` against a local index.
+
+Every (limit, num_candidates) pair is run on an approximate (IVF) `LocalVectorSearchManager` and its top `k`
+compared with the exact top `k` of the same index, giving recall@k and the search latency. The cheapest pair
+reaching `--target-recall` within `--latency-budget` is recommended; the output can seed the online tuner
+(`TUNING_PATH`, see `builder.tuning.AdaptiveTuner.load`).
+
+    python -m vector_search.bench.sweep --documents 50000 --output sweep.json
+    python -m vector_search.bench.sweep --local-path indexes --database market --collection articles \\
+        --path content_embedding --output sweep.json
+
+Latencies are those of the in-process index: they rank the pairs, but Atlas' own latency is only known
+online, which is what the tuner's latency budget applies to. Queries are stored vectors plus noise.
+"""
+import sys
+import json
+import math
+import time
+import argparse
+import platform
+import tempfile
+from dataclasses import dataclass, asdict
+from typing import Any, Dict, List, Optional
+
+import numpy as np
+
+from vector_search.bench.fakes import build_synthetic_index
+from vector_search.builder.local import LocalVectorSearchManager
+from vector_search.config.static import LocalIndexMode, SearchBalancer, TuningBalancer
+
+
+@dataclass
+class SweepPoint:
+    limit: int
+    num_candidates: int
+    recall: float
+    # Seconds per search
+    median: float
+    p95: float
+
+    @property
+    def candidate_ratio(self) -> float:
+        return self.num_candidates / self.limit
+
+
+def make_queries(vectors: np.ndarray, n: int, noise: float, seed: int = 0) -> np.ndarray:
+    """Returns `n` queries near stored vectors: a random row plus Gaussian noise of relative scale `noise`."""
+    rng = np.random.default_rng(seed)
+    rows = np.asarray(vectors[rng.integers(len(vectors), size=n)], dtype=np.float32)
+    rows /= np.linalg.norm(rows, axis=1, keepdims=True).clip(min=1e-12)
+    queries = rows + noise * rng.standard_normal(rows.shape).astype(np.float32) / np.sqrt(rows.shape[1])
+    return queries / np.linalg.norm(queries, axis=1, keepdims=True)
+
+
+def ground_truth(exact: LocalVectorSearchManager, queries: np.ndarray, k: int) -> List[set]:
+    exact.limit = k
+    return [{row for row, _ in exact.search(query)} for query in queries]
+
+
+def sweep(ivf: LocalVectorSearchManager, queries: np.ndarray, truth: List[set], k: int, limits: List[int], ratios: List[float]) -> List[SweepPoint]:
+    points = []
+    for limit in limits:
+        for ratio in ratios:
+            ivf.limit, ivf.num_candidates = limit, max(limit, math.ceil(limit * ratio))
+            recalls, latencies = [], []
+            for query, expected in zip(queries, truth):
+                start = time.perf_counter()
+                hits = ivf.search(query)
+                latencies.append(time.perf_counter() - start)
+                recalls.append(len({row for row, _ in hits[:k]} & expected) / len(expected) if expected else 1.0)
+            points.append(SweepPoint(limit, ivf.num_candidates, float(np.mean(recalls)),
+                                     float(np.median(latencies)), float(np.percentile(latencies, 95))))
+    return points
+
+
+def recommend(points: List[SweepPoint], target_recall: float, latency_budget: float) -> SweepPoint:
+    """
+    The fastest point (by p95, then fewest candidates) reaching `target_recall` within `latency_budget`;
+    the best recall if none does.
+    """
+    eligible = [point for point in points if point.recall >= target_recall and point.p95 <= latency_budget]
+    if not eligible:
+        return max(points, key=lambda point: (point.recall, -point.p95))
+    return min(eligible, key=lambda point: (point.p95, point.num_candidates))
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description="Recall/latency sweep of num_candidates and limit on a local index.")
+    parser.add_argument("--local-path", help="The directory of an existing local index (see `export_collection`). "
+                                             "Defaults to a synthetic index.")
+    parser.add_argument("--database", default="bench")
+    parser.add_argument("--collection", default="articles", help="The collection swept, also the key of the recommendation.")
+    parser.add_argument("--path", default="content_embedding", help="The vector field of the index.")
+    parser.add_argument("--documents", type=int, default=20_000, help="Synthetic documents. Defaults to 20000.")
+    parser.add_argument("--dim", type=int, default=384, help="Synthetic embedding dimension. Defaults to 384.")
+    parser.add_argument("--clusters", type=int, default=64, help="Clusters of the synthetic embeddings. Defaults to 64.")
+    parser.add_argument("--queries", type=int, default=200, help="Queries per point. Defaults to 200.")
+    parser.add_argument("--noise", type=float, default=0.5, help="Relative noise added to the stored vectors used as queries.")
+    parser.add_argument("-k", type=int, default=SearchBalancer.STOP_INDEX, help="Recall is measured at k. Defaults to STOP_INDEX.")
+    parser.add_argument("--limits", type=int, nargs="+", default=[8, 16, 32, 64, 128])
+    parser.add_argument("--ratios", type=float, nargs="+", default=[1, 2, 5, 10, 20, 50])
+    parser.add_argument("--target-recall", type=float, default=TuningBalancer.TARGET_RECALL)
+    parser.add_argument("--latency-budget", type=float, default=TuningBalancer.LATENCY_BUDGET, help="Seconds, at p95.")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--output", help="Writes the results as JSON to this file (default: stdout).")
+    args = parser.parse_args(argv)
+
+    with tempfile.TemporaryDirectory() as directory:
+        if args.local_path is None:
+            build_synthetic_index(directory, args.database, args.collection, args.path, args.documents, args.dim, args.seed, args.clusters)
+        location = dict(database_name=args.database, collection_name=args.collection, path=args.path, index="sweep",
+                        local_path=args.local_path or directory)
+        exact = LocalVectorSearchManager(**location, local_mode=LocalIndexMode.EXACT.value)
+        ivf = LocalVectorSearchManager(**location, local_mode=LocalIndexMode.IVF.value)
+        ivf.prepare()  # the index build is not part of the timed searches
+
+        queries = make_queries(exact.vectors, args.queries, args.noise, args.seed)
+        truth = ground_truth(exact, queries, args.k)
+        points = sweep(ivf, queries, truth, args.k, sorted(args.limits), sorted(args.ratios))
+        documents = len(exact.vectors)
+        exact.close()
+        ivf.close()
+
+    best = recommend(points, args.target_recall, args.latency_budget)
+    for point in points:
+        marker = "  <- recommended" if point is best else ""
+        print(f"limit {point.limit:>5} num_candidates {point.num_candidates:>6}  recall@{args.k} {point.recall:.3f}  "
+              f"median {point.median * 1000:8.3f} ms  p95 {point.p95 * 1000:8.3f} ms{marker}", file=sys.stderr)
+
+    report: Dict[str, Any] = {
+        "meta": {"python": platform.python_version(), "numpy": np.__version__, "documents": documents, "k": args.k,
+                 "queries": args.queries, "target_recall": args.target_recall, "latency_budget": args.latency_budget},
+        "results": [asdict(point) | {"candidate_ratio": point.candidate_ratio} for point in points],
+        "recommendations": {
+            args.collection: asdict(best) | {"candidate_ratio": best.candidate_ratio}
+        },
+    }
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            json.dump(report, f, indent=2)
+    else:
+        json.dump(report, sys.stdout, indent=2)
+        print()
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
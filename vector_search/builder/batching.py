@@ -0,0 +1,96 @@
+import asyncio
+from typing import Awaitable, Callable, Dict, List, Optional, Set, Tuple
+
+from vector_search.config.static import EmbeddingBalancer
+
+
+class EmbeddingCoalescer:
+    """
+    A class for coalescing concurrent single-query embedding requests into batched API calls.
+
+    Queries submitted within `max_delay` seconds of each other (or until `max_batch_size` queries are
+    pending) are sent as one payload, and each caller receives its own vector back.
+    """
+    def __init__(self,
+        send: Callable[[List[str]], Awaitable[List[List[float]]]],
+        max_batch_size: int = EmbeddingBalancer.COALESCE_MAX_BATCH_SIZE,
+        max_delay: float = EmbeddingBalancer.COALESCE_MAX_DELAY
+        ):
+        """
+        Initializes the EmbeddingCoalescer class.
+
+        Args:
+            send (Callable): Coroutine function embedding a list of inputs, returning vectors in input order.
+            max_batch_size (int, optional): The number of pending queries that triggers an immediate flush.
+            max_delay (float, optional): The maximum time, in seconds, a query waits for companions.
+        """
+        self.send = send
+        self.max_batch_size = max_batch_size
+        self.max_delay = max_delay
+        self._pending: List[Tuple[str, asyncio.Future]] = []
+        self._timer: Optional[asyncio.TimerHandle] = None
+        self._in_flight: Set[asyncio.Task] = set()
+
+    async def submit(self, query: str) -> List[float]:
+        """
+        Queues a query for the next batch and waits for its embedding.
+
+        Args:
+            query (str): The input query for which the embedding needs to be obtained.
+
+        Returns:
+            list: The vector embedding for the input query.
+        """
+        loop = asyncio.get_running_loop()
+        future = loop.create_future()
+        self._pending.append((query, future))
+
+        if len(self._pending) >= self.max_batch_size:
+            self._flush()
+        elif self._timer is None:
+            self._timer = loop.call_later(self.max_delay, self._flush)
+
+        return await future
+
+    def _flush(self):
+        if self._timer is not None:
+            self._timer.cancel()
+            self._timer = None
+        if not self._pending:
+            return
+
+        batch, self._pending = self._pending, []
+        task = asyncio.get_running_loop().create_task(self._send_batch(batch))
+        self._in_flight.add(task)
+        task.add_done_callback(self._in_flight.discard)
+
+    async def _send_batch(self, batch: List[Tuple[str, asyncio.Future]]):
+        # Identical queries within a batch are only sent once.
+        positions: Dict[str, int] = {}
+        for query, _ in batch:
+            positions.setdefault(query, len(positions))
+
+        try:
+            vectors = await self.send(list(positions))
+        except Exception as e:
+            for _, future in batch:
+                if not future.done():
+                    future.set_exception(e)
+            return
+        except BaseException:
+            # Cancelled (e.g. on shutdown): the callers are cancelled too rather than left waiting forever.
+            for _, future in batch:
+                future.cancel()
+            raise
+
+        for query, future in batch:
+            if not future.done():
+                future.set_result(vectors[positions[query]])
+
+    async def close(self):
+        """
+        Sends any pending queries and waits for in-flight batches to complete.
+        """
+        self._flush()
+        if self._in_flight:
+            await asyncio.gather(*self._in_flight, return_exceptions=True)
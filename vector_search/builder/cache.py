@@ -0,0 +1,450 @@
+import re
+import sys
+import copy
+import asyncio
+import time
+import sqlite3
+import threading
+from array import array
+from pathlib import Path
+from dataclasses import dataclass
+from collections import OrderedDict
+from typing import Any, Dict, Hashable, Iterable, Optional, List, Sequence, Tuple, FrozenSet
+
+import numpy as np
+
+from vector_search.config.static import CacheBalancer
+
+
+_WHITESPACE = re.compile(r"\s+")
+
+
+def normalize_query(text: str) -> str:
+    """
+    Normalizes a query so that trivially different spellings share a cache entry.
+
+    Casing, surrounding/repeated whitespace and trailing punctuation are ignored.
+    """
+    return _WHITESPACE.sub(" ", text).strip().rstrip("?!.").strip().lower()
+
+
+def make_key(model: str, query: str) -> str:
+    return f"{model}:{normalize_query(query)}"
+
+
+@dataclass
+class CacheStats:
+    hits: int = 0
+    misses: int = 0
+    evictions: int = 0
+
+    @property
+    def hit_rate(self) -> float:
+        total = self.hits + self.misses
+        return self.hits / total if total else 0.0
+
+
+class MemoryEmbeddingCache:
+    """
+    An in-memory LRU cache of embeddings with a time-to-live per entry.
+    """
+    def __init__(self, max_size: int = CacheBalancer.MEMORY_MAX_SIZE, ttl: Optional[float] = CacheBalancer.MEMORY_TTL):
+        """
+        Initializes the MemoryEmbeddingCache class.
+
+        Args:
+            max_size (int, optional): The maximum number of embeddings to keep. Defaults to 4096.
+            ttl (Optional[float], optional): Seconds after which an entry expires. `None` disables expiry.
+        """
+        self.max_size = max_size
+        self.ttl = ttl
+        self.stats = CacheStats()
+        self._entries: "OrderedDict[str, Tuple[float, List[float]]]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def get(self, key: str) -> Optional[List[float]]:
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                self.stats.misses += 1
+                return None
+            expires_at, embedding = entry
+            if expires_at < time.monotonic():
+                del self._entries[key]
+                self.stats.evictions += 1
+                self.stats.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.stats.hits += 1
+            return embedding
+
+    def set(self, key: str, embedding: List[float]) -> None:
+        expires_at = time.monotonic() + self.ttl if self.ttl is not None else float("inf")
+        with self._lock:
+            self._entries[key] = (expires_at, embedding)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_size:
+                self._entries.popitem(last=False)
+                self.stats.evictions += 1
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+
+
+class DiskEmbeddingCache:
+    """
+    A persistent embedding cache backed by a SQLite file.
+
+    Embeddings are stored as packed doubles so that a hit returns exactly what the API returned.
+    Reads never write: hits are recorded in memory and their access times written `touch_batch` at a time
+    (or with the next insert), so eviction is an approximate LRU. The row count is kept in memory too.
+    Calls block on SQLite; `EmbeddingCache` runs them in an executor when used from the event loop.
+    """
+    def __init__(self, path: str, max_size: int = CacheBalancer.DISK_MAX_SIZE, ttl: Optional[float] = CacheBalancer.DISK_TTL, touch_batch: int = CacheBalancer.DISK_TOUCH_BATCH):
+        """
+        Initializes the DiskEmbeddingCache class.
+
+        Args:
+            path (str): The path of the SQLite file. Parent directories are created if needed.
+            max_size (int, optional): The maximum number of embeddings to keep. Defaults to 100 000.
+            ttl (Optional[float], optional): Seconds after which an entry expires. `None` disables expiry.
+            touch_batch (int, optional): The number of pending access times that triggers a write. Defaults to 256.
+        """
+        self.path = Path(path)
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self.max_size = max_size
+        self.ttl = ttl
+        self.touch_batch = touch_batch
+        self.stats = CacheStats()
+        self._lock = threading.Lock()
+        # Access times of the hits not written yet
+        self._touched: Dict[str, float] = {}
+        self._conn = sqlite3.connect(str(self.path), check_same_thread=False)
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS embeddings ("
+            "key TEXT PRIMARY KEY, embedding BLOB NOT NULL, created REAL NOT NULL, accessed REAL NOT NULL)"
+        )
+        self._conn.execute("CREATE INDEX IF NOT EXISTS embeddings_accessed ON embeddings (accessed)")
+        self._conn.commit()
+        self._count = self._conn.execute("SELECT COUNT(*) FROM embeddings").fetchone()[0]
+
+    def __len__(self) -> int:
+        return self._count
+
+    def _write_touches(self) -> None:
+        if self._touched:
+            self._conn.executemany("UPDATE embeddings SET accessed = ? WHERE key = ?",
+                                   [(accessed, key) for key, accessed in self._touched.items()])
+            self._touched.clear()
+
+    def get(self, key: str) -> Optional[List[float]]:
+        now = time.time()
+        with self._lock:
+            row = self._conn.execute("SELECT embedding, created FROM embeddings WHERE key = ?", (key,)).fetchone()
+            if row is None:
+                self.stats.misses += 1
+                return None
+            blob, created = row
+            if self.ttl is not None and created + self.ttl < now:
+                # Left in place: the fresh embedding fetched after this miss replaces it.
+                self.stats.misses += 1
+                return None
+            self._touched[key] = now
+            if len(self._touched) >= self.touch_batch:
+                self._write_touches()
+                self._conn.commit()
+            self.stats.hits += 1
+        return array("d", blob).tolist()
+
+    def set(self, key: str, embedding: List[float]) -> None:
+        now = time.time()
+        blob = array("d", embedding).tobytes()
+        with self._lock:
+            exists = self._conn.execute("SELECT 1 FROM embeddings WHERE key = ?", (key,)).fetchone() is not None
+            self._conn.execute(
+                "INSERT OR REPLACE INTO embeddings (key, embedding, created, accessed) VALUES (?, ?, ?, ?)",
+                (key, blob, now, now)
+            )
+            self._touched.pop(key, None)
+            self._count += not exists
+            overflow = self._count - self.max_size
+            if overflow > 0:
+                # Eviction goes by access time: pending touches are written first.
+                self._write_touches()
+                deleted = self._conn.execute(
+                    "DELETE FROM embeddings WHERE key IN (SELECT key FROM embeddings ORDER BY accessed LIMIT ?)",
+                    (overflow,)
+                ).rowcount
+                self._count -= deleted
+                self.stats.evictions += deleted
+            self._conn.commit()
+
+    def flush(self) -> None:
+        """Writes the pending access times."""
+        with self._lock:
+            self._write_touches()
+            self._conn.commit()
+
+    def clear(self) -> None:
+        with self._lock:
+            self._conn.execute("DELETE FROM embeddings")
+            self._conn.commit()
+            self._touched.clear()
+            self._count = 0
+
+    def close(self) -> None:
+        with self._lock:
+            self._write_touches()
+            self._conn.commit()
+            self._conn.close()
+
+
+class EmbeddingCache:
+    """
+    A two-tier embedding cache: an in-memory LRU in front of an optional on-disk store.
+
+    Entries are keyed by model name and normalized query text. Disk hits are promoted to memory.
+    From the event loop, use `aget_many`/`aset_many`: memory is consulted inline and the disk tier, which
+    blocks on SQLite, in the default executor.
+    """
+    def __init__(self, memory: Optional[MemoryEmbeddingCache] = None, disk: Optional[DiskEmbeddingCache] = None):
+        """
+        Initializes the EmbeddingCache class.
+
+        Args:
+            memory (Optional[MemoryEmbeddingCache], optional): The in-memory tier. Defaults to a `MemoryEmbeddingCache` with default settings.
+            disk (Optional[DiskEmbeddingCache], optional): The persistent tier. Defaults to None (memory only).
+        """
+        self.memory = memory if memory is not None else MemoryEmbeddingCache()
+        self.disk = disk
+        self.stats = CacheStats()
+
+    @classmethod
+    def from_path(cls, disk_path: Optional[str] = None) -> "EmbeddingCache":
+        """Builds a cache with default tier settings and a disk tier at `disk_path` if one is given."""
+        return cls(disk=DiskEmbeddingCache(disk_path) if disk_path else None)
+
+    def get(self, model: str, query: str) -> Optional[List[float]]:
+        key = make_key(model, query)
+        embedding = self.memory.get(key)
+        if embedding is None and self.disk is not None:
+            embedding = self.disk.get(key)
+            if embedding is not None:
+                self.memory.set(key, embedding)
+        if embedding is None:
+            self.stats.misses += 1
+        else:
+            self.stats.hits += 1
+        return embedding
+
+    def set(self, model: str, query: str, embedding: List[float]) -> None:
+        key = make_key(model, query)
+        self.memory.set(key, embedding)
+        if self.disk is not None:
+            self.disk.set(key, embedding)
+
+    async def aget_many(self, model: str, queries: Sequence[str]) -> List[Optional[List[float]]]:
+        """Async counterpart of `get` for several queries, with a single executor hop for the disk lookups."""
+        keys = [make_key(model, query) for query in queries]
+        embeddings = [self.memory.get(key) for key in keys]
+        missing = [i for i, embedding in enumerate(embeddings) if embedding is None]
+        if missing and self.disk is not None:
+            found = await asyncio.get_running_loop().run_in_executor(None, lambda: [self.disk.get(keys[i]) for i in missing])
+            for i, embedding in zip(missing, found):
+                if embedding is not None:
+                    self.memory.set(keys[i], embedding)
+                    embeddings[i] = embedding
+        hits = sum(embedding is not None for embedding in embeddings)
+        self.stats.hits += hits
+        self.stats.misses += len(embeddings) - hits
+        return embeddings
+
+    async def aset_many(self, model: str, items: Sequence[Tuple[str, List[float]]]) -> None:
+        """Async counterpart of `set` for several `(query, embedding)` pairs."""
+        keyed = [(make_key(model, query), embedding) for query, embedding in items]
+        for key, embedding in keyed:
+            self.memory.set(key, embedding)
+        if keyed and self.disk is not None:
+            await asyncio.get_running_loop().run_in_executor(None, lambda: [self.disk.set(key, embedding) for key, embedding in keyed])
+
+    def clear(self) -> None:
+        self.memory.clear()
+        if self.disk is not None:
+            self.disk.clear()
+
+    def flush(self) -> None:
+        """Writes what the disk tier holds back (see `DiskEmbeddingCache.flush`)."""
+        if self.disk is not None:
+            self.disk.flush()
+
+    def close(self) -> None:
+        if self.disk is not None:
+            self.disk.close()
+
+
+def _estimate_size(obj: Any) -> int:
+    """Roughly estimates the memory held by a search result (nested dicts, lists and scalars)."""
+    if isinstance(obj, dict):
+        return sys.getsizeof(obj) + sum(_estimate_size(k) + _estimate_size(v) for k, v in obj.items())
+    if isinstance(obj, (list, tuple)):
+        return sys.getsizeof(obj) + sum(_estimate_size(v) for v in obj)
+    return sys.getsizeof(obj)
+
+
+@dataclass
+class SemanticEntry:
+    result: Any
+    collections: FrozenSet[str]
+    size: int
+    key: Hashable = None
+
+
+class SemanticResultCache:
+    """
+    A cache of final search results indexed by their query embedding.
+
+    A lookup returns the result of the most similar cached query when its cosine similarity reaches
+    `similarity`, so that paraphrased questions are answered without searching again. Query vectors are
+    kept normalized in one preallocated matrix and compared with a single matrix-vector product.
+    Embeddings of queries differing only by a name (e.g. a ticker) can be that similar: only entries cached
+    under the same `key` (such as the query's extracted symbols) are hits. Results are copied in and out,
+    so that callers cannot alter them.
+    Entries expire after `ttl` seconds and the least recently used ones are evicted when either
+    `max_entries` or `max_bytes` is exceeded.
+    """
+    def __init__(self,
+        similarity: float = CacheBalancer.SEMANTIC_SIMILARITY,
+        max_entries: int = CacheBalancer.SEMANTIC_MAX_ENTRIES,
+        max_bytes: int = CacheBalancer.SEMANTIC_MAX_BYTES,
+        ttl: Optional[float] = CacheBalancer.SEMANTIC_TTL
+        ):
+        """
+        Initializes the SemanticResultCache class.
+
+        Args:
+            similarity (float, optional): The minimum cosine similarity between queries for a hit. Defaults to 0.95.
+            max_entries (int, optional): The maximum number of cached results. Defaults to 4096.
+            max_bytes (int, optional): The approximate memory budget of vectors and results. Defaults to 64 MiB.
+            ttl (Optional[float], optional): Seconds after which an entry expires. `None` disables expiry.
+        """
+        self.similarity = similarity
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.ttl = ttl
+        self.stats = CacheStats()
+        self.size = 0
+
+        self._vectors: Optional[np.ndarray] = None  # allocated once the dimension is known
+        self._expires = np.full(max_entries, -np.inf)
+        self._last_used = np.zeros(max_entries, dtype=np.int64)
+        self._keys = np.zeros(max_entries, dtype=np.int64)  # hashes of the entries' keys
+        self._entries: List[Optional[SemanticEntry]] = [None] * max_entries
+        self._clock = 0
+        self._lock = threading.Lock()
+
+    def __len__(self) -> int:
+        return sum(entry is not None for entry in self._entries)
+
+    @staticmethod
+    def _normalize(embedding) -> np.ndarray:
+        vector = np.array(embedding, dtype=np.float32).ravel()
+        return vector / max(float(np.linalg.norm(vector)), 1e-12)
+
+    def _tick(self) -> int:
+        self._clock += 1
+        return self._clock
+
+    def _remove(self, slot: int):
+        entry = self._entries[slot]
+        if entry is not None:
+            self.size -= entry.size
+            self._entries[slot] = None
+            self._expires[slot] = -np.inf
+
+    def get(self, embedding, key: Hashable = None) -> Optional[Any]:
+        """
+        Returns the cached result of the most similar query cached under `key`, or None if no such query is
+        similar enough.
+        """
+        with self._lock:
+            if self._vectors is None:
+                self.stats.misses += 1
+                return None
+
+            query = self._normalize(embedding)
+            similarities = self._vectors @ query
+            similarities[self._expires < time.monotonic()] = -np.inf
+            similarities[self._keys != hash(key)] = -np.inf
+            slot = int(np.argmax(similarities))
+            if similarities[slot] < self.similarity or self._entries[slot].key != key:
+                self.stats.misses += 1
+                return None
+
+            self._last_used[slot] = self._tick()
+            self.stats.hits += 1
+            result = self._entries[slot].result
+        return copy.deepcopy(result)
+
+    def set(self, embedding, result: Any, collections: Iterable[str] = (), key: Hashable = None) -> None:
+        """
+        Caches a result under its query embedding.
+
+        Args:
+            embedding: The query embedding.
+            result (Any): The final search result.
+            collections (Iterable[str], optional): The collections the result was built from, used by `invalidate`.
+            key (Hashable, optional): What a query must also match to be answered with this result (see `get`).
+        """
+        vector = self._normalize(embedding)
+        result = copy.deepcopy(result)
+        entry = SemanticEntry(result, frozenset(collections), vector.nbytes + _estimate_size(result), key)
+        if entry.size > self.max_bytes:
+            return
+
+        with self._lock:
+            if self._vectors is None:
+                self._vectors = np.zeros((self.max_entries, vector.shape[0]), dtype=np.float32)
+
+            now = time.monotonic()
+            for slot in np.flatnonzero(self._expires < now):
+                if self._entries[slot] is not None:
+                    self._remove(slot)
+                    self.stats.evictions += 1
+
+            free = [slot for slot, e in enumerate(self._entries) if e is None]
+            while not free or self.size + entry.size > self.max_bytes:
+                used = np.flatnonzero(self._expires > -np.inf)
+                victim = int(used[np.argmin(self._last_used[used])])
+                self._remove(victim)
+                self.stats.evictions += 1
+                free = free or [victim]
+
+            slot = free[0]
+            self._vectors[slot] = vector
+            self._expires[slot] = now + self.ttl if self.ttl is not None else np.inf
+            self._last_used[slot] = self._tick()
+            self._keys[slot] = hash(key)
+            self._entries[slot] = entry
+            self.size += entry.size
+
+    def invalidate(self, collection: Optional[str] = None) -> int:
+        """
+        Drops the results built from `collection`, e.g. after it was updated. Drops everything if None.
+
+        Returns:
+            int: The number of entries dropped.
+        """
+        with self._lock:
+            dropped = 0
+            for slot, entry in enumerate(self._entries):
+                if entry is not None and (collection is None or collection in entry.collections):
+                    self._remove(slot)
+                    dropped += 1
+            return dropped
+
+    def clear(self) -> None:
+        self.invalidate()
@@ -1,80 +1,384 @@
+import time
 import asyncio
 import numpy as np
-import concurrent.futures as cf
-from dataclasses import dataclass
-from typing import Dict, Any, List, Union
+from dataclasses import dataclass, field
+from typing import Dict, Any, List, Union, Optional, ClassVar, Tuple, AsyncIterator, Awaitable, Callable
 
-from sklearn.metrics.pairwise import cosine_similarity
+from vector_search.builder.decode import DecodedBatch
+from vector_search.builder.registry import TargetRegistry, default_registry
+from vector_search.builder.retry import RetryPolicy, default_policy
+from vector_search.builder.routing import TargetRouter
+from vector_search.builder.tuning import AdaptiveTuner
+from vector_search.utils.metrics import TARGET_SECONDS, RETRIES, HEDGES, TARGET_FAILURES
 
-from vector_search.builder.serach import VectorSearchManager
+
+@dataclass
+class TargetOutcome:
+    """
+    The outcome of searching one target: its results, or the error it was given up on.
+    """
+    target: Dict[str, Any]
+    results: List[Dict] = field(default_factory=list)
+    error: Optional[BaseException] = None
+
+    @property
+    def ok(self) -> bool:
+        return self.error is None
 
 
 class ContextBuilder:
     """
     A class for building context by executing vector search on multiple targets concurrently.
+
+    Each target is searched under the builder's `RetryPolicy`: attempts are bounded by a per-target timeout,
+    retried with jittered backoff on connection errors, optionally hedged, and all of them stop at the
+    query's deadline. A target that still fails contributes no results rather than failing the query.
+    With `decoded` set, targets return `DecodedBatch`es (embeddings decoded straight from raw BSON into a
+    float32 matrix) instead of lists of documents. With a `tuner`, each target is searched with the
+    `num_candidates` and `limit` it currently recommends, and reports its latency to it. `prefilters` maps
+    collection names to the `$vectorSearch.filter` of their searches (see `filters.prefilter`). With a
+    `router`, every search (retries and hedges included) waits for one of its concurrency slots.
     """
-    def __init__(self, *args: Dict[str, Any]):
+    def __init__(self, *args: Dict[str, Any], registry: Optional[TargetRegistry] = None, policy: Optional[RetryPolicy] = None, decoded: bool = False, tuner: Optional[AdaptiveTuner] = None, prefilters: Optional[Dict[str, Dict[str, Any]]] = None, router: Optional[TargetRouter] = None):
         self.targets = args
+        # Managers (and their clients) are kept warm in the registry across `build` calls.
+        self.registry = registry if registry is not None else default_registry
+        self.policy = policy if policy is not None else default_policy
+        self.decoded = decoded
+        self.tuner = tuner
+        self.prefilters = prefilters or {}
+        self.router = router
+
+    def deadline(self) -> float:
+        """Returns the event-loop time at which a query starting now must be answered."""
+        return asyncio.get_running_loop().time() + self.policy.deadline
 
-    async def build(self, embedding, fields: Dict[str, Any] = {}) -> List[List[Dict]]:
+    async def build(self, embedding, fields: Dict[str, Any] = {}, deadline: Optional[float] = None) -> List[List[Dict]]:
+        return self.collect(await self.build_outcomes(embedding, fields, deadline))
+
+    async def build_outcomes(self, embedding, fields: Dict[str, Any] = {}, deadline: Optional[float] = None) -> List[TargetOutcome]:
+        """
+        Searches every target concurrently and reports each one's outcome, in target order.
+
+        Args:
+            embedding: The query embedding.
+            fields (Dict[str, Any], optional): The projection of the search results.
+            deadline (Optional[float], optional): The event-loop time by which every search must be done.
+                Defaults to `policy.deadline` seconds from now.
+        """
+        deadline = deadline if deadline is not None else self.deadline()
         tasks = []
         for target in self.targets:
-            task = asyncio.create_task(self.vector_search_on_target(embedding, fields, target))
+            task = asyncio.create_task(self.target_outcome(embedding, fields, target, deadline))
             tasks.append(task)
-        results = await asyncio.gather(*tasks)
+        return await asyncio.gather(*tasks)
+
+    def collect(self, outcomes: List[TargetOutcome]) -> List[List[Dict]]:
+        """
+        Returns the results of each target, `[]` for the targets given up on.
+
+        Raises:
+            BaseException: The first target's error if every target failed, or if any did and the policy
+                does not allow partial results.
+        """
+        failed = [outcome for outcome in outcomes if not outcome.ok]
+        if failed and (len(failed) == len(outcomes) or not self.policy.partial_results):
+            raise failed[0].error
+        return [outcome.results for outcome in outcomes]
+
+    async def build_stream(self, embedding, fields: Dict[str, Any] = {}, deadline: Optional[float] = None) -> AsyncIterator[Tuple[Dict[str, Any], List[Dict]]]:
+        """
+        Runs the searches concurrently and yields each target's results as soon as they arrive.
+
+        Targets given up on are skipped (or raise, if the policy does not allow partial results).
+        Searches still in flight are cancelled if the consumer stops iterating early.
+
+        Yields:
+            Tuple[Dict[str, Any], List[Dict]]: The target and its search results, fastest target first.
+        """
+        deadline = deadline if deadline is not None else self.deadline()
+        tasks = [asyncio.create_task(self.target_outcome(embedding, fields, target, deadline)) for target in self.targets]
+        try:
+            for next_done in asyncio.as_completed(tasks):
+                outcome = await next_done
+                if outcome.ok:
+                    yield outcome.target, outcome.results
+                elif not self.policy.partial_results:
+                    raise outcome.error
+        finally:
+            for task in tasks:
+                task.cancel()
+
+    async def target_outcome(self, embedding, fields: Dict[str, Any], target: Dict[str, Any], deadline: float) -> TargetOutcome:
+        """
+        Searches one target under the retry policy, capturing the error it is given up on.
+        """
+        try:
+            return TargetOutcome(target, await self.search_target(embedding, fields, target, deadline))
+        except Exception as e:
+            TARGET_FAILURES.inc(collection=target.get("collection_name", "unknown"))
+            return TargetOutcome(target, error=e)
+
+    async def lexical_outcome(self, query: str, text_index: str, text_paths: List[str], fields: Dict[str, Any], target: Dict[str, Any], deadline: float) -> TargetOutcome:
+        """
+        Full-text counterpart of `target_outcome`: searches one target's text index under the retry policy
+        (without hedging), capturing the error it is given up on.
+        """
+        try:
+            results = await self.with_retries(
+                lambda until: self.lexical_search_on_target(query, text_index, text_paths, fields, target, until), target, deadline
+            )
+            return TargetOutcome(target, results)
+        except Exception as e:
+            TARGET_FAILURES.inc(collection=target.get("collection_name", "unknown"))
+            return TargetOutcome(target, error=e)
+
+    async def search_target(self, embedding, fields: Dict[str, Any], target: Dict[str, Any], deadline: float) -> List[Dict]:
+        """
+        Searches one target under the retry policy (see `with_retries`).
+        """
+        return await self.with_retries(lambda until: self.hedged_search(embedding, fields, target, until), target, deadline)
+
+    async def with_retries(self, attempt_search: Callable[[float], Awaitable[Any]], target: Dict[str, Any], deadline: float) -> Any:
+        """
+        Runs the search attempts made by `attempt_search`, each bounded by `policy.target_timeout`, retrying
+        retryable errors with jittered backoff until `policy.retries` retries are spent or the next attempt
+        could not start before `deadline`.
+
+        `attempt_search` is given the loop time its attempt is bounded by: `asyncio.wait_for` only gives up on
+        the awaitable, so the attempt sends what is left of it as the server-side time limit of its query
+        (see `max_time_ms`) for an abandoned query to stop on the server too.
+
+        Raises:
+            asyncio.TimeoutError: The deadline passed before an attempt succeeded.
+            Exception: The error of the last attempt.
+        """
+        loop = asyncio.get_running_loop()
+        collection = target.get("collection_name", "unknown")
+        attempt = 0
+        while True:
+            remaining = deadline - loop.time()
+            if remaining <= 0:
+                raise asyncio.TimeoutError(f"Deadline exceeded searching {collection}.")
+            timeout = min(self.policy.target_timeout, remaining)
+            try:
+                return await asyncio.wait_for(attempt_search(loop.time() + timeout), timeout)
+            except self.policy.errors:
+                attempt += 1
+                delay = self.policy.backoff(attempt)
+                if attempt > self.policy.retries or loop.time() + delay >= deadline:
+                    raise
+                RETRIES.inc(scope=collection)
+                await asyncio.sleep(delay)
+
+    def hedge_delay(self, collection: str) -> Optional[float]:
+        """
+        Returns how long to wait for a search of `collection` before sending a duplicate, or None not to hedge.
+        """
+        if not self.policy.hedge or TARGET_SECONDS.count(collection=collection) < self.policy.hedge_min_samples:
+            return None
+        return max(self.policy.hedge_min_delay, TARGET_SECONDS.quantile(self.policy.hedge_quantile, collection=collection))
+
+    async def hedged_search(self, embedding, fields: Dict[str, Any], target: Dict[str, Any], until: Optional[float] = None) -> List[Dict]:
+        """
+        Searches one target once. With hedging on, a duplicate search is sent if the first one has not answered
+        within the target's usual tail latency; the first success wins and the other search is cancelled.
+        """
+        collection = target.get("collection_name", "unknown")
+        delay = self.hedge_delay(collection)
+        if delay is None:
+            return await self.vector_search_on_target(embedding, fields, target, until)
+
+        first = asyncio.ensure_future(self.vector_search_on_target(embedding, fields, target, until))
+        pending = {first}
+        try:
+            done, _ = await asyncio.wait(pending, timeout=delay)
+            if not done:
+                HEDGES.inc(collection=collection)
+                pending.add(asyncio.ensure_future(self.vector_search_on_target(embedding, fields, target, until)))
+            while True:
+                done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+                for task in done:
+                    if task.exception() is None:
+                        return task.result()
+                if not pending:
+                    raise done.pop().exception()
+        finally:
+            for task in pending:
+                task.cancel()
+
+    async def vector_search_on_target(self, embedding, fields: Dict[str, Any] = {}, target: Dict[str, Any] = {}, until: Optional[float] = None) -> Union[List[Dict], DecodedBatch]:
+        if self.router is None:
+            return await self._vector_search_on_target(embedding, fields, target, until)
+        async with self.router.slot(target):
+            return await self._vector_search_on_target(embedding, fields, target, until)
+
+    async def _vector_search_on_target(self, embedding, fields: Dict[str, Any], target: Dict[str, Any], until: Optional[float]) -> Union[List[Dict], DecodedBatch]:
+        v = self.registry.get(target)
+        # Tuned parameters go with each request: managers are shared by every query of the process.
+        parameters = {"max_time_ms": max_time_ms(until)}
+        if self.tuner is not None:
+            tuned = self.tuner.parameters(target)
+            parameters.update(num_candidates=tuned.num_candidates, limit=tuned.limit)
+        # Only completed searches are timed: they feed the hedging delay and the tuner.
+        prefilter = self.prefilters.get(target.get("collection_name"))
+        start = time.perf_counter()
+        if self.decoded:
+            results = await v.request_decoded(embedding, Filter.EMBEDDING_FIELDS, prefilter, **parameters, **fields)
+        else:
+            results = await v.request(embedding, prefilter, **parameters, **fields)
+        elapsed = time.perf_counter() - start
+        TARGET_SECONDS.observe(elapsed, collection=target.get("collection_name", "unknown"))
+        if self.tuner is not None:
+            self.tuner.observe_latency(target, elapsed)
         return results
 
-    
-    async def vector_search_on_target(self, embedding, fields: Dict[str, Any] = {}, target: Dict[str, Any] = {}) -> List[Dict]:    
-        v = VectorSearchManager(**target)
-        return  await v.request(embedding, **fields)
+    async def lexical_search_on_target(self, query: str, text_index: str, text_paths: List[str], fields: Dict[str, Any] = {}, target: Dict[str, Any] = {}, until: Optional[float] = None) -> List[Dict]:
+        v = self.registry.get(target)
+        if self.router is None:
+            return await v.lexical_request(query, text_index, text_paths, max_time_ms=max_time_ms(until), **fields)
+        async with self.router.slot(target):
+            return await v.lexical_request(query, text_index, text_paths, max_time_ms=max_time_ms(until), **fields)
+
+
+def max_time_ms(until: Optional[float]) -> Optional[int]:
+    """
+    Returns the server-side time limit, in milliseconds, of a query that must be done by the loop time `until`
+    (at least 1 ms: a limit of 0 means none to MongoDB), or None without a bound.
+    """
+    if until is None:
+        return None
+    return max(1, int((until - asyncio.get_running_loop().time()) * 1000))
+
+
+def normalize_rows(matrix: np.ndarray) -> np.ndarray:
+    """L2-normalizes the rows of a float matrix in place, leaving all-zero rows untouched."""
+    norms = np.linalg.norm(matrix, axis=1, keepdims=True)
+    np.divide(matrix, norms, out=matrix, where=norms > 0)
+    return matrix
+
+
+def select_top(similarities: np.ndarray, threshold: float, top_k: Optional[int] = None) -> np.ndarray:
+    """
+    Returns the indices of the similarities at or above `threshold`, best first, capped at `top_k`.
+    """
+    keep = np.flatnonzero(similarities >= threshold)
+    if top_k is not None and len(keep) > top_k:
+        if top_k <= 0:
+            return keep[:0]
+        keep = keep[np.argpartition(-similarities[keep], top_k - 1)[:top_k]]
+    return keep[np.argsort(-similarities[keep], kind="stable")]
 
 
 @dataclass
 class Filter:
+    """
+    Re-scores context items against the query embedding and keeps the most similar ones.
+
+    All candidate embeddings are stacked once into a contiguous float32 matrix, the query and the rows
+    are L2-normalized, and the cosine similarities are computed with one matrix product per `batch_size`
+    rows. Items at or above `threshold` are returned best first, capped at `top_k` when it is set.
+    """
     query_embedding: Union[List, np.ndarray]
     ctx_items: List[Dict]
     threshold: float
     batch_size: int
+    top_k: Optional[int] = None
+    # Precomputed `(len(ctx_items), dim)` embeddings (see `DecodedBatch`), normalized in place; stacked from
+    # the items when None.
+    embeddings: Optional[np.ndarray] = field(default=None, repr=False)
+
+    EMBEDDING_FIELDS: ClassVar[Tuple[str, ...]] = (
+        "content_embedding",
+        "name_embedding",
+        "description_embedding",
+        "price_embedding"
+    )
+
+    @classmethod
+    def item_embedding(cls, item: Dict) -> Optional[Any]:
+        for name in cls.EMBEDDING_FIELDS:
+            embedding = item.get(name)
+            if embedding:
+                return embedding
+        return None
+
+    @classmethod
+    def stack_embeddings(cls, ctx_items: List[Dict], dim: int) -> np.ndarray:
+        """
+        Copies the items' embeddings into a preallocated `(len(ctx_items), dim)` float32 matrix
+        and L2-normalizes its rows in place. Items without an embedding keep a zero row, and therefore
+        a similarity of 0.
+        """
+        matrix = np.zeros((len(ctx_items), dim), dtype=np.float32)
+        for row, item in enumerate(ctx_items):
+            embedding = cls.item_embedding(item)
+            if embedding is not None:
+                matrix[row] = embedding
+        return normalize_rows(matrix)
+
+    def scores(self) -> np.ndarray:
+        query = normalize_rows(np.array(self.query_embedding, dtype=np.float32).reshape(1, -1))[0]
+        if self.embeddings is not None:
+            matrix = normalize_rows(np.ascontiguousarray(self.embeddings, dtype=np.float32))
+        else:
+            matrix = self.stack_embeddings(self.ctx_items, query.shape[0])
+
+        similarities = np.empty(len(self.ctx_items), dtype=np.float32)
+        for start in range(0, len(self.ctx_items), self.batch_size):
+            np.matmul(matrix[start:start + self.batch_size], query, out=similarities[start:start + self.batch_size])
+        return similarities
+
+    def select(self, similarities: np.ndarray) -> np.ndarray:
+        """
+        Returns the indices of the items to keep, best first.
+        """
+        return select_top(similarities, self.threshold, self.top_k)
+
+    @staticmethod
+    def to_result(item: Dict, score: float) -> Dict:
+        return {
+            "_id": item.get("_id"),
+            "description": item.get("description"),
+            "name": item.get("name"),
+            "price": item.get("price"),
+            "content": item.get("content") or item.get("contentStr"),
+            "score": score
+        }
+
+    def __call__(self) -> List[Dict]:
+        if not self.ctx_items:
+            return []
+        similarities = self.scores()
+        return [self.to_result(self.ctx_items[i], float(similarities[i])) for i in self.select(similarities)]
+
+
+def cosine_to_search_score(cosine: float) -> float:
+    """Maps a cosine similarity to Atlas' cosine `vectorSearchScore`, which lies in [0, 1]."""
+    return (1.0 + cosine) / 2.0
+
+
+def search_score_to_cosine(score: Union[float, np.ndarray]) -> Union[float, np.ndarray]:
+    """Maps Atlas' cosine `vectorSearchScore` back to a cosine similarity."""
+    return 2.0 * score - 1.0
+
+
+@dataclass
+class ScoreFilter(Filter):
+    """
+    Keeps the most similar context items using the score computed server-side by `$vectorSearch`.
+
+    Items are expected to carry `score_field`, projected with `SCORE_PROJECTION`, instead of their embeddings.
+    Scores are converted back to cosine similarities so that `threshold` and the returned scores mean the same
+    thing as with `Filter`.
+    """
+    query_embedding: Optional[Union[List, np.ndarray]] = None
+    ctx_items: List[Dict] = field(default_factory=list)
+    threshold: float = 0.0
+    batch_size: int = 0
+    top_k: Optional[int] = None
+    score_field: str = "score"
 
-    def process_batch(self, query_embedding: Union[List, np.ndarray], ctx_items: List[Dict], threshold: float) -> List[Dict]:
-            if isinstance(query_embedding, list):
-                query_embedding = np.array(query_embedding)
-                
-            ctx_embeddings = [
-                np.array(
-                    item.get("content_embedding") 
-                    or item.get("name_embedding") 
-                    or item.get("description_embedding") 
-                    or item.get("price_embedding")
-                ) for item in ctx_items
-            ]
-            
-            similarities = cosine_similarity(ctx_embeddings, query_embedding.reshape(1, -1)).flatten()
-
-            # Filter out the context items with similarity below the threshold
-            return [
-                    {
-                        "_id": item.get("_id"),
-                        "description": item.get("description"),
-                        "name": item.get("name"),
-                        "price": item.get("price"),
-                        "content": item.get("content") or item.get("contentStr"),
-                        "score": similarity
-                    } for item, similarity in zip(ctx_items, similarities) 
-                    if similarity >= threshold
-                ]
-    
-    def __call__(self):
-        with cf.ThreadPoolExecutor() as executor:
-            futures = []
-            # Iterate over the context items in batches
-            for batch in range(0, len(self.ctx_items), self.batch_size):
-                batch_items = self.ctx_items[batch:batch + self.batch_size]
-                # Submit each batch to the executor
-                future = executor.submit(self.process_batch, self.query_embedding, batch_items, self.threshold)
-                futures.append(future)
-
-            # Yield the results once futures complete
-            for future in cf.as_completed(futures):
-                yield future.result()
\ No newline at end of file
+    def scores(self) -> np.ndarray:
+        scores = np.fromiter((item.get(self.score_field, 0.0) for item in self.ctx_items), dtype=np.float64, count=len(self.ctx_items))
+        return search_score_to_cosine(scores)
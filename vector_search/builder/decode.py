@@ -0,0 +1,185 @@
+import struct
+from functools import lru_cache
+from dataclasses import dataclass
+from typing import Any, Iterable, Iterator, List, Mapping, Sequence, Tuple
+
+import numpy as np
+from bson.codec_options import CodecOptions
+from bson.raw_bson import RawBSONDocument
+
+# Documents are returned undecoded: fields are only decoded when accessed.
+RAW_CODEC_OPTIONS = CodecOptions(document_class=RawBSONDocument)
+
+_INT32 = struct.Struct("<i")
+
+BSON_DOUBLE = 0x01
+BSON_ARRAY = 0x04
+BSON_BINARY = 0x05
+BINARY_VECTOR_SUBTYPE = 9
+VECTOR_FLOAT32 = 0x27
+VECTOR_INT8 = 0x03
+
+# Value sizes of the fixed-size BSON types.
+_FIXED_SIZES = {
+    0x01: 8, 0x06: 0, 0x07: 12, 0x08: 1, 0x09: 8, 0x0A: 0, 0x10: 4, 0x11: 8, 0x12: 8, 0x13: 16, 0x7F: 0, 0xFF: 0
+}
+
+
+def _elements(raw: bytes) -> Iterator[Tuple[bytes, int, int, int, int]]:
+    """
+    Walks the top-level elements of a BSON document, yielding `(name, type, start, value, end)` offsets.
+    """
+    pos, end = 4, len(raw) - 1
+    while pos < end:
+        kind = raw[pos]
+        key_end = raw.index(b"\x00", pos + 1)
+        value = key_end + 1
+        if kind in _FIXED_SIZES:
+            stop = value + _FIXED_SIZES[kind]
+        elif kind in (0x02, 0x0D, 0x0E):  # string, code, symbol
+            stop = value + 4 + _INT32.unpack_from(raw, value)[0]
+        elif kind in (0x03, 0x04, 0x0F):  # document, array, code with scope
+            stop = value + _INT32.unpack_from(raw, value)[0]
+        elif kind == BSON_BINARY:
+            stop = value + 5 + _INT32.unpack_from(raw, value)[0]
+        elif kind == 0x0B:  # regex: two C strings
+            stop = raw.index(b"\x00", raw.index(b"\x00", value) + 1) + 1
+        elif kind == 0x0C:  # DBPointer: string and ObjectId
+            stop = value + 4 + _INT32.unpack_from(raw, value)[0] + 12
+        else:
+            raise ValueError(f"Unknown BSON element type 0x{kind:02x}.")
+        yield raw[pos + 1:key_end], kind, pos, value, stop
+        pos = stop
+
+
+@lru_cache(maxsize=64)
+def _array_layout(n: int) -> Tuple[int, Tuple[Tuple[int, int, int, int], ...], np.ndarray]:
+    """
+    The layout of a BSON array of `n` doubles: its byte size, runs of elements with equally long keys
+    ("0".."9", "10".."99", ...) as `(first index, count, element size, offset of the first element)`, and
+    the offsets of the elements' type bytes. Within a run elements are equally spaced, so each run is read
+    as one strided view.
+    """
+    runs = []
+    offset, first, digits = 4, 0, 1
+    while first < n:
+        count = min(n, 10 ** digits) - first
+        size = 1 + digits + 1 + 8  # type, key, key terminator, double
+        runs.append((first, count, size, offset))
+        offset += count * size
+        first += count
+        digits += 1
+    types = np.concatenate([start + size * np.arange(count) for _, count, size, start in runs]) if runs else np.empty(0, np.int64)
+    return offset + 1, tuple(runs), types
+
+
+def decode_vector_into(raw: bytes, kind: int, value: int, out: np.ndarray) -> bool:
+    """
+    Decodes the embedding stored at `value` into the float32 row `out`, without building Python floats.
+
+    Arrays of doubles are read through strided views of `raw` and binary vectors (subtype 9) through
+    `np.frombuffer`, so the only copy is the one into `out`. Returns False, leaving `out` untouched, when the
+    value is of another shape (e.g. mixed numeric types), to be decoded the slow way.
+    """
+    n = len(out)
+    if kind == BSON_ARRAY:
+        size, runs, types = _array_layout(n)
+        if _INT32.unpack_from(raw, value)[0] != size:
+            return False
+        # Same byte size, but an int64 element would be as long as a double: check every type byte.
+        if not (np.frombuffer(raw, dtype=np.uint8)[types + value] == BSON_DOUBLE).all():
+            return False
+        for first, count, element, offset in runs:
+            start = value + offset + element - 8
+            out[first:first + count] = np.ndarray((count,), dtype="<f8", buffer=raw, offset=start, strides=(element,))
+        return True
+
+    if kind == BSON_BINARY and raw[value + 4] == BINARY_VECTOR_SUBTYPE:
+        length = _INT32.unpack_from(raw, value)[0]
+        data = value + 5
+        dtype = {VECTOR_FLOAT32: "<f4", VECTOR_INT8: "i1"}.get(raw[data])
+        if dtype is None or (length - 2) != n * np.dtype(dtype).itemsize:
+            return False
+        out[:] = np.frombuffer(raw, dtype=dtype, count=n, offset=data + 2)
+        return True
+
+    return False
+
+
+def _compact(raw: bytes, dropped: List[Tuple[int, int]]) -> RawBSONDocument:
+    # The same document without the dropped elements (the embeddings, already copied out).
+    parts, pos = [], 4
+    for start, stop in dropped:
+        parts.append(raw[pos:start])
+        pos = stop
+    parts.append(raw[pos:])
+    body = b"".join(parts)
+    return RawBSONDocument(_INT32.pack(len(body) + 4) + body, RAW_CODEC_OPTIONS)
+
+
+@dataclass
+class DecodedBatch:
+    """
+    Search results split into their embeddings, stacked in one float32 matrix, and their other fields.
+
+    `documents[i]` is a compact read-only record (a `RawBSONDocument` without its embedding fields, decoded
+    lazily on access) whose embedding is `embeddings[i]`. Documents without an embedding have a zero row.
+    """
+    documents: List[Mapping[str, Any]]
+    embeddings: np.ndarray
+
+    def __len__(self) -> int:
+        return len(self.documents)
+
+    def __iter__(self) -> Iterator[Mapping[str, Any]]:
+        return iter(self.documents)
+
+    @property
+    def ids(self) -> List[Any]:
+        return [document.get("_id") for document in self.documents]
+
+    @classmethod
+    def empty(cls, dim: int = 0) -> "DecodedBatch":
+        return cls([], np.zeros((0, dim), dtype=np.float32))
+
+    @classmethod
+    def concat(cls, batches: Sequence["DecodedBatch"]) -> "DecodedBatch":
+        """Joins batches in order into one, copying their embeddings into a single preallocated matrix."""
+        batches = [batch for batch in batches if len(batch)]
+        if not batches:
+            return cls.empty()
+        embeddings = np.empty((sum(len(batch) for batch in batches), batches[0].embeddings.shape[1]), dtype=np.float32)
+        np.concatenate([batch.embeddings for batch in batches], axis=0, out=embeddings)
+        return cls([document for batch in batches for document in batch.documents], embeddings)
+
+
+def decode_batch(documents: Iterable[RawBSONDocument], dim: int, embedding_fields: Sequence[str]) -> DecodedBatch:
+    """
+    Decodes raw search results into a `DecodedBatch`.
+
+    Args:
+        documents (Iterable[RawBSONDocument]): The results, fetched with `RAW_CODEC_OPTIONS`.
+        dim (int): The embedding dimension, i.e. that of the query embedding.
+        embedding_fields (Sequence[str]): The candidate embedding fields, by priority: a document's
+            embedding is its first one present. All of them are dropped from the compact records.
+    """
+    documents = list(documents)
+    embeddings = np.zeros((len(documents), dim), dtype=np.float32)
+    names = [name.encode("utf-8") for name in embedding_fields]
+    records: List[Mapping[str, Any]] = []
+
+    for row, document in enumerate(documents):
+        raw = document.raw
+        found = {name: (kind, start, value, stop) for name, kind, start, value, stop in _elements(raw) if name in names}
+        for name in names:
+            if name in found:
+                kind, _, value, _ = found[name]
+                if not decode_vector_into(raw, kind, value, embeddings[row]):
+                    vector = np.asarray(document[name.decode("utf-8")], dtype=np.float32).ravel()
+                    if len(vector) == dim:
+                        embeddings[row] = vector
+                break
+        dropped = sorted((start, stop) for _, start, _, stop in found.values())
+        records.append(_compact(raw, dropped) if dropped else document)
+
+    return DecodedBatch(records, embeddings)
@@ -1,29 +1,77 @@
-import aiohttp
+import asyncio
+from typing import Optional, List, Dict, Set
 
+from vector_search.builder.cache import EmbeddingCache
+from vector_search.builder.batching import EmbeddingCoalescer
+from vector_search.config.static import EmbeddingBalancer
 from vector_search.utils.envhandler import get_env
 
 class VectorEmbeddingManager:
     """
     A class for managing vector embedding requests using the OpenAI API.
     """
-    def __init__(self):
+    def __init__(self,
+        model: str = EmbeddingBalancer.MODEL,
+        cache: Optional[EmbeddingCache] = None,
+        coalesce: bool = False,
+        pool_size: int = EmbeddingBalancer.POOL_SIZE,
+        keepalive_timeout: float = EmbeddingBalancer.KEEPALIVE_TIMEOUT,
+        dns_cache_ttl: int = EmbeddingBalancer.DNS_CACHE_TTL,
+        request_timeout: float = EmbeddingBalancer.REQUEST_TIMEOUT,
+        api_url: Optional[str] = None
+        ):
         """
         Initializes the VectorEmbeddingManager class.
+
+        Args:
+            model (str, optional): The embedding model to request. Defaults to `EmbeddingBalancer.MODEL`.
+            cache (Optional[EmbeddingCache], optional): A cache consulted before calling the API. Defaults to None.
+            coalesce (bool, optional): Whether concurrent `request` calls are merged into batched API calls. Defaults to False.
+            pool_size (int, optional): The maximum number of simultaneous connections to the API.
+            keepalive_timeout (float, optional): Seconds an idle connection is kept open for reuse.
+            dns_cache_ttl (int, optional): Seconds a resolved API host address is cached.
+            request_timeout (float, optional): The total timeout, in seconds, of a single API request.
+            api_url (Optional[str], optional): The embeddings endpoint. Defaults to the `OPENAI_EMBEDDINGS_URL`
+                environment variable, then `EmbeddingBalancer.API_URL`.
         """ 
-        self.api_url = 'https://api.openai.com/v1/embeddings'
+        self.api_url = api_url or get_env('OPENAI_EMBEDDINGS_URL', EmbeddingBalancer.API_URL)
         self.apikey = get_env('OPENAI_API_KEY')
+        self.model = model
+        self.cache = cache
+        self.pool_size = pool_size
+        self.keepalive_timeout = keepalive_timeout
+        self.dns_cache_ttl = dns_cache_ttl
+        self.request_timeout = request_timeout
         self.session = None
+        self.loop = None
+        self.coalescer = EmbeddingCoalescer(self._post) if coalesce else None
 
     def create_session(self):
         """
         Creates an aiohttp ClientSession for making API requests.
+
+        The session keeps a pool of keep-alive connections and caches DNS lookups, so it is meant
+        to be reused across requests rather than created per query.
         """
-        self.session = aiohttp.ClientSession()
+        import aiohttp  # deferred to the first session: it is one of the slowest imports of the package
+
+        connector = aiohttp.TCPConnector(
+            limit=self.pool_size,
+            keepalive_timeout=self.keepalive_timeout,
+            use_dns_cache=True,
+            ttl_dns_cache=self.dns_cache_ttl
+        )
+        self.session = aiohttp.ClientSession(
+            connector=connector,
+            timeout=aiohttp.ClientTimeout(total=self.request_timeout)
+        )
+        self.loop = asyncio.get_running_loop()
 
 
     async def request(self, query: str):
         """
         Makes an asynchronous request to the OpenAI API to get the vector embedding for the given query.
+        If a cache is configured and holds the query, the API is not called.
 
         Args:
             query (str): The input query for which the embedding needs to be obtained.
@@ -34,23 +82,76 @@ class VectorEmbeddingManager:
         Raises:
             Exception: If the API request fails.
         """
+        if self.cache is not None:
+            embedding = (await self.cache.aget_many(self.model, [query]))[0]
+            if embedding is not None:
+                return embedding
+
+        if self.coalescer is not None:
+            embedding = await self.coalescer.submit(query)
+        else:
+            embedding = (await self._post([query]))[0]
+
+        if self.cache is not None:
+            await self.cache.aset_many(self.model, [(query, embedding)])
+        return embedding
+
+    async def request_many(self, queries: List[str]) -> List[List[float]]:
+        """
+        Gets the vector embeddings for several queries using as few API requests as possible.
+
+        Cached queries are served from the cache, duplicates are sent once, and the remaining inputs
+        are sent in chunks of `EmbeddingBalancer.MAX_INPUTS_PER_REQUEST`.
+
+        Args:
+            queries (List[str]): The input queries for which the embeddings need to be obtained.
+
+        Returns:
+            List[list]: The vector embeddings, in the same order as `queries`.
+
+        Raises:
+            Exception: If an API request fails.
+        """
+        embeddings: List[Optional[List[float]]] = [None] * len(queries)
+        missing: Dict[str, List[int]] = {}
+        cached_embeddings = await self.cache.aget_many(self.model, queries) if self.cache is not None else [None] * len(queries)
+        for i, (query, cached) in enumerate(zip(queries, cached_embeddings)):
+            if cached is not None:
+                embeddings[i] = cached
+            else:
+                missing.setdefault(query, []).append(i)
+
+        inputs = list(missing)
+        for start in range(0, len(inputs), EmbeddingBalancer.MAX_INPUTS_PER_REQUEST):
+            chunk = inputs[start:start + EmbeddingBalancer.MAX_INPUTS_PER_REQUEST]
+            chunk_embeddings = await self._post(chunk)
+            if self.cache is not None:
+                await self.cache.aset_many(self.model, list(zip(chunk, chunk_embeddings)))
+            for query, embedding in zip(chunk, chunk_embeddings):
+                for i in missing[query]:
+                    embeddings[i] = embedding
+
+        return embeddings
+
+    async def _post(self, inputs: List[str]) -> List[List[float]]:
         # Call OpenAI API to get the embeddings.
         headers = {
             'Authorization': f'Bearer {self.apikey}',
             'Content-Type': 'application/json'
         }
         payload = {
-            'input': query,
-            'model': 'text-embedding-ada-002'
+            'input': inputs,
+            'model': self.model
         }
 
-        if not self.session:
+        if not self.session or self.session.closed:
             self.create_session()
 
         async with self.session.post(self.api_url, json=payload, headers=headers) as response:
             if response.status == 200:
                 data = await response.json()
-                return data['data'][0]['embedding']
+                # The API tags each vector with the position of its input.
+                return [item['embedding'] for item in sorted(data['data'], key=lambda item: item['index'])]
             else:
                 raise Exception(f"Failed to get embedding. Status code: {response.status}")
             
@@ -59,8 +160,67 @@ class VectorEmbeddingManager:
         """
         Closes the aiohttp ClientSession when done with the API requests.
         """
+        if self.coalescer is not None:
+            await self.coalescer.close()
         if self.session:
             await self.session.close()  # Properly close the session when done
+        self.session = None
+
+
+_shared_embedder: Optional[VectorEmbeddingManager] = None
+_closing: Set[asyncio.Future] = set()
+
+
+def _release(manager: VectorEmbeddingManager):
+    """
+    Closes the session of a shared manager replaced by `get_shared_embedder`. Its pooled connections belong
+    to the loop it was bound to: if that loop still runs (in another thread) the manager is closed there,
+    otherwise the session is closed from the current loop (aiohttp just drops the connections of a closed loop).
+    """
+    if manager.loop.is_running():
+        asyncio.run_coroutine_threadsafe(manager.close(), manager.loop)
+        return
+    session, manager.session = manager.session, None
+    if session is not None and not session.closed:
+        task = asyncio.ensure_future(session.close())
+        _closing.add(task)
+        task.add_done_callback(_closed)
+
+
+def _closed(task: asyncio.Future):
+    _closing.discard(task)
+    if not task.cancelled():
+        task.exception()  # retrieved: a session that fails to close is still gone
+
+
+def get_shared_embedder(**kwargs) -> VectorEmbeddingManager:
+    """
+    Returns the process-wide `VectorEmbeddingManager`, creating it on first use.
+
+    Reusing one manager keeps a single pooled session (and its warm TCP/TLS connections) across queries.
+    The keyword arguments are forwarded to `VectorEmbeddingManager` when it is created and ignored afterwards.
+    Must be called from within a running event loop; a manager bound to another (e.g. closed) loop is
+    released (see `_release`) and replaced.
+    """
+    global _shared_embedder
+    loop = asyncio.get_running_loop()
+    if _shared_embedder is None or (_shared_embedder.loop is not None and _shared_embedder.loop is not loop):
+        if _shared_embedder is not None:
+            _release(_shared_embedder)
+        _shared_embedder = VectorEmbeddingManager(**kwargs)
+    if not _shared_embedder.session or _shared_embedder.session.closed:
+        _shared_embedder.create_session()
+    return _shared_embedder
+
+
+async def close_shared_embedder():
+    """
+    Closes the process-wide `VectorEmbeddingManager`, if any.
+    """
+    global _shared_embedder
+    if _shared_embedder is not None:
+        await _shared_embedder.close()
+        _shared_embedder = None
 
 async def main():
     import time
@@ -76,11 +236,15 @@ async def main():
         print(f"Time for embedding: {e2-e1} seconds")
         print(embedding  is not None)
 
+        # A second request reuses the pooled keep-alive connection.
+        await manager.request('hello again')
+        e3 = time.perf_counter()
+        print(f"Time for embedding (warm connection): {e3-e2} seconds")
+
     finally:
         await manager.close()
     e = time.perf_counter()
     print(f"Total runtime: {e-s} seconds")
 
 if __name__ == '__main__':
-    import asyncio
     asyncio.run(main())
\ No newline at end of file
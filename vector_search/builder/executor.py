@@ -1,6 +1,6 @@
-from typing import Dict, List, Any
+from typing import Dict, List, Any, Optional
 
-from vector_search.builder.context import ContextBuilder
+from vector_search.builder.context import ContextBuilder, TargetOutcome
 
 class Executor:
     """
@@ -18,15 +18,25 @@ class Executor:
         self.builder = ContextBuilder(*args, **kwargs)
 
 
-    async def build_context(self, embedding, fields: Dict[str, Any] = {}) -> List[List[Dict]]:
+    async def build_context(self, embedding, fields: Dict[str, Any] = {}, deadline: Optional[float] = None) -> List[List[Dict]]:
         """
         Builds the context by executing vector search on multiple targets concurrently.
 
         Args:
             embedding: The input embedding to be used for vector search.
             fields (Dict[str, Any] | None, optional): The fields to be projected in the search results. Defaults to None.
+            deadline (Optional[float], optional): The event-loop time by which the searches must be done.
 
         Returns:
             List[Any]: The combined search results from all targets.
         """
-        return await self.builder.build(embedding, fields)
\ No newline at end of file
+        return await self.builder.build(embedding, fields, deadline)
+
+    async def build_outcomes(self, embedding, fields: Dict[str, Any] = {}, deadline: Optional[float] = None) -> List[TargetOutcome]:
+        """
+        Same as `build_context`, but reports each target's outcome, so that partial contexts can be told apart.
+
+        Returns:
+            List[TargetOutcome]: The results, or the error, of each target.
+        """
+        return await self.builder.build_outcomes(embedding, fields, deadline)
\ No newline at end of file
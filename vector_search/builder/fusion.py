@@ -0,0 +1,87 @@
+from enum import Enum
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+from vector_search.config.static import SearchBalancer
+
+
+class FusionMethod(Enum):
+    RECIPROCAL_RANK = "rrf"
+    WEIGHTED = "weighted"
+
+
+def _align(ranked_lists: Sequence[List[Dict]], key: str) -> Tuple[List[Dict], np.ndarray, np.ndarray]:
+    """
+    Lines the ranked lists up on a shared set of documents.
+
+    Returns the unique documents (first occurrence wins), plus `(n_lists, n_documents)` matrices holding
+    each document's 1-based rank and score in each list (`inf` and `nan` where it is absent).
+    """
+    positions: Dict[Any, int] = {}
+    documents: List[Dict] = []
+    for ranked in ranked_lists:
+        for item in ranked:
+            if item.get(key) not in positions:
+                positions[item.get(key)] = len(documents)
+                documents.append(item)
+
+    ranks = np.full((len(ranked_lists), len(documents)), np.inf)
+    scores = np.full((len(ranked_lists), len(documents)), np.nan)
+    for i, ranked in enumerate(ranked_lists):
+        if not ranked:
+            continue
+        columns = np.fromiter((positions[item.get(key)] for item in ranked), dtype=np.int64, count=len(ranked))
+        # A document listed twice keeps its best (first) rank.
+        columns, first = np.unique(columns, return_index=True)
+        ranks[i, columns] = first + 1
+        scores[i, columns] = np.fromiter((ranked[j].get("score", 0.0) for j in first), dtype=np.float64, count=len(first))
+    return documents, ranks, scores
+
+
+def fuse(
+    ranked_lists: Sequence[List[Dict]],
+    method: FusionMethod = FusionMethod.RECIPROCAL_RANK,
+    weights: Optional[Sequence[float]] = None,
+    top_k: Optional[int] = None,
+    k: int = SearchBalancer.RRF_K,
+    key: str = "_id"
+) -> List[Dict]:
+    """
+    Merges several ranked result lists into one, in a single vectorized step.
+
+    With reciprocal rank fusion a document scores `sum(weight / (k + rank))` over the lists it appears in.
+    With weighted fusion each list's scores are min-max normalized to [0, 1] and summed with their weights.
+
+    Args:
+        ranked_lists (Sequence[List[Dict]]): The result lists, each ordered best first.
+        method (FusionMethod, optional): The fusion method. Defaults to reciprocal rank fusion.
+        weights (Optional[Sequence[float]], optional): One weight per list. Defaults to equal weights.
+        top_k (Optional[int], optional): The maximum number of documents returned. Defaults to all.
+        k (int, optional): The rank offset of reciprocal rank fusion. Defaults to `SearchBalancer.RRF_K`.
+        key (str, optional): The field identifying a document across lists. Defaults to "_id".
+
+    Returns:
+        List[Dict]: The fused documents, best first, with their fused `score`.
+    """
+    documents, ranks, scores = _align(ranked_lists, key)
+    if not documents:
+        return []
+    weights = np.ones(len(ranked_lists)) if weights is None else np.asarray(weights, dtype=np.float64)
+
+    if method is FusionMethod.RECIPROCAL_RANK:
+        fused = weights @ (1.0 / (k + ranks))
+    else:
+        present = ~np.isnan(scores)
+        low = np.min(np.where(present, scores, np.inf), axis=1, keepdims=True)
+        high = np.max(np.where(present, scores, -np.inf), axis=1, keepdims=True)
+        with np.errstate(invalid="ignore"):
+            normalized = np.where(present, (scores - low) / np.where(high > low, high - low, 1.0), 0.0)
+        # A list whose documents all share one score contributes fully to each of them.
+        normalized = np.where(present & (high <= low), 1.0, normalized)
+        fused = weights @ normalized
+
+    order = np.argsort(-fused, kind="stable")
+    if top_k is not None:
+        order = order[:top_k]
+    return [{**documents[i], "score": float(fused[i])} for i in order]
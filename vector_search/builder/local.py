@@ -0,0 +1,337 @@
+import asyncio
+import threading
+from pathlib import Path
+from functools import partial
+from collections import OrderedDict
+from typing import Any, Dict, List, Optional, Iterable, Mapping, Sequence
+
+import numpy as np
+from bson import json_util
+
+from vector_search.builder.decode import DecodedBatch
+from vector_search.config.static import SearchBalancer, LocalIndexMode
+from vector_search.filters.prefilter import match_filter
+from vector_search.utils.envhandler import get_env
+
+# Pre-filter masks kept per local index: queries about the same symbols or dates reuse them.
+_MASK_CACHE_SIZE = 64
+
+
+def _index_files(directory: str, database_name: str, collection_name: str) -> Dict[str, Path]:
+    stem = f"{database_name}.{collection_name}"
+    return {
+        "vectors": Path(directory) / f"{stem}.npy",
+        "documents": Path(directory) / f"{stem}.jsonl",
+        "ivf": Path(directory) / f"{stem}.ivf.npz",
+    }
+
+
+def write_local_index(directory: str, database_name: str, collection_name: str, path: str, documents: Iterable[Dict]) -> int:
+    """
+    Writes documents to the on-disk layout read by `LocalVectorSearchManager`.
+
+    The vectors found at `path` are stacked into a float32 `.npy` matrix and the remaining fields are
+    written, one Extended JSON document per line, to a `.jsonl` file in the same order.
+
+    Args:
+        directory (str): The directory holding local indexes.
+        database_name (str): The name of the source database.
+        collection_name (str): The name of the source collection.
+        path (str): The vector field of the documents.
+        documents (Iterable[Dict]): The documents to write, e.g. a `find()` cursor.
+
+    Returns:
+        int: The number of documents written. Documents without a vector are skipped.
+    """
+    files = _index_files(directory, database_name, collection_name)
+    files["vectors"].parent.mkdir(parents=True, exist_ok=True)
+
+    vectors = []
+    with open(files["documents"], "w", encoding="utf-8") as f:
+        for document in documents:
+            vector = document.get(path)
+            if not vector:
+                continue
+            vectors.append(np.asarray(vector, dtype=np.float32))
+            f.write(json_util.dumps({k: v for k, v in document.items() if k != path}) + "\n")
+
+    np.save(files["vectors"], np.vstack(vectors) if vectors else np.empty((0, 0), dtype=np.float32))
+    if files["ivf"].exists():
+        files["ivf"].unlink()  # stale once the vectors change
+    return len(vectors)
+
+
+def export_collection(client, database_name: str, collection_name: str, path: str, directory: str) -> int:
+    """
+    Copies a MongoDB collection into a local index so that it can be served by `LocalVectorSearchManager`.
+    """
+    return write_local_index(directory, database_name, collection_name, path, client[database_name][collection_name].find())
+
+
+class LocalVectorSearchManager:
+    """
+    A class for serving vector search in-process from a local replica of a collection.
+
+    It mirrors the `request(embedding, **fields)` contract of `VectorSearchManager`. Vectors are memory-mapped
+    from a float32 `.npy` matrix and searched either exactly (brute force) or approximately through an
+    inverted-file (IVF) index whose lists are probed until `num_candidates` vectors have been scored.
+    A `$vectorSearch.filter` pre-filter restricts both to the matching documents, as Atlas does.
+
+    The IVF index is loaded (or built, which takes seconds on large collections) by `prepare`, called by the
+    first search if nothing called it before, e.g. `TargetRegistry.prepare` at startup. Async searches run in
+    the default executor, so neither that nor the NumPy work of a search blocks the event loop.
+    """
+    def __init__(self,
+        database_name: str,
+        collection_name: str,
+        path: str,
+        index: str,
+        num_candidates: int = SearchBalancer.DEFAULT_NUM_CANDIDATES,
+        limit: int = SearchBalancer.DEFAULT_LIMIT_PER_GROUP,
+        connec_client: Optional[Any] = None,
+        local_path: Optional[str] = None,
+        local_mode: str = LocalIndexMode.EXACT.value
+        ):
+        """
+        Initializes the LocalVectorSearchManager class.
+
+        Args:
+            database_name (str): The name of the replicated database.
+            collection_name (str): The name of the replicated collection.
+            path (str): The vector field of the collection.
+            index (str): The name of the Atlas index this replaces. Kept for parity with `VectorSearchManager`.
+            num_candidates (int, optional): The number of vectors scored in approximate mode. Defaults to 50.
+            limit (int, optional): The maximum number of documents to return in the search results. Defaults to 50.
+            connec_client (Optional[Any], optional): Unused; accepted so that target configs stay interchangeable.
+            local_path (Optional[str], optional): The directory holding local indexes. Defaults to the
+                `LOCAL_INDEX_PATH` environment variable, then `SearchBalancer.LOCAL_INDEX_PATH`.
+            local_mode (str, optional): "exact" or "ivf". Defaults to "exact".
+        """
+        self.database_name = database_name
+        self.collection_name = collection_name
+        self.path = path
+        self.index = index
+        self.num_candidates = num_candidates
+        self.limit = limit
+        self.mode = LocalIndexMode(local_mode)
+
+        directory = local_path or get_env('LOCAL_INDEX_PATH', SearchBalancer.LOCAL_INDEX_PATH)
+        self.files = _index_files(directory, database_name, collection_name)
+
+        self.vectors: np.ndarray = np.load(self.files["vectors"], mmap_mode="r")
+        with open(self.files["documents"], encoding="utf-8") as f:
+            self.documents: List[Dict] = [json_util.loads(line) for line in f if line.strip()]
+        if len(self.documents) != len(self.vectors):
+            raise ValueError(f"Local index for {database_name}.{collection_name} is corrupt: "
+                             f"{len(self.vectors)} vectors for {len(self.documents)} documents.")
+
+        # Norms are kept aside so that the memory-mapped matrix is never copied to normalize it.
+        self.norms = np.linalg.norm(self.vectors, axis=1).astype(np.float32) if len(self.vectors) else np.empty(0, np.float32)
+        self.norms[self.norms == 0] = 1.0
+
+        self.centroids: Optional[np.ndarray] = None
+        self.list_order: Optional[np.ndarray] = None
+        self.list_offsets: Optional[np.ndarray] = None
+        self._masks: "OrderedDict[str, np.ndarray]" = OrderedDict()
+        self._masks_lock = threading.Lock()
+        self._prepare_lock = threading.Lock()
+
+    def prepare(self):
+        """
+        Loads or builds the IVF index if the manager searches in IVF mode and has not done so yet. Blocking.
+        """
+        if self.mode is not LocalIndexMode.IVF or self.centroids is not None or not len(self.vectors):
+            return
+        with self._prepare_lock:
+            if self.centroids is None:
+                self._load_or_build_ivf()
+
+    def close(self):
+        """
+        Releases the memory-mapped matrix.
+        """
+        self.vectors = np.empty((0, self.vectors.shape[1] if self.vectors.ndim == 2 else 0), dtype=np.float32)
+
+    def _load_or_build_ivf(self):
+        # `centroids` is assigned last: searches check it to know whether the index is ready.
+        if self.files["ivf"].exists():
+            ivf = np.load(self.files["ivf"])
+            if int(ivf["size"]) == len(self.vectors):
+                self.list_order, self.list_offsets = ivf["order"], ivf["offsets"]
+                self.centroids = ivf["centroids"]
+                return
+
+        centroids, assignments = self._kmeans()
+        self.list_order = np.argsort(assignments, kind="stable")
+        self.list_offsets = np.concatenate(([0], np.cumsum(np.bincount(assignments, minlength=len(centroids)))))
+        self.centroids = centroids
+        try:
+            np.savez(self.files["ivf"], centroids=self.centroids, order=self.list_order,
+                     offsets=self.list_offsets, size=len(self.vectors))
+        except OSError:
+            pass  # read-only replica: the index is simply rebuilt on the next start
+
+    def _kmeans(self, iterations: int = SearchBalancer.LOCAL_IVF_ITERATIONS, seed: int = 0):
+        # Spherical k-means: centroids and vectors are compared by cosine similarity.
+        n = len(self.vectors)
+        n_lists = max(1, int(np.sqrt(n)))
+        rng = np.random.default_rng(seed)
+        centroids = np.asarray(self.vectors[np.sort(rng.choice(n, n_lists, replace=False))], dtype=np.float32)
+        centroids /= np.linalg.norm(centroids, axis=1, keepdims=True).clip(min=1e-12)
+
+        assignments = np.zeros(n, dtype=np.int64)
+        for _ in range(iterations):
+            assignments = self._assign(centroids)
+            sums = np.zeros_like(centroids)
+            for start in range(0, n, SearchBalancer.BATCH_SIZE):
+                block = np.asarray(self.vectors[start:start + SearchBalancer.BATCH_SIZE]) / self.norms[start:start + SearchBalancer.BATCH_SIZE, None]
+                np.add.at(sums, assignments[start:start + SearchBalancer.BATCH_SIZE], block)
+            empty = ~sums.any(axis=1)
+            sums[empty] = centroids[empty]
+            centroids = sums / np.linalg.norm(sums, axis=1, keepdims=True).clip(min=1e-12)
+        return centroids.astype(np.float32), self._assign(centroids)
+
+    def _assign(self, centroids: np.ndarray) -> np.ndarray:
+        assignments = np.empty(len(self.vectors), dtype=np.int64)
+        for start in range(0, len(self.vectors), SearchBalancer.BATCH_SIZE):
+            block = self.vectors[start:start + SearchBalancer.BATCH_SIZE]
+            assignments[start:start + SearchBalancer.BATCH_SIZE] = np.argmax(block @ centroids.T, axis=1)
+        return assignments
+
+    def mask(self, prefilter: Mapping[str, Any]) -> np.ndarray:
+        """
+        Returns the boolean mask of the documents matching a `$vectorSearch.filter` document.
+        """
+        key = json_util.dumps(prefilter, sort_keys=True)
+        # Searches run on executor threads: the cache is only touched under the lock.
+        with self._masks_lock:
+            mask = self._masks.get(key)
+            if mask is not None:
+                self._masks.move_to_end(key)
+                return mask
+        mask = np.fromiter((match_filter(document, prefilter) for document in self.documents), dtype=bool, count=len(self.documents))
+        with self._masks_lock:
+            self._masks[key] = mask
+            if len(self._masks) > _MASK_CACHE_SIZE:
+                self._masks.popitem(last=False)
+        return mask
+
+    def _candidates(self, query: np.ndarray, num_candidates: int, mask: Optional[np.ndarray] = None) -> np.ndarray:
+        order = np.argsort(self.centroids @ query)[::-1]
+        if mask is None:
+            sizes = np.diff(self.list_offsets)
+        else:
+            # Only matching vectors count towards `num_candidates`.
+            matching = np.concatenate(([0], np.cumsum(mask[self.list_order])))
+            sizes = matching[self.list_offsets[1:]] - matching[self.list_offsets[:-1]]
+        n_probe = int(np.searchsorted(np.cumsum(sizes[order]), num_candidates)) + 1
+        rows = np.concatenate([
+            self.list_order[self.list_offsets[c]:self.list_offsets[c + 1]] for c in order[:n_probe]
+        ])
+        return rows if mask is None else rows[mask[rows]]
+
+    def search(self, embedding, prefilter: Optional[Mapping[str, Any]] = None, num_candidates: Optional[int] = None, limit: Optional[int] = None) -> List[tuple]:
+        """
+        Returns `(row, score)` pairs of the nearest documents (among those matching `prefilter`), best first.
+        `num_candidates` and `limit` override the manager's for this search.
+
+        Scores follow Atlas' cosine `vectorSearchScore`, i.e. `(1 + cosine) / 2`.
+        """
+        if not len(self.vectors):
+            return []
+        query = np.asarray(embedding, dtype=np.float32)
+        query = query / max(float(np.linalg.norm(query)), 1e-12)
+        mask = self.mask(prefilter) if prefilter else None
+
+        if self.mode is LocalIndexMode.IVF:
+            self.prepare()
+            rows = self._candidates(query, num_candidates or self.num_candidates, mask)
+            cosine = (self.vectors[rows] @ query) / self.norms[rows]
+        elif mask is not None:
+            rows = np.flatnonzero(mask)
+            cosine = (self.vectors[rows] @ query) / self.norms[rows]
+        else:
+            rows = None
+            cosine = (self.vectors @ query) / self.norms
+
+        k = min(limit or self.limit, len(cosine))
+        if k == 0:
+            return []
+        top = np.argpartition(-cosine, k - 1)[:k]
+        top = top[np.argsort(-cosine[top], kind="stable")]
+        scores = (1.0 + cosine[top]) / 2.0
+        if rows is not None:
+            top = rows[top]
+        return list(zip(top.tolist(), scores.tolist()))
+
+    def project(self, row: int, score: float, fields: Dict[str, Any]) -> Dict:
+        document = self.documents[row]
+        if not fields:
+            return {**document, self.path: self.vectors[row].tolist()}
+
+        result = {"_id": document.get("_id")} if fields.get("_id", 1) else {}
+        for field, spec in fields.items():
+            if field == "_id":
+                continue
+            if isinstance(spec, dict) and spec.get("$meta") in ("vectorSearchScore", "searchScore"):
+                result[field] = score
+            elif spec and field == self.path:
+                result[field] = self.vectors[row].tolist()
+            elif spec and field in document:
+                result[field] = document[field]
+        return result
+
+    def _request(self, embedding, prefilter: Optional[Dict[str, Any]] = None, *, num_candidates: Optional[int] = None, limit: Optional[int] = None, **fields) -> List[Dict]:
+        return [self.project(row, score, fields) for row, score in self.search(embedding, prefilter, num_candidates, limit)]
+
+    async def request(self, embedding, prefilter: Optional[Dict[str, Any]] = None, *, num_candidates: Optional[int] = None, limit: Optional[int] = None, max_time_ms: Optional[int] = None, **fields) -> List[Dict]:
+        return await self._run(self._request, embedding, prefilter, num_candidates=num_candidates, limit=limit, **fields)
+
+    async def request_decoded(self, embedding, embedding_fields: Optional[Sequence[str]] = None, prefilter: Optional[Dict[str, Any]] = None, *, num_candidates: Optional[int] = None, limit: Optional[int] = None, max_time_ms: Optional[int] = None, **fields) -> DecodedBatch:
+        return await self._run(self._request_decoded, embedding, embedding_fields, prefilter, num_candidates=num_candidates, limit=limit, **fields)
+
+    def _request_decoded(self, embedding, embedding_fields: Optional[Sequence[str]] = None, prefilter: Optional[Dict[str, Any]] = None, *, num_candidates: Optional[int] = None, limit: Optional[int] = None, **fields) -> DecodedBatch:
+        """
+        Counterpart of `VectorSearchManager._request_decoded`: the embeddings are gathered from the index matrix.
+        """
+        hits = self.search(embedding, prefilter, num_candidates, limit)
+        dropped = set(embedding_fields or ()) | {self.path}
+        documents = [
+            {name: value for name, value in self.project(row, score, fields).items() if name not in dropped}
+            for row, score in hits
+        ]
+        rows = np.fromiter((row for row, _ in hits), dtype=np.int64, count=len(hits))
+        if embedding_fields is None or self.path in embedding_fields:
+            embeddings = np.asarray(self.vectors[rows], dtype=np.float32)
+        else:
+            embeddings = np.zeros((len(hits), len(embedding)), dtype=np.float32)
+        return DecodedBatch(documents, embeddings)
+
+    def text_search(self, query: str, text_paths: List[str]) -> List[tuple]:
+        """
+        Returns `(row, score)` pairs of the documents matching the query's terms, best first.
+
+        A stand-in for Atlas Search: the score is the number of distinct query terms found in `text_paths`.
+        """
+        terms = set(query.lower().split())
+        if not terms:
+            return []
+        matches = []
+        for row, document in enumerate(self.documents):
+            text = " ".join(str(document.get(path) or "") for path in text_paths).lower()
+            score = sum(term in text for term in terms)
+            if score:
+                matches.append((row, float(score)))
+        matches.sort(key=lambda match: -match[1])
+        return matches[:self.limit]
+
+    def _lexical_request(self, query: str, text_index: str, text_paths: List[str], **fields) -> List[Dict]:
+        return [self.project(row, score, fields) for row, score in self.text_search(query, text_paths)]
+
+    async def lexical_request(self, query: str, text_index: str, text_paths: List[str], *, max_time_ms: Optional[int] = None, **fields) -> List[Dict]:
+        return await self._run(self._lexical_request, query, text_index, text_paths, **fields)
+
+    async def _run(self, func, *args, **kwargs):
+        # Searches are CPU-bound NumPy work: like `VectorSearchManager`, they run in the default executor.
+        # `max_time_ms` is accepted by the public methods for parity only: in-process searches cannot be interrupted.
+        return await asyncio.get_running_loop().run_in_executor(None, partial(func, *args, **kwargs))
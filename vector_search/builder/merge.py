@@ -0,0 +1,147 @@
+import heapq
+import hashlib
+from enum import Enum
+from typing import Any, Dict, Hashable, List, Mapping, Optional, Sequence, Tuple
+
+import numpy as np
+
+from vector_search.builder.context import select_top
+
+
+class ScoreNormalization(Enum):
+    NONE = "none"
+    MINMAX = "minmax"
+    ZSCORE = "zscore"
+
+
+CONTENT_FIELDS: Tuple[str, ...] = ("content", "contentStr", "name", "description")
+
+
+def normalize_scores(scores: np.ndarray, method: ScoreNormalization = ScoreNormalization.NONE) -> np.ndarray:
+    """
+    Maps one target's scores onto a scale shared by all targets.
+
+    Min-max maps them to [0, 1] (all 1.0 if they are equal) and z-score centers them on their mean in units
+    of their standard deviation (all 0.0 if they are equal). Both are increasing, so a target's own order is
+    unchanged.
+    """
+    scores = np.asarray(scores, dtype=np.float64)
+    if method is ScoreNormalization.NONE or not len(scores):
+        return scores
+    if method is ScoreNormalization.MINMAX:
+        low, high = scores.min(), scores.max()
+        return (scores - low) / (high - low) if high > low else np.ones_like(scores)
+    std = scores.std()
+    return (scores - scores.mean()) / std if std > 0 else np.zeros_like(scores)
+
+
+def dedup_key(item: Mapping[str, Any], key: str = "_id") -> Hashable:
+    """
+    Identifies a document across targets: by its `key` field, or by a hash of its content fields when it has
+    none (e.g. a projection without `_id`).
+    """
+    value = item.get(key)
+    if value is not None:
+        try:
+            hash(value)
+            return ("id", value)
+        except TypeError:
+            return ("id", repr(value))
+    digest = hashlib.blake2b(digest_size=16)
+    for name in CONTENT_FIELDS:
+        digest.update(str(item.get(name)).encode("utf-8"))
+        digest.update(b"\x00")
+    return ("content", digest.digest())
+
+
+class TopKMerger:
+    """
+    Merges the scored candidates of several targets into their `k` best, streaming them through a bounded
+    min-heap so that memory stays O(k) however many candidates the targets return.
+
+    Each target's scores can be normalized first (see `ScoreNormalization`) so that targets scoring on
+    different scales compete fairly. A document returned by several targets is kept once, with its best
+    occurrence. Ties are broken by target order, then by position within the target, so the merged ranking
+    does not depend on the order in which targets are added.
+    """
+    def __init__(self, k: Optional[int], normalization: ScoreNormalization = ScoreNormalization.NONE, dedup: bool = True, key: str = "_id"):
+        """
+        Args:
+            k (Optional[int]): The number of documents kept. None keeps every candidate.
+            normalization (ScoreNormalization, optional): The per-target score normalization. Defaults to none.
+            dedup (bool, optional): Whether to keep a single occurrence of each document. Defaults to True.
+            key (str, optional): The field identifying a document (see `dedup_key`). Defaults to "_id".
+        """
+        self.k = k
+        self.normalization = normalization
+        self.dedup = dedup
+        self.key = key
+        # Entries are `[rank, identity, item, score, source, alive]`; `rank` is unique, so items are never compared.
+        self._heap: List[list] = []
+        self._live: Dict[Hashable, list] = {}
+        self._dead = 0
+        # Candidates above the threshold offered by each source
+        self.offered: Dict[int, int] = {}
+
+    def __len__(self) -> int:
+        return len(self._live)
+
+    def full(self) -> bool:
+        return self.k is not None and len(self._live) >= self.k
+
+    def _prune(self):
+        # Replaced entries are dropped lazily: when they reach the top, or when they are as many as the live ones.
+        while self._heap and not self._heap[0][5]:
+            heapq.heappop(self._heap)
+            self._dead -= 1
+        if self._dead > len(self._live):
+            self._heap = list(self._live.values())
+            heapq.heapify(self._heap)
+            self._dead = 0
+
+    def add(self, source: int, items: Sequence[Mapping[str, Any]], scores: np.ndarray, threshold: Optional[float] = None) -> int:
+        """
+        Offers one target's candidates.
+
+        Args:
+            source (int): The target's position, used to break ties and returned with its documents.
+            items (Sequence[Mapping[str, Any]]): The target's candidates.
+            scores (np.ndarray): Their similarity to the query.
+            threshold (Optional[float], optional): The minimum score (before normalization) of a candidate.
+
+        Returns:
+            int: The number of candidates that entered the top `k`.
+        """
+        scores = np.asarray(scores)
+        order = select_top(scores, threshold if threshold is not None else -np.inf)
+        ranking = normalize_scores(scores, self.normalization)
+        self.offered[source] = self.offered.get(source, 0) + len(order)
+        admitted = 0
+        for i in order:
+            rank = (float(ranking[i]), -source, -int(i))
+            if self.full() and (not self._heap or rank <= self._heap[0][0]):
+                break  # candidates come best first: none of the next ones can enter either
+            identity = dedup_key(items[i], self.key) if self.dedup else (source, int(i))
+            previous = self._live.get(identity)
+            if previous is not None:
+                if previous[0] >= rank:
+                    continue
+                previous[5] = False
+                self._dead += 1
+            entry = [rank, identity, items[i], float(scores[i]), source, True]
+            heapq.heappush(self._heap, entry)
+            self._live[identity] = entry
+            admitted += 1
+            if self.k is not None and len(self._live) > self.k:
+                self._prune()
+                evicted = heapq.heappop(self._heap)
+                del self._live[evicted[1]]
+            self._prune()
+        return admitted
+
+    def results(self) -> List[Tuple[Mapping[str, Any], float, int]]:
+        """
+        Returns the kept documents, best first, as `(item, score, source)`; `score` is the target's own
+        (unnormalized) score.
+        """
+        return [(entry[2], entry[3], entry[4]) for entry in sorted(self._live.values(), key=lambda entry: entry[0], reverse=True)]
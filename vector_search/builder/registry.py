@@ -0,0 +1,218 @@
+import asyncio
+import inspect
+import weakref
+import threading
+from collections import Counter, OrderedDict
+from typing import Any, Dict, Iterable, Optional, Tuple, Union
+
+from pymongo import monitoring
+from pymongo.mongo_client import MongoClient
+from pymongo.server_api import ServerApi
+
+from vector_search.builder.serach import VectorSearchManager, AsyncVectorSearchManager, AsyncMongoClient
+from vector_search.builder.local import LocalVectorSearchManager
+from vector_search.config.static import SearchBalancer, SearchBackend
+from vector_search.utils.envhandler import get_env
+
+
+class PoolStatsListener(monitoring.ConnectionPoolListener):
+    """
+    Counts connection pool events so that pool usage can be inspected at runtime.
+    """
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._counts: Counter = Counter()
+
+    def _incr(self, name: str, amount: int = 1):
+        with self._lock:
+            self._counts[name] += amount
+
+    def pool_created(self, event):
+        self._incr("pools_created")
+
+    def pool_ready(self, event):
+        pass
+
+    def pool_cleared(self, event):
+        self._incr("pools_cleared")
+
+    def pool_closed(self, event):
+        self._incr("pools_closed")
+
+    def connection_created(self, event):
+        self._incr("connections_created")
+        self._incr("connections_open")
+
+    def connection_ready(self, event):
+        pass
+
+    def connection_closed(self, event):
+        self._incr("connections_closed")
+        self._incr("connections_open", -1)
+
+    def connection_check_out_started(self, event):
+        pass
+
+    def connection_check_out_failed(self, event):
+        self._incr("checkouts_failed")
+
+    def connection_checked_out(self, event):
+        self._incr("checkouts")
+        self._incr("connections_in_use")
+
+    def connection_checked_in(self, event):
+        self._incr("connections_in_use", -1)
+
+    def snapshot(self) -> Dict[str, int]:
+        with self._lock:
+            return dict(self._counts)
+
+
+Manager = Union[VectorSearchManager, AsyncVectorSearchManager, LocalVectorSearchManager]
+
+# Target keys only understood by `LocalVectorSearchManager`.
+LOCAL_OPTIONS = ("local_path", "local_mode")
+
+
+class TargetRegistry:
+    """
+    A registry that builds one search manager per target configuration and keeps it warm across queries.
+
+    Targets without a `connec_client` share a single pooled client owned by the registry, instead of each
+    search opening its own `MongoClient` (with its own pool and monitoring threads). At most `max_managers`
+    managers are kept, so that callers passing short-lived clients do not keep them all alive.
+    """
+    def __init__(self, max_pool_size: int = SearchBalancer.MAX_POOL_SIZE, max_managers: int = SearchBalancer.MAX_MANAGERS):
+        """
+        Initializes the TargetRegistry class.
+
+        Args:
+            max_pool_size (int, optional): The maximum connection pool size of the shared clients. Defaults to 100.
+            max_managers (int, optional): The maximum number of managers kept. Defaults to 128.
+        """
+        self.max_pool_size = max_pool_size
+        self.max_managers = max_managers
+        self.pool_stats = PoolStatsListener()
+        # Keyed on the id of the manager's client: the manager holds the client, so the id cannot be reused
+        # while the entry exists.
+        self._managers: "OrderedDict[Tuple, Manager]" = OrderedDict()
+        self._client: Optional[MongoClient] = None
+        # By loop id, with a weak reference to the loop: the id of a closed loop can be reused by a new one.
+        self._async_clients: Dict[int, Tuple[weakref.ref, Any]] = {}
+        self._lock = threading.Lock()
+        # Guards `_managers`: `prepare` builds local managers on executor threads.
+        self._managers_lock = threading.Lock()
+
+    @property
+    def client(self) -> MongoClient:
+        """The shared synchronous client, created on first use."""
+        with self._lock:
+            if self._client is None:
+                self._client = MongoClient(
+                    get_env('MONGODB_URI'),
+                    server_api=ServerApi('1'),
+                    maxPoolSize=self.max_pool_size,
+                    event_listeners=[self.pool_stats]
+                )
+            return self._client
+
+    def async_client(self) -> Any:
+        """The shared asyncio client of the running event loop, created on first use."""
+        if AsyncMongoClient is None:
+            raise ImportError("The async search backend requires pymongo >= 4.10 or motor.")
+        loop = asyncio.get_running_loop()
+        entry = self._async_clients.get(id(loop))
+        if entry is None or entry[0]() is not loop:
+            # Clients of loops that are gone cannot be closed anymore: they are only forgotten.
+            for key in [key for key, (loop_ref, _) in self._async_clients.items() if loop_ref() is None]:
+                del self._async_clients[key]
+            entry = self._async_clients[id(loop)] = (weakref.ref(loop), AsyncMongoClient(
+                get_env('MONGODB_URI'),
+                server_api=ServerApi('1'),
+                maxPoolSize=self.max_pool_size,
+                event_listeners=[self.pool_stats]
+            ))
+        return entry[1]
+
+    def get(self, target: Dict[str, Any]) -> Manager:
+        """
+        Returns the manager for a target configuration, building it on first use.
+
+        Args:
+            target (Dict[str, Any]): The target configuration, as produced by `ExecutorArg`.
+
+        Returns:
+            Manager: The search manager for the target's backend.
+        """
+        target = dict(target)
+        backend = SearchBackend(target.pop("backend", SearchBackend.SYNC.value))
+        client = target.pop("connec_client", None)
+        local_options = {option: target.pop(option) for option in LOCAL_OPTIONS if target.get(option) is not None}
+        for option in LOCAL_OPTIONS:
+            target.pop(option, None)
+
+        if backend is SearchBackend.LOCAL:
+            # Local managers do not use a client: every client shares them.
+            client = None
+        elif backend is SearchBackend.ASYNC and (client is None or isinstance(client, MongoClient)):
+            # Async clients are bound to the loop they were created on.
+            client = self.async_client()
+        elif client is None:
+            client = self.client
+        key = (backend, id(client), tuple(sorted(target.items())), tuple(sorted(local_options.items())))
+
+        with self._managers_lock:
+            manager = self._managers.get(key)
+            if manager is not None:
+                self._managers.move_to_end(key)
+                return manager
+            if backend is SearchBackend.LOCAL:
+                manager = LocalVectorSearchManager(**target, **local_options)
+            elif backend is SearchBackend.ASYNC:
+                manager = AsyncVectorSearchManager(**target, connec_client=client)
+            else:
+                manager = VectorSearchManager(**target, connec_client=client)
+            self._managers[key] = manager
+            # Evicted managers are dropped, not closed: their clients belong to the caller or to the registry.
+            while len(self._managers) > self.max_managers:
+                self._managers.popitem(last=False)
+        return manager
+
+    async def prepare(self, targets: Iterable[Dict[str, Any]]) -> int:
+        """
+        Builds the managers of the local targets among `targets` and loads their indexes (see
+        `LocalVectorSearchManager.prepare`) in the default executor, so that neither happens on the event
+        loop during the first queries. Returns the number of targets prepared.
+        """
+        local = [target for target in targets if target.get("backend") == SearchBackend.LOCAL.value]
+        loop = asyncio.get_running_loop()
+        for target in local:
+            await loop.run_in_executor(None, lambda target=target: self.get(target).prepare())
+        return len(local)
+
+    def stats(self) -> Dict[str, Any]:
+        """
+        Returns the number of registered managers and the connection pool counters of the shared clients.
+        """
+        return {
+            "managers": len(self._managers),
+            "max_pool_size": self.max_pool_size,
+            "pool": self.pool_stats.snapshot()
+        }
+
+    async def close(self):
+        """
+        Closes the shared clients and forgets every registered manager.
+        """
+        self._managers.clear()
+        if self._client is not None:
+            self._client.close()
+            self._client = None
+        for _, client in self._async_clients.values():
+            result = client.close()
+            if inspect.isawaitable(result):
+                await result
+        self._async_clients.clear()
+
+
+default_registry = TargetRegistry()
@@ -0,0 +1,44 @@
+import random
+import asyncio
+from dataclasses import dataclass
+from typing import Optional, Tuple, Type
+
+from pymongo.errors import ConnectionFailure, ExecutionTimeout
+
+from vector_search.config.static import RetryBalancer
+
+# Errors worth retrying on another attempt: connection problems (including pymongo's server selection
+# and network timeouts, which subclass `ConnectionFailure`) and attempts cut by their own timeout, on the
+# client or on the server (`maxTimeMS`).
+RETRYABLE_ERRORS: Tuple[Type[BaseException], ...] = (ConnectionFailure, ConnectionError, asyncio.TimeoutError, ExecutionTimeout)
+
+
+@dataclass
+class RetryPolicy:
+    """
+    How a target search is retried, timed out and hedged within a query's deadline.
+
+    Defaults come from `RetryBalancer`.
+    """
+    deadline: float = RetryBalancer.DEADLINE
+    target_timeout: float = RetryBalancer.TARGET_TIMEOUT
+    retries: int = RetryBalancer.TARGET_RETRIES
+    backoff_base: float = RetryBalancer.BACKOFF_BASE
+    backoff_max: float = RetryBalancer.BACKOFF_MAX
+    partial_results: bool = RetryBalancer.PARTIAL_RESULTS
+    hedge: bool = RetryBalancer.HEDGE
+    hedge_quantile: float = RetryBalancer.HEDGE_QUANTILE
+    hedge_min_delay: float = RetryBalancer.HEDGE_MIN_DELAY
+    hedge_min_samples: int = RetryBalancer.HEDGE_MIN_SAMPLES
+    errors: Tuple[Type[BaseException], ...] = RETRYABLE_ERRORS
+
+    def backoff(self, attempt: int, rng: Optional[random.Random] = None) -> float:
+        """
+        Returns the delay before retry number `attempt` (1-based), with full jitter: uniform between 0 and
+        the exponential bound, so that targets failing together do not retry in lockstep.
+        """
+        bound = min(self.backoff_max, self.backoff_base * 2 ** (attempt - 1))
+        return (rng or random).uniform(0.0, bound)
+
+
+default_policy = RetryPolicy()
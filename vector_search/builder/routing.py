@@ -0,0 +1,193 @@
+import heapq
+import itertools
+import asyncio
+from contextlib import asynccontextmanager
+from typing import Any, AsyncIterator, Dict, List, Mapping, Optional, Sequence, Tuple
+
+import numpy as np
+
+from vector_search.config.static import RouteArgs, RoutingBalancer, target_settings
+from vector_search.utils.metrics import ROUTED_TARGETS
+
+DEFAULT_ROUTE: Dict[str, Any] = {"priority": 0, "weight": 1.0, "always": False, "optional": False}
+
+
+def default_targets(targets: Sequence[Dict[str, Any]]) -> Tuple[Dict[str, Any], ...]:
+    """Returns the targets searched when queries are not routed: those not marked `optional` (see `RouteArgs`)."""
+    return tuple(target for target in targets if not target_settings(RouteArgs, target, DEFAULT_ROUTE)["optional"])
+
+
+def compute_centroids(vectors: np.ndarray, k: int = RoutingBalancer.CENTROIDS, iterations: int = 10, sample: int = 20_000, seed: int = 0) -> np.ndarray:
+    """
+    Summarizes a target's embeddings by `k` unit centroids (spherical k-means on a sample of at most
+    `sample` rows), so that a query can be compared with the whole collection in `k` dot products.
+    """
+    rng = np.random.default_rng(seed)
+    rows = np.sort(rng.choice(len(vectors), min(sample, len(vectors)), replace=False))
+    data = np.asarray(vectors[rows], dtype=np.float32)
+    data /= np.linalg.norm(data, axis=1, keepdims=True).clip(min=1e-12)
+    k = max(1, min(k, len(data)))
+
+    centroids = data[rng.choice(len(data), k, replace=False)]
+    for _ in range(iterations):
+        assignments = np.argmax(data @ centroids.T, axis=1)
+        sums = np.zeros_like(centroids)
+        np.add.at(sums, assignments, data)
+        empty = ~sums.any(axis=1)
+        sums[empty] = centroids[empty]
+        centroids = sums / np.linalg.norm(sums, axis=1, keepdims=True).clip(min=1e-12)
+    return centroids.astype(np.float32)
+
+
+class PrioritySemaphore:
+    """
+    An asyncio semaphore whose freed slots go to the highest-priority waiter, first come first served among
+    equal priorities.
+    """
+    def __init__(self, value: int):
+        self._value = value
+        # Entries are `(-priority, arrival, future)`; cancelled waiters are skipped when a slot is handed out.
+        self._waiters: List[Tuple[int, int, asyncio.Future]] = []
+        self._arrivals = itertools.count()
+
+    def locked(self) -> bool:
+        return self._value <= 0
+
+    async def acquire(self, priority: int = 0):
+        # Free slots only exist while nobody waits: `release` hands slots to waiters directly.
+        if self._value > 0:
+            self._value -= 1
+            return
+        future = asyncio.get_running_loop().create_future()
+        heapq.heappush(self._waiters, (-priority, next(self._arrivals), future))
+        try:
+            await future
+        except asyncio.CancelledError:
+            if future.done() and not future.cancelled():
+                self.release()  # the slot was handed over just as the waiter was cancelled
+            raise
+
+    def release(self):
+        while self._waiters:
+            _, _, future = heapq.heappop(self._waiters)
+            if not future.done():
+                future.set_result(None)
+                return
+        self._value += 1
+
+    @asynccontextmanager
+    async def slot(self, priority: int = 0) -> AsyncIterator[None]:
+        await self.acquire(priority)
+        try:
+            yield
+        finally:
+            self.release()
+
+
+class TargetRouter:
+    """
+    Decides which targets a query is searched on, and budgets the searches running at once.
+
+    Each target is summarized offline by a few centroids of its embeddings (see `compute_centroids` and
+    `bench.routing`). A query is scored against every target as its best cosine similarity to the target's
+    centroids, times the target's `weight` (see `RouteArgs`), and routed to the best-scoring target plus
+    those within `margin` of it, at most `max_targets` of them. Targets marked `always`, and targets without
+    centroids, are searched for every query, except `optional` ones: those are only searched when routed to.
+    Without any centroids, the targets searched are those of `default_targets`.
+
+    Searches hold a slot of their target (`max_concurrent_per_target`) and one of the whole process
+    (`max_concurrent`) while they run; when slots are short, they go to the targets of highest `priority`.
+    """
+    def __init__(self,
+        centroids: Optional[Mapping[str, np.ndarray]] = None,
+        margin: float = RoutingBalancer.MARGIN,
+        max_targets: int = RoutingBalancer.MAX_TARGETS,
+        max_concurrent: int = RoutingBalancer.MAX_CONCURRENT_TARGETS,
+        max_concurrent_per_target: int = RoutingBalancer.MAX_CONCURRENT_PER_TARGET
+        ):
+        self.centroids: Dict[str, np.ndarray] = {}
+        for collection, matrix in (centroids or {}).items():
+            self.set_centroids(collection, matrix)
+        self.margin = margin
+        self.max_targets = max_targets
+        self.max_concurrent_per_target = max_concurrent_per_target
+        self._global = PrioritySemaphore(max_concurrent)
+        self._per_target: Dict[str, PrioritySemaphore] = {}
+
+    def set_centroids(self, collection: str, centroids: np.ndarray):
+        matrix = np.atleast_2d(np.asarray(centroids, dtype=np.float32))
+        self.centroids[collection] = matrix / np.linalg.norm(matrix, axis=1, keepdims=True).clip(min=1e-12)
+
+    def load(self, path: str) -> int:
+        """
+        Loads centroids from an `.npz` file holding one `(k, dim)` array per collection name, such as the
+        output of `bench.routing`. Returns the number of targets loaded.
+        """
+        with np.load(path) as data:
+            for collection in data.files:
+                self.set_centroids(collection, data[collection])
+            return len(data.files)
+
+    def save(self, path: str):
+        np.savez(path, **self.centroids)
+
+    def scores(self, targets: Sequence[Dict[str, Any]], embedding: Any) -> Dict[str, float]:
+        """
+        Returns the routing score of the targets that have centroids: their weighted best cosine similarity
+        to the query.
+        """
+        query = np.asarray(embedding, dtype=np.float32).ravel()
+        query = query / max(float(np.linalg.norm(query)), 1e-12)
+        scores = {}
+        for target in targets:
+            centroids = self.centroids.get(target["collection_name"])
+            if centroids is not None and centroids.shape[1] == len(query):
+                scores[target["collection_name"]] = float(np.max(centroids @ query)) * target_settings(RouteArgs, target, DEFAULT_ROUTE)["weight"]
+        return scores
+
+    def route(self, targets: Sequence[Dict[str, Any]], embedding: Any) -> Tuple[Dict[str, Any], ...]:
+        """
+        Returns the targets a query is searched on, in their original order.
+
+        Args:
+            targets (Sequence[Dict[str, Any]]): Every target configuration.
+            embedding: The query embedding.
+        """
+        scores = self.scores(targets, embedding)
+        if not scores:
+            return default_targets(targets)
+
+        always = {target["collection_name"] for target in targets if target_settings(RouteArgs, target, DEFAULT_ROUTE)["always"]}
+        candidates = sorted(
+            (target for target in targets if target["collection_name"] in scores and target["collection_name"] not in always),
+            key=lambda target: -scores[target["collection_name"]]
+        )
+        chosen = set()
+        if candidates:
+            best = scores[candidates[0]["collection_name"]]
+            chosen = {
+                target["collection_name"] for target in candidates[:self.max_targets]
+                if scores[target["collection_name"]] >= best - self.margin
+            }
+        unscored = {target["collection_name"] for target in default_targets(targets)} - set(scores)
+        routed = tuple(
+            target for target in targets
+            if target["collection_name"] in chosen or target["collection_name"] in unscored or target["collection_name"] in always
+        )
+        searched = {target["collection_name"] for target in routed}
+        for target in targets:
+            ROUTED_TARGETS.inc(collection=target["collection_name"], decision="searched" if target["collection_name"] in searched else "skipped")
+        return routed
+
+    @asynccontextmanager
+    async def slot(self, target: Dict[str, Any]) -> AsyncIterator[None]:
+        """Holds a search slot of `target` and one of the process until the search is done."""
+        collection = target.get("collection_name", "unknown")
+        semaphore = self._per_target.get(collection)
+        if semaphore is None:
+            semaphore = self._per_target[collection] = PrioritySemaphore(self.max_concurrent_per_target)
+        priority = target_settings(RouteArgs, target, DEFAULT_ROUTE)["priority"]
+        # The target's own slot first, so that a saturated target does not hold slots others could use.
+        async with semaphore.slot(priority):
+            async with self._global.slot(priority):
+                yield
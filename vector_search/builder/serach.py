@@ -1,13 +1,88 @@
 import asyncio
+import inspect
+import weakref
 from functools import partial, wraps
-from typing import Optional, List, Dict
+from typing import Optional, List, Dict, Any, Sequence
 
 from pymongo.mongo_client import MongoClient
 from pymongo.server_api import ServerApi
 
+try:
+    from pymongo import AsyncMongoClient  # pymongo >= 4.10
+except ImportError:
+    try:
+        from motor.motor_asyncio import AsyncIOMotorClient as AsyncMongoClient
+    except ImportError:
+        AsyncMongoClient = None
+
+from vector_search.builder.decode import RAW_CODEC_OPTIONS, DecodedBatch, decode_batch
 from vector_search.config.static import SearchBalancer
 from vector_search.utils.envhandler import get_env
 
+
+# Projecting this expression makes Atlas return the similarity it computed during `$vectorSearch`.
+SCORE_PROJECTION = {"$meta": "vectorSearchScore"}
+
+# Same as `SCORE_PROJECTION`, for the relevance computed by a `$search` (full-text) stage.
+TEXT_SCORE_PROJECTION = {"$meta": "searchScore"}
+
+
+def vector_search_pipeline(embedding, path: str, index: str, num_candidates: int, limit: int, fields: Dict[str, Any], prefilter: Optional[Dict[str, Any]] = None) -> List[Dict]:
+    """
+    Builds the `$vectorSearch` aggregation pipeline shared by the search managers.
+    A `prefilter` (MQL on fields indexed as "filter") restricts the candidates before the approximate search.
+    """
+    search = {
+        "queryVector": embedding,
+        "path": path,
+        "numCandidates": num_candidates,
+        "limit": limit,
+        "index": index
+    }
+    if prefilter:
+        search["filter"] = prefilter
+    return [
+        {
+            "$vectorSearch": search
+        },
+        {
+            "$project": fields
+        }
+    ]
+
+
+def text_search_pipeline(query: str, index: str, paths: List[str], limit: int, fields: Dict[str, Any]) -> List[Dict]:
+    """
+    Builds the Atlas Search (`$search`) full-text pipeline used for lexical retrieval.
+    """
+    return [
+        {
+            "$search": {
+                "index": index,
+                "text": {
+                    "query": query,
+                    "path": paths
+                }
+            }
+        },
+        {
+            "$limit": limit
+        },
+        {
+            "$project": fields
+        }
+    ]
+
+
+def aggregate_options(max_time_ms: Optional[int]) -> Dict[str, Any]:
+    """
+    Returns the `aggregate` options of a search: its server-side time limit, if any. A search given up on by
+    the client (see `ContextBuilder.with_retries`) thus stops on the server too, instead of running on
+    with its executor thread.
+    """
+    return {} if max_time_ms is None else {"maxTimeMS": max_time_ms}
+
+
 class VectorSearchManager:
     """
     A class for managing vector search operations using MongoDB.
@@ -58,37 +133,172 @@ class VectorSearchManager:
         """
         self.client.close()
 
-    async def request(self, embedding, **fields) -> List[Dict]:
+    async def request(self, embedding, prefilter: Optional[Dict[str, Any]] = None, *, num_candidates: Optional[int] = None, limit: Optional[int] = None, max_time_ms: Optional[int] = None, **fields) -> List[Dict]:
         async_func = self.async_wrap(self._request)
-        return await async_func(embedding, **fields)
+        return await async_func(embedding, prefilter, num_candidates=num_candidates, limit=limit, max_time_ms=max_time_ms, **fields)
 
-    def _request(self,  embedding, **fields) -> List[Dict]:
+    def _request(self,  embedding, prefilter: Optional[Dict[str, Any]] = None, *, num_candidates: Optional[int] = None, limit: Optional[int] = None, max_time_ms: Optional[int] = None, **fields) -> List[Dict]:
         db = self.client[self.database_name]
         collection = db[self.collection_name]
 
-        pipeline = [
-            {
-                "$vectorSearch": {
-                    "queryVector": embedding,
-                    "path": self.path,
-                    "numCandidates": self.num_candidates,
-                    "limit": self.limit,
-                    "index": self.index
-                }
-            },
-            {
-                "$project": fields
-            }
-        ]
+        pipeline = vector_search_pipeline(embedding, self.path, self.index, num_candidates or self.num_candidates, limit or self.limit, fields, prefilter)
+
+        return list(collection.aggregate(pipeline, **aggregate_options(max_time_ms)))
+
+    async def request_decoded(self, embedding, embedding_fields: Optional[Sequence[str]] = None, prefilter: Optional[Dict[str, Any]] = None, *, num_candidates: Optional[int] = None, limit: Optional[int] = None, max_time_ms: Optional[int] = None, **fields) -> DecodedBatch:
+        async_func = self.async_wrap(self._request_decoded)
+        return await async_func(embedding, embedding_fields, prefilter, num_candidates=num_candidates, limit=limit, max_time_ms=max_time_ms, **fields)
+
+    def _request_decoded(self, embedding, embedding_fields: Optional[Sequence[str]] = None, prefilter: Optional[Dict[str, Any]] = None, *, num_candidates: Optional[int] = None, limit: Optional[int] = None, max_time_ms: Optional[int] = None, **fields) -> DecodedBatch:
+        """
+        Runs the vector search and decodes the results as raw BSON, straight into a float32 matrix.
+
+        Args:
+            embedding: The input embedding to be used for vector search.
+            embedding_fields (Optional[Sequence[str]], optional): The embedding fields to decode, by priority.
+                Defaults to the searched `path`.
+            prefilter (Optional[Dict[str, Any]], optional): The `$vectorSearch.filter` of the search.
+            num_candidates (Optional[int], optional): Overrides the manager's `num_candidates` for this search.
+            limit (Optional[int], optional): Overrides the manager's `limit` for this search.
+            max_time_ms (Optional[int], optional): The server-side time limit of the search (see `aggregate_options`).
+            **fields: The fields to be projected in the search results.
+        """
+        collection = self.client[self.database_name][self.collection_name].with_options(codec_options=RAW_CODEC_OPTIONS)
+
+        pipeline = vector_search_pipeline(embedding, self.path, self.index, num_candidates or self.num_candidates, limit or self.limit, fields, prefilter)
 
-        return list(collection.aggregate(pipeline))
+        return decode_batch(collection.aggregate(pipeline, **aggregate_options(max_time_ms)), len(embedding), embedding_fields or (self.path,))
+
+    async def lexical_request(self, query: str, text_index: str, text_paths: List[str], *, max_time_ms: Optional[int] = None, **fields) -> List[Dict]:
+        async_func = self.async_wrap(self._lexical_request)
+        return await async_func(query, text_index, text_paths, max_time_ms=max_time_ms, **fields)
+
+    def _lexical_request(self, query: str, text_index: str, text_paths: List[str], *, max_time_ms: Optional[int] = None, **fields) -> List[Dict]:
+        collection = self.client[self.database_name][self.collection_name]
+        pipeline = text_search_pipeline(query, text_index, text_paths, self.limit, fields)
+        return list(collection.aggregate(pipeline, **aggregate_options(max_time_ms)))
     
 
     def async_wrap(self, func):
         @wraps(func)
         async def run(*args, loop=None, executor=None, **kwargs):
             if loop is None:
-                loop = asyncio.get_event_loop()
+                loop = asyncio.get_running_loop()
             pfunc = partial(func, *args, **kwargs)
             return await loop.run_in_executor(executor, pfunc)
-        return run
\ No newline at end of file
+        return run
+
+
+class AsyncVectorSearchManager:
+    """
+    A class for managing vector search operations using an asyncio MongoDB driver.
+
+    Unlike `VectorSearchManager`, searches do not occupy an executor thread: the aggregation runs on the
+    event loop, and the number of searches in flight is bounded. Incremental results come from
+    `ContextBuilder.build_stream`, target by target: a `$vectorSearch` result set is at most `limit` documents,
+    so each search is fetched whole.
+    """
+    # Keyed by event loop: asyncio primitives and async clients cannot be shared across loops.
+    _semaphores: "weakref.WeakKeyDictionary[asyncio.AbstractEventLoop, asyncio.Semaphore]" = weakref.WeakKeyDictionary()
+    _clients: "weakref.WeakKeyDictionary[asyncio.AbstractEventLoop, Any]" = weakref.WeakKeyDictionary()
+
+    def __init__(self,
+        database_name: str,
+        collection_name: str,
+        path: str,
+        index: str,
+        num_candidates: int = SearchBalancer.DEFAULT_NUM_CANDIDATES,
+        limit: int = SearchBalancer.DEFAULT_LIMIT_PER_GROUP,
+        connec_client: Optional[Any] = None,
+        max_concurrency: int = SearchBalancer.MAX_CONCURRENT_SEARCHES,
+        batch_size: int = SearchBalancer.CURSOR_BATCH_SIZE
+        ):
+        """
+        Initializes the AsyncVectorSearchManager class.
+
+        Args:
+            database_name (str): The name of the MongoDB database.
+            collection_name (str): The name of the MongoDB collection.
+            path (str, optional): The path to the vector field in the collection.
+            index (str, optional): The name of the vector index to use for the search.
+            num_candidates (int, optional): The number of candidate documents to consider for the search. Defaults to 50.
+            limit (int, optional): The maximum number of documents to return in the search results. Defaults to 50.
+            connec_client (Optional[Any], optional): The asyncio MongoDB client to use/reuse. A synchronous `MongoClient`
+                cannot be used on the event loop, so in that case (or if None) a client shared by all async managers
+                of the running loop is used instead.
+            max_concurrency (int, optional): The maximum number of async searches in flight at once, across all
+                async managers of the running loop. Defaults to 32.
+            batch_size (int, optional): The number of documents fetched per cursor batch. Defaults to 16.
+
+        Raises:
+            ImportError: If no asyncio MongoDB driver (pymongo >= 4.10 or motor) is installed.
+        """
+        if AsyncMongoClient is None:
+            raise ImportError("The async search backend requires pymongo >= 4.10 or motor.")
+
+        self.database_name = database_name
+        self.collection_name = collection_name
+        self.path = path
+        self.index = index
+        self.num_candidates = num_candidates
+        self.limit = limit
+        self.max_concurrency = max_concurrency
+        self.batch_size = batch_size
+
+        if connec_client is None or isinstance(connec_client, MongoClient):
+            self.client = self._shared_client()
+        else:
+            self.client = connec_client
+
+    @classmethod
+    def _shared_client(cls):
+        # Async managers are built on the event loop (see `TargetRegistry.get`), so there is always a running loop.
+        key = asyncio.get_running_loop()
+        if key not in cls._clients:
+            cls._clients[key] = AsyncMongoClient(get_env('MONGODB_URI'), server_api=ServerApi('1'))
+        return cls._clients[key]
+
+    def _semaphore(self) -> asyncio.Semaphore:
+        key = asyncio.get_running_loop()
+        if key not in self._semaphores:
+            self._semaphores[key] = asyncio.Semaphore(self.max_concurrency)
+        return self._semaphores[key]
+
+    async def close(self):
+        """
+        Closes the MongoDB client connection.
+        """
+        result = self.client.close()
+        if inspect.isawaitable(result):
+            await result
+
+    async def request(self, embedding, prefilter: Optional[Dict[str, Any]] = None, *, num_candidates: Optional[int] = None, limit: Optional[int] = None, max_time_ms: Optional[int] = None, **fields) -> List[Dict]:
+        pipeline = vector_search_pipeline(embedding, self.path, self.index, num_candidates or self.num_candidates, limit or self.limit, fields, prefilter)
+        return await self._aggregate(pipeline, max_time_ms=max_time_ms)
+
+    async def request_decoded(self, embedding, embedding_fields: Optional[Sequence[str]] = None, prefilter: Optional[Dict[str, Any]] = None, *, num_candidates: Optional[int] = None, limit: Optional[int] = None, max_time_ms: Optional[int] = None, **fields) -> DecodedBatch:
+        """
+        Runs the vector search and decodes the results as raw BSON, straight into a float32 matrix.
+        See `VectorSearchManager._request_decoded`.
+        """
+        pipeline = vector_search_pipeline(embedding, self.path, self.index, num_candidates or self.num_candidates, limit or self.limit, fields, prefilter)
+        documents = await self._aggregate(pipeline, codec_options=RAW_CODEC_OPTIONS, max_time_ms=max_time_ms)
+        return decode_batch(documents, len(embedding), embedding_fields or (self.path,))
+
+    async def lexical_request(self, query: str, text_index: str, text_paths: List[str], *, max_time_ms: Optional[int] = None, **fields) -> List[Dict]:
+        pipeline = text_search_pipeline(query, text_index, text_paths, self.limit, fields)
+        return await self._aggregate(pipeline, max_time_ms=max_time_ms)
+
+    async def _open(self, pipeline: List[Dict], codec_options: Optional[Any] = None, max_time_ms: Optional[int] = None) -> Any:
+        collection = self.client[self.database_name][self.collection_name]
+        if codec_options is not None:
+            collection = collection.with_options(codec_options=codec_options)
+        cursor = collection.aggregate(pipeline, batchSize=self.batch_size, **aggregate_options(max_time_ms))
+        if inspect.isawaitable(cursor):  # pymongo's async API returns the cursor from a coroutine, motor does not
+            cursor = await cursor
+        return cursor
+
+    async def _aggregate(self, pipeline: List[Dict], codec_options: Optional[Any] = None, max_time_ms: Optional[int] = None) -> List[Dict]:
+        async with self._semaphore():
+            cursor = await self._open(pipeline, codec_options, max_time_ms)
+            return [document async for document in cursor]
@@ -0,0 +1,194 @@
+import json
+import math
+import threading
+from collections import deque
+from dataclasses import dataclass, asdict
+from typing import Any, Deque, Dict, Optional, Tuple
+
+import numpy as np
+
+from vector_search.config.static import SearchBalancer, TuningBalancer
+
+
+@dataclass
+class TargetParameters:
+    num_candidates: int
+    limit: int
+
+
+class _TargetState:
+    def __init__(self, parameters: TargetParameters, window: int):
+        self.parameters = parameters
+        # (returned, above threshold, selected, limit in effect) per search
+        self.usage: Deque[Tuple[int, int, int, int]] = deque(maxlen=window)
+        self.latencies: Deque[float] = deque(maxlen=window)
+        self.since_adjustment = 0
+        self.adjustments = 0
+
+
+class AdaptiveTuner:
+    """
+    Adjusts each target's `num_candidates` and `limit` from its recent searches.
+
+    For every search it is told how many results the target returned, how many were above the similarity
+    threshold and how many made the final top `STOP_INDEX`, plus the search latency. Every `adjust_every`
+    searches of a target:
+
+    - `limit` grows when more than `1 - target_recall` of the searches were cut short by it (every result
+      returned made the final top-k, so deeper ones might have too), and otherwise shrinks towards the
+      `target_recall` quantile of the results actually used, plus `margin`.
+    - `num_candidates` shrinks while the `latency_quantile` latency exceeds `latency_budget` (then `limit` too,
+      once `num_candidates` reached it), and otherwise moves towards `candidate_ratio * limit`, only growing
+      while latency is under `headroom * latency_budget`.
+
+    Parameters change by at most a factor `step` per adjustment and stay within their bounds. A target starts
+    from the values of its configuration, or from those `seed`ed (e.g. loaded from an offline sweep).
+    Parameters are passed with each search of the target (see `ContextBuilder`), never set on its shared
+    search manager.
+    """
+    def __init__(self,
+        latency_budget: float = TuningBalancer.LATENCY_BUDGET,
+        latency_quantile: float = TuningBalancer.LATENCY_QUANTILE,
+        target_recall: float = TuningBalancer.TARGET_RECALL,
+        candidate_ratio: float = TuningBalancer.CANDIDATE_RATIO,
+        limit_bounds: Tuple[int, int] = (TuningBalancer.MIN_LIMIT, TuningBalancer.MAX_LIMIT),
+        num_candidates_bounds: Tuple[int, int] = (TuningBalancer.MIN_NUM_CANDIDATES, TuningBalancer.MAX_NUM_CANDIDATES),
+        window: int = TuningBalancer.WINDOW,
+        adjust_every: int = TuningBalancer.ADJUST_EVERY,
+        step: float = TuningBalancer.STEP,
+        margin: float = TuningBalancer.MARGIN,
+        headroom: float = TuningBalancer.HEADROOM
+        ):
+        self.latency_budget = latency_budget
+        self.latency_quantile = latency_quantile
+        self.target_recall = target_recall
+        self.candidate_ratio = candidate_ratio
+        self.limit_bounds = limit_bounds
+        self.num_candidates_bounds = num_candidates_bounds
+        self.window = window
+        self.adjust_every = adjust_every
+        self.step = step
+        self.margin = margin
+        self.headroom = headroom
+        self._targets: Dict[str, _TargetState] = {}
+        self._seeds: Dict[str, TargetParameters] = {}
+        self._lock = threading.Lock()
+
+    def _state(self, target: Dict[str, Any]) -> _TargetState:
+        collection = target.get("collection_name", "unknown")
+        state = self._targets.get(collection)
+        if state is None:
+            parameters = self._seeds.get(collection) or TargetParameters(
+                target.get("num_candidates") or SearchBalancer.DEFAULT_NUM_CANDIDATES,
+                target.get("limit") or SearchBalancer.DEFAULT_LIMIT_PER_GROUP
+            )
+            state = self._targets[collection] = _TargetState(TargetParameters(**asdict(parameters)), self.window)
+        return state
+
+    def seed(self, collection: str, num_candidates: int, limit: int):
+        """Sets the parameters a target starts from, replacing its current ones."""
+        with self._lock:
+            self._seeds[collection] = TargetParameters(num_candidates, limit)
+            self._targets.pop(collection, None)
+
+    def load(self, path: str) -> int:
+        """
+        Seeds targets from a JSON file mapping collection names to `num_candidates` and `limit`, such as the
+        `recommendations` of `bench.sweep`. Returns the number of targets seeded.
+        """
+        with open(path, encoding="utf-8") as f:
+            data = json.load(f)
+        recommendations = data.get("recommendations", data)
+        for collection, parameters in recommendations.items():
+            self.seed(collection, int(parameters["num_candidates"]), int(parameters["limit"]))
+        return len(recommendations)
+
+    def parameters(self, target: Dict[str, Any]) -> TargetParameters:
+        with self._lock:
+            return TargetParameters(**asdict(self._state(target).parameters))
+
+    def observe_latency(self, target: Dict[str, Any], seconds: float):
+        with self._lock:
+            self._state(target).latencies.append(seconds)
+
+    def observe(self, target: Dict[str, Any], returned: int, above_threshold: int, selected: int) -> Optional[TargetParameters]:
+        """
+        Records how a search of `target` was used, and adjusts the target's parameters when due.
+
+        Args:
+            target (Dict[str, Any]): The target configuration.
+            returned (int): The number of results the search returned.
+            above_threshold (int): How many of them were above the similarity threshold.
+            selected (int): How many of them made the final results.
+
+        Returns:
+            Optional[TargetParameters]: The new parameters if they changed, else None.
+        """
+        with self._lock:
+            state = self._state(target)
+            state.usage.append((returned, above_threshold, selected, state.parameters.limit))
+            state.since_adjustment += 1
+            if state.since_adjustment < self.adjust_every:
+                return None
+            state.since_adjustment = 0
+            parameters = self._adjust(state)
+            if parameters == state.parameters:
+                return None
+            state.parameters = parameters
+            state.adjustments += 1
+            # Searches made with the previous parameters no longer describe the target.
+            state.usage.clear()
+            state.latencies.clear()
+            return TargetParameters(**asdict(parameters))
+
+    def _latency(self, state: _TargetState) -> Optional[float]:
+        if len(state.latencies) < self.adjust_every:
+            return None
+        return float(np.quantile(state.latencies, self.latency_quantile))
+
+    def _adjust(self, state: _TargetState) -> TargetParameters:
+        usage = np.array(state.usage, dtype=np.int64)
+        returned, selected, used_limits = usage[:, 0], usage[:, 2], usage[:, 3]
+        limit, num_candidates = state.parameters.limit, state.parameters.num_candidates
+        min_limit, max_limit = self.limit_bounds
+        min_candidates, max_candidates = self.num_candidates_bounds
+
+        saturated = float(np.mean((returned > 0) & (returned >= used_limits) & (selected >= returned)))
+        if saturated > 1.0 - self.target_recall:
+            limit = max(limit + 1, math.ceil(limit * self.step))
+        else:
+            needed = math.ceil(float(np.quantile(selected, self.target_recall)) * (1.0 + self.margin))
+            if needed < limit:
+                limit = max(needed, math.floor(limit / self.step))
+        limit = min(max_limit, max(min_limit, limit))
+
+        latency = self._latency(state)
+        desired = math.ceil(limit * self.candidate_ratio)
+        if latency is not None and latency > self.latency_budget:
+            if num_candidates <= limit:
+                limit = min(limit, math.floor(state.parameters.limit / self.step))
+            num_candidates = math.floor(num_candidates / self.step)
+        elif num_candidates < desired and (latency is None or latency < self.headroom * self.latency_budget):
+            num_candidates = min(desired, math.ceil(num_candidates * self.step))
+        elif num_candidates > desired:
+            num_candidates = max(desired, math.floor(num_candidates / self.step))
+
+        limit = min(max_limit, max(min_limit, limit))
+        # `$vectorSearch` requires numCandidates >= limit.
+        num_candidates = min(max_candidates, max(min_candidates, limit, num_candidates))
+        return TargetParameters(num_candidates, min(limit, num_candidates))
+
+    def snapshot(self) -> Dict[str, Dict[str, Any]]:
+        """
+        Returns each target's current parameters, its number of adjustments and its recent latency quantile.
+        """
+        with self._lock:
+            return {
+                collection: {
+                    **asdict(state.parameters),
+                    "adjustments": state.adjustments,
+                    "latency": self._latency(state),
+                    "searches": len(state.usage),
+                }
+                for collection, state in self._targets.items()
+            }
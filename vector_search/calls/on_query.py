@@ -1,35 +1,119 @@
 import time
 import asyncio
-import functools
-from enum import Enum
-from typing import Optional, Any, Dict, List
+from contextlib import aclosing
+from typing import Optional, Any, Dict, List, Mapping, Tuple, AsyncIterator, Sequence, TYPE_CHECKING
 from dataclasses import dataclass
-from pymongo.errors import ConnectionFailure, ServerSelectionTimeoutError
+import numpy as np
 from pymongo.mongo_client import MongoClient
-from pymongo.server_api import ServerApi
 
 from vector_search.utils.envhandler import get_env
 from vector_search.builder.executor import Executor
-from vector_search.builder.embeddings import VectorEmbeddingManager
-from vector_search.builder.context import Filter
-from vector_search.config.static import SearchArgs, SearchBalancer
+from vector_search.builder.embeddings import get_shared_embedder, close_shared_embedder
+from vector_search.builder.cache import EmbeddingCache, SemanticResultCache
+from vector_search.builder.context import ContextBuilder, Filter, ScoreFilter, TargetOutcome
+from vector_search.builder.decode import DecodedBatch
+from vector_search.builder.serach import SCORE_PROJECTION, TEXT_SCORE_PROJECTION
+from vector_search.builder.fusion import FusionMethod, fuse
+from vector_search.builder.merge import ScoreNormalization, TopKMerger, dedup_key, normalize_scores
+from vector_search.builder.registry import default_registry
+from vector_search.builder.routing import TargetRouter, default_targets
+from vector_search.builder.tuning import AdaptiveTuner
+from vector_search.filters.prefilter import FilterSpec, extract_filter_spec, target_prefilters
+from vector_search.config.static import RetryBalancer, RoutingBalancer, SearchArgs, SearchBalancer, SearchBackend, TextSearchArgs, TuningBalancer, target_settings
 from vector_search.utils.logs import Logger, timer, async_timer
+from vector_search.utils.metrics import registry as metrics_registry, STAGE_SECONDS, RESULTS_ABOVE_THRESHOLD
+
+if TYPE_CHECKING:
+    from vector_search.filters.constraints import Parser
 
 logger = Logger("Vector Search")
 
-db_uri = get_env('MONGODB_URI')
+def __getattr__(name: str) -> Any:
+    # Configuration is resolved when first needed rather than at import.
+    if name == "db_uri":
+        return get_env('MONGODB_URI')
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+
+# Shared across queries so that repeated questions skip the embeddings API.
+# Set `EMBEDDING_CACHE_PATH` to also persist embeddings on disk. Created on first use.
+embedding_cache: Optional[EmbeddingCache] = None
+
+def get_embedding_cache() -> EmbeddingCache:
+    global embedding_cache
+    if embedding_cache is None:
+        embedding_cache = EmbeddingCache.from_path(get_env('EMBEDDING_CACHE_PATH'))
+    return embedding_cache
+
+# Final contexts indexed by query embedding, so that paraphrased questions skip the search entirely.
+result_cache = SemanticResultCache()
+
+metrics_registry.callback_counter(
+    "vector_search_cache_hits_total", "Cache lookups that found an entry.", ["cache"],
+    lambda: {("embedding",): get_embedding_cache().stats.hits, ("result",): result_cache.stats.hits}
+)
+metrics_registry.callback_counter(
+    "vector_search_cache_misses_total", "Cache lookups that found no entry.", ["cache"],
+    lambda: {("embedding",): get_embedding_cache().stats.misses, ("result",): result_cache.stats.misses}
+)
+
+# Adjusts num_candidates/limit per target when `TuningBalancer.ENABLED`. Set `TUNING_PATH` to start from the
+# recommendations of an offline sweep (`python -m vector_search.bench.sweep`). Created on first use.
+tuner: Optional[AdaptiveTuner] = None
+
+def get_tuner() -> Optional[AdaptiveTuner]:
+    global tuner
+    if tuner is None and TuningBalancer.ENABLED:
+        tuner = AdaptiveTuner()
+        path = get_env('TUNING_PATH')
+        if path:
+            tuner.load(path)
+    return tuner
+
+# Routes each query to its relevant targets and caps concurrent target searches when `RoutingBalancer.ENABLED`.
+# Set `ROUTING_PATH` to the target centroids computed offline (`python -m vector_search.bench.routing`);
+# without them every target is searched. Created on first use.
+router: Optional[TargetRouter] = None
+
+def get_router() -> Optional[TargetRouter]:
+    global router
+    if router is None and RoutingBalancer.ENABLED:
+        router = TargetRouter()
+        path = get_env('ROUTING_PATH')
+        if path:
+            router.load(path)
+    return router
+
+metrics_registry.callback_gauge(
+    "vector_search_num_candidates", "The numCandidates currently used for each target (when tuned).", ["collection"],
+    lambda: {(collection,): state["num_candidates"] for collection, state in (tuner.snapshot() if tuner else {}).items()}
+)
+metrics_registry.callback_gauge(
+    "vector_search_limit", "The limit currently used for each target (when tuned).", ["collection"],
+    lambda: {(collection,): state["limit"] for collection, state in (tuner.snapshot() if tuner else {}).items()}
+)
+
+_warm_up_task: Optional[asyncio.Task] = None
 
 @timer(logger=logger)
-def create_client() -> MongoClient | None:
-    # Create a MongoClient instance and configure the server API version to use.
-    client = MongoClient(db_uri, server_api=ServerApi('1'))
+def create_client(ping: bool = True) -> MongoClient | None:
+    """
+    Returns the process-wide MongoClient: the pooled client shared by the target registry.
+
+    Args:
+        ping (bool, optional): Whether to ping the deployment before returning. Without it the call returns at
+            once and the driver connects in the background (see `warm_up`). Defaults to True.
+
+    Returns:
+        MongoClient | None: The client, or None if the ping failed.
+    """
+    client = default_registry.client
+    if not ping:
+        return client
 
     # Send a ping to confirm a successful connection
     try:
         s = time.perf_counter()
         logger.log("info", "Attempting to connect to MongoDB...")
-        # Create a MongoClient instance and configure the server API version to use.
-        client = MongoClient(db_uri, server_api=ServerApi('1'))
         # Send a ping to confirm a successful connection
         client.admin.command('ping')
         e = time.perf_counter()
@@ -40,39 +124,6 @@ def create_client() -> MongoClient | None:
         logger.log("error", f"Unable to connect to MongoDB: {e}")
         return None
 
-class ConnectionErrors(Enum):
-    CONNECTION_FAILURE = ConnectionFailure
-    SERVER_SELECTION_TIMEOUT = ServerSelectionTimeoutError
-    CONNECTION_ERROR = ConnectionError
-    OTHER = Exception
-
-def async_retry_on_connection_error(errors: List[ConnectionErrors], retries=3, delay=2, backoff=2):
-    """
-    A decorator that retries a function if a connection error occurs.
-    
-    Args:
-        retries (int): The maximum number of retries before giving up.
-        delay (int): Initial delay between retries in seconds.
-        backoff (int): Multiplier applied to the delay between retries.
-    """
-    error_types = tuple(error.value for error in errors)
-
-    def decorator(func):
-        @functools.wraps(func)
-        async def wrapper(*args, **kwargs):
-            _retries, _delay = retries, delay
-            while _retries > 0:
-                try:
-                    return await func(*args, **kwargs)
-                except error_types as e:
-                    logger.log("info", f"Connection error: {e}. Retrying in {_delay} seconds...")
-                    await asyncio.sleep(_delay)
-                    _retries -= 1
-                    _delay *= backoff
-            raise ConnectionError(f"Failed after {retries} retries")
-        return wrapper
-    return decorator
-
 
 @dataclass
 class ExecutorArg:
@@ -84,6 +135,9 @@ class ExecutorArg:
     num_candidates: Optional[int]
     limit: Optional[int]
     connec_client: Optional[MongoClient] = None
+    backend: str = SearchBackend.SYNC.value
+    local_path: Optional[str] = None
+    local_mode: Optional[str] = None
 
     def map_to_dict(self) -> dict[str, Any]:
         return {
@@ -93,137 +147,571 @@ class ExecutorArg:
             'index': self.index,
             'num_candidates': self.num_candidates,
             'limit': self.limit,
-            'connec_client': self.connec_client
+            'connec_client': self.connec_client,
+            'backend': self.backend,
+            'local_path': self.local_path,
+            'local_mode': self.local_mode
         }
     
     def  __call__(self) -> Dict[str, str | int] :
         return self.map_to_dict()
     
-@timer(logger)   
+# Projection used when re-scoring locally: the embeddings are shipped back with each result.
+RESCORE_FIELDS = {
+    '_id': 1, 
+    'content': 1, 
+    'contentStr': 1, 
+    'content_embedding': 1, 
+    'name_embedding': 1, 
+    'description_embedding': 1, 
+    'price_embedding': 1
+}
+
+# Projection used in server-scored mode: Atlas' score replaces the embeddings.
+SERVER_SCORED_FIELDS = {
+    '_id': 1, 
+    'content': 1, 
+    'contentStr': 1, 
+    'score': SCORE_PROJECTION
+}
+
+# Projection used by lexical (full-text) retrieval in hybrid search.
+LEXICAL_FIELDS = {
+    '_id': 1, 
+    'content': 1, 
+    'contentStr': 1, 
+    'name': 1, 
+    'description': 1, 
+    'score': TEXT_SCORE_PROJECTION
+}
+
+_keyword_parser: Optional["Parser"] = None
+
+def keyword_parser() -> "Parser":
+    """Returns the parser used to extract lexical search terms, created on first use."""
+    global _keyword_parser
+    if _keyword_parser is None:
+        # NLTK is by far the slowest import of the package: only hybrid search pays for it.
+        from vector_search.filters.constraints import Parser
+        _keyword_parser = Parser()
+    return _keyword_parser
+
+@timer(logger, sample_rate=SearchBalancer.LOG_SAMPLE_RATE)
 def flatten_list(l: List[List[Any]]) -> List[Any]:
     if all(isinstance(item, list) for item in l):
         return [item for sublist in l for item in sublist]
     else:
         raise TypeError("Input must be a list of lists. All items in the list must be of the same type.")
     
-@async_retry_on_connection_error([
-    ConnectionErrors.CONNECTION_FAILURE, 
-    ConnectionErrors.SERVER_SELECTION_TIMEOUT, 
-    ConnectionErrors.CONNECTION_ERROR], 
-    retries=3, delay=2, backoff=2)
-async def _on_query(client: MongoClient, query: str) -> List[str]:
+# The collections a query may be searched on, in merge tie-breaking order. Those marked `optional` in
+# `RouteArgs` are only searched when the router has centroids for them (see `route_targets`).
+SEARCHED_TARGETS: Tuple[SearchArgs, ...] = (SearchArgs.TICKERS, SearchArgs.ARTICLES, SearchArgs.FOREX, SearchArgs.CRYPTOS)
+
+def search_targets(client: MongoClient) -> Tuple[Dict[str, Any], ...]:
+    """
+    Builds the `Executor` arguments of the collections a query may be searched on (see `route_targets`).
+    """
+    return tuple(ExecutorArg(**args.value, connec_client=client)() for args in SEARCHED_TARGETS)
+
+def route_targets(targets: Sequence[Dict[str, Any]], embedding: Any) -> Tuple[Dict[str, Any], ...]:
+    """
+    Returns the targets a query is searched on: those its embedding is relevant to when routing is enabled
+    (see `TargetRouter.route`), else those of `default_targets`.
+    """
+    active_router = get_router()
+    return default_targets(targets) if active_router is None else active_router.route(targets, embedding)
+
+def search_fields() -> Dict[str, Any]:
+    """
+    Returns the projection matching the scoring mode (see `SearchBalancer.SERVER_SCORED`).
+    """
+    return SERVER_SCORED_FIELDS if SearchBalancer.SERVER_SCORED else RESCORE_FIELDS
+
+def make_filter(query_embedding: Any, ctx: List[Any] | DecodedBatch, top_k: int = SearchBalancer.STOP_INDEX) -> Filter:
+    """
+    Instanciates the filter keeping at most `top_k` items (according to context tokens limit).
+    Local re-scoring remains available (SERVER_SCORED = False) to normalize scores across targets.
+    A `DecodedBatch` context is re-scored on its decoded embeddings.
+    """
+    embeddings = None
+    if isinstance(ctx, DecodedBatch):
+        ctx, embeddings = ctx.documents, ctx.embeddings
+    filter_cls = ScoreFilter if SearchBalancer.SERVER_SCORED else Filter
+    return filter_cls(
+        query_embedding, 
+        ctx, 
+        threshold=SearchBalancer.THRESHOLD,
+        batch_size=SearchBalancer.BATCH_SIZE,
+        top_k=top_k,
+        embeddings=embeddings
+    )
+
+def make_merger(top_k: Optional[int] = SearchBalancer.STOP_INDEX) -> TopKMerger:
+    """
+    Instanciates the merger keeping at most `top_k` items. Each target's scores are normalized as set by
+    `SearchBalancer.SCORE_NORMALIZATION`, and documents found by several targets are kept once when
+    `SearchBalancer.DEDUP` is set.
+    """
+    return TopKMerger(top_k, normalization=ScoreNormalization(SearchBalancer.SCORE_NORMALIZATION), dedup=SearchBalancer.DEDUP)
+
+def score_targets(query_embedding: Any, ctx: Sequence[List[Any] | DecodedBatch]) -> List[Tuple[int, Filter, np.ndarray]]:
+    """
+    Scores each non-empty target's context (see `make_filter`).
+
+    Returns:
+        List[Tuple[int, Filter, np.ndarray]]: The position in `ctx` of each target, its filter and its scores.
+    """
+    scored = []
+    for source, target_ctx in enumerate(ctx):
+        if not len(target_ctx):
+            continue
+        filter = make_filter(query_embedding, target_ctx, top_k=None)
+        scored.append((source, filter, filter.scores()))
+    return scored
+
+def merge_scored(scored: Sequence[Tuple[int, Filter, np.ndarray]], merger: TopKMerger) -> List[Tuple[Dict, int]]:
+    """
+    Merges scored targets (see `score_targets`) into the best items above the threshold, best first.
+    """
+    for source, filter, scores in scored:
+        merger.add(source, filter.ctx_items, scores, threshold=filter.threshold)
+    return [(Filter.to_result(item, score), source) for item, score, source in merger.results()]
+
+def merge_results(query_embedding: Any, ctx: Sequence[List[Any] | DecodedBatch], top_k: Optional[int] = SearchBalancer.STOP_INDEX, merger: Optional[TopKMerger] = None) -> List[Tuple[Dict, int]]:
+    """
+    Scores each target's context and merges them into the `top_k` best items above the threshold, best first.
+
+    Targets are streamed through a bounded heap (see `make_merger`). A `merger` can be passed to inspect it
+    afterwards; `top_k` is then ignored.
+
+    Returns:
+        List[Tuple[Dict, int]]: The results, with the position in `ctx` of the target each one comes from.
+    """
+    return merge_scored(score_targets(query_embedding, ctx), merger if merger is not None else make_merger(top_k))
+
+def query_prefilters(targets: Sequence[Dict[str, Any]], query: str, filters: FilterSpec | Mapping[str, FilterSpec] | None = None) -> Dict[str, Dict[str, Any]]:
+    """
+    Compiles the `$vectorSearch` pre-filter of each target searched for a query.
+
+    The explicit `filters` apply as given. With `SearchBalancer.AUTO_FILTER`, symbols, asset classes and dates
+    mentioned in the query are also extracted (see `extract_filter_spec`), the explicit fields taking precedence.
+
+    Args:
+        targets (Sequence[Dict[str, Any]]): The search targets.
+        query (str): The query.
+        filters (FilterSpec | Mapping[str, FilterSpec] | None, optional): One spec for every target, or specs by
+            collection name.
+
+    Returns:
+        Dict[str, Dict[str, Any]]: The pre-filter of each filtered target, by collection name.
+    """
+    extracted = None
+    if SearchBalancer.AUTO_FILTER:
+        try:
+            parser = keyword_parser()
+        except LookupError:
+            parser = None  # NLTK data missing: every word is considered
+        extracted = extract_filter_spec(query, parser)
+    prefilters = target_prefilters(targets, filters, extracted)
+    if prefilters:
+        logger.log("info", "Pre-filtering the vector search.", params={name: str(prefilter) for name, prefilter in prefilters.items()})
+    return prefilters
+
+@async_timer(logger, sample_rate=SearchBalancer.LOG_SAMPLE_RATE)
+async def embed_query(query: str) -> Any:
+    try:
+        embedder = get_shared_embedder(cache=get_embedding_cache())
+        with STAGE_SECONDS.time(stage="embed"):
+            return await embedder.request(query)
+    except Exception as e:
+        logger.log("error", "Embedding error.", e)
+        raise
+
+async def _on_query(client: MongoClient, query: str, filters: FilterSpec | Mapping[str, FilterSpec] | None = None) -> List[str]:
     """
     Handles a query by embedding the query and performing a vector search.
 
+    Only the targets the query is routed to are searched (see `route_targets`).
+    The whole query, embedding included, must complete within `RetryBalancer.DEADLINE`. Each target search
+    attempt is bounded by `RetryBalancer.TARGET_TIMEOUT` (also sent to the server as `maxTimeMS`), and
+    connection errors and timeouts are retried per target by `ContextBuilder` while the deadline allows, so a
+    flaky collection neither re-runs the embedding nor the other targets. Targets still failing at the
+    deadline are left out of the context (partial results, logged as a warning), which is then not cached;
+    the query fails if every target did, or if any did and `RetryBalancer.PARTIAL_RESULTS` is off.
+    Pre-filtered searches (see `query_prefilters`) bypass the result cache, whose entries are unfiltered.
+
     Args:
+        client (MongoClient): The MongoClient object.
         query (str): The query to be embedded and searched.
-        num_candidates (int, optional): The number of candidates to return. Defaults to _DEFAULT_NUM_CANDIDATES.
-        limit_per_group (int, optional): The maximum number of results to return per group. Defaults to _DEFAULT_LIMIT.
+        filters (FilterSpec | Mapping[str, FilterSpec] | None, optional): Metadata constraints pushed into the
+            targets' `$vectorSearch`, for every target or by collection name.
 
     Returns:
         List[str]: A list of strings representing the context of the query.
+
+    Raises:
+        asyncio.TimeoutError: The embedding did not complete within the deadline.
+        Exception: The error of the targets given up on (see `ContextBuilder.collect`).
     """
     ctx = []
+    partial = False
+    outcomes = []
 
-    @async_timer(logger)
-    async def embed_query(query: str) -> Any:
-        try:
-            embedder = VectorEmbeddingManager()
-            return await embedder.request(query)
-        except Exception as e:
-            logger.log("error", "Embedding error.", e)
-            raise
-        finally:
-            await embedder.close()
-
-    @async_timer(logger)
-    async def embedding_callback(embedding: Any, *args) -> List[Any]:
-        nonlocal ctx
-        executor = Executor(*args)
-        fields = {
-            '_id': 1, 
-            'content': 1, 
-            'contentStr': 1, 
-            'content_embedding': 1, 
-            'name_embedding': 1, 
-            'description_embedding': 1, 
-            'price_embedding': 1
-        }
-        ctx = await executor.build_context(embedding, fields=fields)
-
-        flatten_ctx = flatten_list(ctx)
-        return flatten_ctx
-
-    @timer(logger)
-    def filter_search(query_embedding: Any, flatten_ctx: List[Any]) -> List[Any]:
-        # instanciate the filter
-        filter = Filter(
-            query_embedding, 
-            flatten_ctx, 
-            threshold=SearchBalancer.THRESHOLD,
-            batch_size=SearchBalancer.BATCH_SIZE    
-        ) 
-        # Filtering the context and flattening it
-        final_ctx = flatten_list(list(filter()))
-        # apply stop index according to context tokens limit 
-        return final_ctx[:SearchBalancer.STOP_INDEX] 
+    @async_timer(logger, sample_rate=SearchBalancer.LOG_SAMPLE_RATE)
+    async def embedding_callback(embedding: Any, *args) -> List[List[Any] | DecodedBatch]:
+        nonlocal ctx, partial, outcomes
+        # Re-scoring needs the embeddings: decode them straight from raw BSON.
+        executor = Executor(*args, decoded=not SearchBalancer.SERVER_SCORED, tuner=get_tuner(), prefilters=prefilters, router=get_router())
+        outcomes = await executor.build_outcomes(embedding, fields=search_fields(), deadline=deadline)
+        ctx = executor.builder.collect(outcomes)
+        missed = [outcome for outcome in outcomes if not outcome.ok]
+        if missed:
+            partial = True
+            logger.log("warning", "Partial context: some targets were given up on.", 
+                       params={outcome.target['collection_name']: repr(outcome.error) for outcome in missed})
+        return ctx
+
+    @timer(logger, sample_rate=SearchBalancer.LOG_SAMPLE_RATE)
+    def filter_search(query_embedding: Any, ctx: List[List[Any] | DecodedBatch]) -> List[Any]:
+        # Scoring each target, then merging them, best matches first
+        with STAGE_SECONDS.time(stage="rescore"):
+            scored = score_targets(query_embedding, ctx)
+        with STAGE_SECONDS.time(stage="merge"):
+            merger = make_merger()
+            merged = merge_scored(scored, merger)
+        selected = [0] * len(args)
+        for _, source in merged:
+            selected[source] += 1
+            RESULTS_ABOVE_THRESHOLD.inc(collection=args[source]['collection_name'])
+        # How many results each target contributed, so that the next searches fetch just enough
+        active_tuner = get_tuner()
+        if active_tuner is not None:
+            for source, outcome in enumerate(outcomes):
+                if outcome.ok:
+                    parameters = active_tuner.observe(outcome.target, len(ctx[source]), merger.offered.get(source, 0), selected[source])
+                    if parameters is not None:
+                        logger.log("info", f"Tuned {outcome.target['collection_name']}: num_candidates={parameters.num_candidates}, limit={parameters.limit}.")
+        return [item for item, _ in merged]
+
+    start = time.perf_counter()
+    deadline = asyncio.get_running_loop().time() + RetryBalancer.DEADLINE
     try:
-        arg_1 = ExecutorArg(
-            **SearchArgs.TICKERS.value,
-            connec_client = client
-        )()
-
-        arg_2 = ExecutorArg(
-            **SearchArgs.ARTICLES.value,
-            connec_client = client
-        )()
-        # more...
-        args = arg_1, arg_2, # more...
+        args = search_targets(client)
+        prefilters = query_prefilters(args, query, filters)
         # embed query here
-        embedding = await embed_query(query)
+        embedding = await asyncio.wait_for(embed_query(query), RetryBalancer.DEADLINE)
+        # a similar enough query, naming the same symbols, asset classes and dates, was answered recently
+        # (questions about different tickers can embed almost identically)
+        cache_key = extract_filter_spec(query) if not prefilters else None
+        cached_ctx = result_cache.get(embedding, key=cache_key) if not prefilters else None
+        if cached_ctx is not None:
+            return cached_ctx
+        args = route_targets(args, embedding)
         # on embedding callback
         ctx = await embedding_callback(embedding, *args)
         # on filter search
         final_ctx = filter_search(embedding, ctx)
 
+        if not partial and not prefilters:
+            result_cache.set(embedding, final_ctx, collections=[arg['collection_name'] for arg in args], key=cache_key)
         return final_ctx
 
     except Exception as e:
         logger.log("error", "Error while performing vector search", e)
         logger.log("warning", "Vector search aborted. Returning an empty list")
         raise
+    finally:
+        STAGE_SECONDS.observe(time.perf_counter() - start, stage="total")
 
-async def search(client: MongoClient, query: str) -> List[Any]:
+def invalidate_results(collection_name: Optional[str] = None) -> int:
+    """
+    Drops the cached search results built from `collection_name` (all results if None).
+    Call whenever a searched collection is updated.
+
+    Returns:
+        int: The number of cached results dropped.
+    """
+    return result_cache.invalidate(collection_name)
+
+
+def render_metrics() -> str:
+    """
+    Returns the search metrics (per-stage and per-target latency histograms, cache, retry and result
+    counters) in the Prometheus text exposition format.
+    """
+    return metrics_registry.render()
+
+
+def serve_metrics(port: int = 9464, host: str = "127.0.0.1"):
+    """
+    Serves `render_metrics()` over HTTP from a background thread. Returns the server; call its `shutdown()` to stop.
+    """
+    return metrics_registry.serve(port, host)
+
+
+async def warm_up(client: Optional[MongoClient] = None, queries: Sequence[str] = ()) -> None:
+    """
+    Pays the cold-start costs ahead of the first query: connects to and pings MongoDB, and embeds `queries`
+    (e.g. the most frequent ones), which opens a connection to the embeddings API and fills the cache.
+
+    Failures are logged rather than raised: the first query then pays for whatever is left.
+
+    Args:
+        client (Optional[MongoClient], optional): The client to warm up. Defaults to the shared client.
+        queries (Sequence[str], optional): Queries whose embeddings are prefetched. Defaults to none.
+    """
+    loop = asyncio.get_running_loop()
+    s = time.perf_counter()
+
+    async def ping():
+        await loop.run_in_executor(None, (client if client is not None else create_client(ping=False)).admin.command, 'ping')
+
+    async def prefetch():
+        embedder = get_shared_embedder(cache=get_embedding_cache())
+        if queries:
+            await embedder.request_many(list(queries))
+
+    results = await asyncio.gather(ping(), prefetch(), return_exceptions=True)
+    for step, result in zip(("MongoDB ping", "embedding prefetch"), results):
+        if isinstance(result, Exception):
+            logger.log("warning", f"Warm-up {step} failed.", result)
+    logger.log("info", f"Warm-up done in {time.perf_counter() - s:.4f} seconds.")
+
+
+async def startup(background_warm_up: bool = False, client: Optional[MongoClient] = None, warm_up_queries: Sequence[str] = ()) -> None:
+    """
+    Opens the process-wide embedding session and loads the local indexes of the searched targets, so that
+    the first query does not pay for them. Call once the event loop is running, e.g. from the application's
+    startup hook.
+
+    Args:
+        background_warm_up (bool, optional): Whether to also run `warm_up` as a background task, so that the
+            application can start serving without waiting for it. Defaults to False.
+        client (Optional[MongoClient], optional): The client to warm up. Defaults to the shared client.
+        warm_up_queries (Sequence[str], optional): Queries whose embeddings are prefetched by the warm-up.
+    """
+    global _warm_up_task
+    get_shared_embedder(cache=get_embedding_cache())
+    logger.log("info", "Embedding session opened.")
+    if await default_registry.prepare(search_targets(None)):
+        logger.log("info", "Local indexes loaded.")
+    if background_warm_up:
+        _warm_up_task = asyncio.create_task(warm_up(client, warm_up_queries))
+
+
+async def shutdown() -> None:
+    """
+    Closes the process-wide embedding session and the search clients shared by the target registry.
+    Call from the application's shutdown hook.
+    """
+    if _warm_up_task is not None and not _warm_up_task.done():
+        _warm_up_task.cancel()
+    await close_shared_embedder()
+    logger.log("info", "Embedding session closed.")
+    if embedding_cache is not None:
+        await asyncio.get_running_loop().run_in_executor(None, embedding_cache.flush)
+    await default_registry.close()
+    logger.log("info", "Search target registry closed.")
+
+
+async def search(client: MongoClient, query: str, filters: FilterSpec | Mapping[str, FilterSpec] | None = None) -> List[Any]:
     """
     Main access function of the vector search. Provides a high-level handling of the vector search.
 
     First, a list of `ExecutorArg` objects is created. Then, the vector search is performed by calling the
     `Executor` class with the list of ExecutorArg objects. 
     Finally, the search results are filtered to return the `n` most relevant results.
+    The query is embedded through the process-wide embedding session (see `startup`/`shutdown`).
 
     Args:
         client (MongoClient): The MongoClient object.
         query (str): The query to be searched for. Since the search is vector based, the query is first embedded 
         so that the result of the search  can be similarity based.
+        filters (FilterSpec | Mapping[str, FilterSpec] | None, optional): Metadata constraints (symbols, asset
+            classes, dates) applied inside the vector search of the targets supporting them.
 
     Returns:
         List[str]: A list of strings representing the result of the query.
     """
     try:
-        return await _on_query(client, query)
+        return await _on_query(client, query, filters)
     except Exception as e:
         logger.log("error", "Error while performing vector search", e)
         logger.log("warning", "Vector search aborted. Returning an empty list")
         raise
 
+async def search_stream(client: MongoClient, query: str, filters: FilterSpec | Mapping[str, FilterSpec] | None = None) -> AsyncIterator[List[Any]]:
+    """
+    Streaming counterpart of `search`: yields each target's filtered results as soon as its search completes.
+
+    The query is embedded once, then every target is searched concurrently. Each target's results are
+    filtered as they arrive, so the fastest collection is not held back by the slowest one. Iteration stops,
+    cancelling the searches still in flight, once `SearchBalancer.STOP_INDEX` items have been yielded.
+
+    Args:
+        client (MongoClient): The MongoClient object.
+        query (str): The query to be searched for.
+        filters (FilterSpec | Mapping[str, FilterSpec] | None, optional): Metadata constraints, as in `search`.
+
+    Yields:
+        List[Any]: The filtered results of one target, best matches first. Targets without any result above
+        the threshold yield nothing.
+    """
+    try:
+        targets = search_targets(client)
+        prefilters = query_prefilters(targets, query, filters)
+        embedding = await embed_query(query)
+        builder = ContextBuilder(*route_targets(targets, embedding), prefilters=prefilters, router=get_router())
+
+        remaining = SearchBalancer.STOP_INDEX
+        # Documents already yielded by a faster target are not repeated.
+        seen = set()
+        # Closed on exit, so that the searches still in flight are cancelled as soon as we stop.
+        async with aclosing(builder.build_stream(embedding, search_fields())) as stream:
+            async for target, target_ctx in stream:
+                results = make_filter(embedding, target_ctx, top_k=None)()
+                if SearchBalancer.DEDUP:
+                    results = [item for item in results if dedup_key(item) not in seen]
+                    seen.update(dedup_key(item) for item in results)
+                results = results[:remaining]
+                if results:
+                    remaining -= len(results)
+                    yield results
+                if remaining <= 0:
+                    break
+    except Exception as e:
+        logger.log("error", "Error while performing streaming vector search", e)
+        raise
+
+@async_timer(logger)
+async def search_many(client: MongoClient, queries: List[str], concurrency: int = SearchBalancer.MAX_CONCURRENT_SEARCHES) -> List[List[Any]]:
+    """
+    Bulk counterpart of `search`, meant for offline jobs running many queries at once.
+
+    All queries are embedded with batched API calls and every (query, target) search is scheduled under a
+    single concurrency limit. Each query is searched on the targets it is routed to (see `route_targets`), and
+    its targets' results are merged as in `search` (see `merge_results`).
+
+    Args:
+        client (MongoClient): The MongoClient object.
+        queries (List[str]): The queries to be searched for.
+        concurrency (int, optional): The maximum number of searches in flight at once. Defaults to
+            `SearchBalancer.MAX_CONCURRENT_SEARCHES`.
+
+    Returns:
+        List[List[Any]]: The results of each query, in the order of `queries`.
+
+    Raises:
+        Exception: The error of a query whose targets all failed, or of any failed target if
+            `RetryBalancer.PARTIAL_RESULTS` is off (see `ContextBuilder.collect`).
+    """
+    try:
+        embedder = get_shared_embedder(cache=get_embedding_cache())
+        embeddings = await embedder.request_many(list(queries))
+
+        targets = search_targets(client)
+        fields = search_fields()
+        builder = ContextBuilder(*targets, router=get_router())
+        semaphore = asyncio.Semaphore(concurrency)
+        routed = [route_targets(targets, embedding) for embedding in embeddings]
+
+        async def bounded_search(embedding: Any, target: Dict[str, Any]) -> TargetOutcome:
+            async with semaphore:
+                # Each search gets the full deadline once it is allowed to start.
+                return await builder.target_outcome(embedding, fields, target, builder.deadline())
+
+        per_target = iter(await asyncio.gather(*(
+            bounded_search(embedding, target) for embedding, query_targets in zip(embeddings, routed) for target in query_targets
+        )))
+        # As in `search`, a query raises if all its targets failed (or any did, without partial results).
+        ctx_per_query = [builder.collect([next(per_target) for _ in query_targets]) for query_targets in routed]
+
+        return [
+            [item for item, _ in merge_results(embedding, ctx)]
+            for embedding, ctx in zip(embeddings, ctx_per_query)
+        ]
+    except Exception as e:
+        logger.log("error", "Error while performing bulk vector search", e)
+        raise
+
+@async_timer(logger, sample_rate=SearchBalancer.LOG_SAMPLE_RATE)
+async def hybrid_search(client: MongoClient, query: str, method: FusionMethod = FusionMethod.RECIPROCAL_RANK) -> List[Any]:
+    """
+    Hybrid counterpart of `search`: combines full-text and vector retrieval.
+
+    The query's keywords (extracted with `filters.constraints.Parser`, or the raw query if NLTK data is
+    missing) are matched with Atlas Search on every default target (see `default_targets`) that has
+    `TextSearchArgs`, while the query is embedded and searched with `$vectorSearch` on the targets it is
+    routed to (see `route_targets`). Both sides run concurrently, under the same deadline, retry policy and
+    routing slots, and their rankings are merged with `fuse`, so exact matches such as ticker symbols are
+    kept even when the embeddings miss them. Text scores are normalized per target (see
+    `SearchBalancer.LEXICAL_SCORE_NORMALIZATION`); if the text searches fail, the query is answered from the
+    vector side alone.
+
+    Args:
+        client (MongoClient): The MongoClient object.
+        query (str): The query to be searched for.
+        method (FusionMethod, optional): How the two rankings are merged. Defaults to reciprocal rank fusion.
+
+    Returns:
+        List[Any]: The `SearchBalancer.STOP_INDEX` best fused results.
+    """
+    targets = search_targets(client)
+    builder = ContextBuilder(*targets, router=get_router())
+    deadline = builder.deadline()
+
+    async def vector_side() -> List[Dict]:
+        embedding = await asyncio.wait_for(embed_query(query), RetryBalancer.DEADLINE)
+        vector_builder = ContextBuilder(*route_targets(targets, embedding), router=get_router())
+        ctx = await vector_builder.build(embedding, search_fields(), deadline=deadline)
+        return [item for item, _ in merge_results(embedding, ctx, top_k=None)]
+
+    async def lexical_side() -> List[Dict]:
+        try:
+            terms = " ".join(keyword_parser().keywords(query)) or query
+        except LookupError:
+            terms = query  # NLTK data missing: the whole query is matched
+        outcomes = await asyncio.gather(*(
+            builder.lexical_outcome(terms, fields=LEXICAL_FIELDS, target=target, deadline=deadline, **args)
+            for target in default_targets(targets) if (args := target_settings(TextSearchArgs, target)) is not None
+        ))
+        missed = [outcome for outcome in outcomes if not outcome.ok]
+        if missed:
+            logger.log("warning", "Partial lexical context: some text indexes were given up on.",
+                       params={outcome.target['collection_name']: repr(outcome.error) for outcome in missed})
+        if missed and (len(missed) == len(outcomes) or not builder.policy.partial_results):
+            # The lexical side only adds to the vector one: without it, the query is answered vector-only.
+            logger.log("warning", "Lexical retrieval failed: answering with vector search only.")
+            return []
+        # Atlas Search scores are not comparable across collections: each target's are normalized first.
+        normalization = ScoreNormalization(SearchBalancer.LEXICAL_SCORE_NORMALIZATION)
+        scored = []
+        for outcome in outcomes:
+            scores = np.fromiter((item.get('score', 0.0) for item in outcome.results), dtype=np.float64, count=len(outcome.results))
+            scored.extend(zip(outcome.results, normalize_scores(scores, normalization).tolist()))
+        scored.sort(key=lambda pair: -pair[1])
+        return [Filter.to_result(item, score) for item, score in scored]
+
+    try:
+        vector_ranked, lexical_ranked = await asyncio.gather(vector_side(), lexical_side())
+        weights = (SearchBalancer.HYBRID_VECTOR_WEIGHT, 1.0 - SearchBalancer.HYBRID_VECTOR_WEIGHT)
+        return fuse([vector_ranked, lexical_ranked], method, weights, top_k=SearchBalancer.STOP_INDEX)
+    except Exception as e:
+        logger.log("error", "Error while performing hybrid search", e)
+        raise
+
 @async_timer(logger)
 async def main(query: str) -> None: 
-    # create client
-    client = create_client()
+    # create client: connects in the background while the embedding session opens
+    client = create_client(ping=False)
     if not client:
         raise ValueError("No client found. Aborting...")
 
-    ctx = await search(client, query)
+    await startup(background_warm_up=True, client=client)
+    try:
+        ctx = await search(client, query)
+    finally:
+        await shutdown()
 
     if isinstance (ctx, list):
         print("Context totat components: ", len(ctx))
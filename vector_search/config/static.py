@@ -1,4 +1,5 @@
 from enum import Enum
+from typing import Any, Dict, Mapping, Optional, Type
 
 
 class EmbeddingType(Enum):
@@ -15,9 +16,98 @@ class SearchBalancer:
     STOP_INDEX: int = 32
     BATCH_SIZE: int = 1024
     THRESHOLD: float = 0.5
+    RRF_K: int = 60
+    HYBRID_VECTOR_WEIGHT: float = 0.5
+    SERVER_SCORED: bool = True  # rank on Atlas' vectorSearchScore instead of re-scoring embeddings locally
+    SCORE_NORMALIZATION: str = "none"  # per-target scaling before targets are merged: "none", "minmax" or "zscore"
+    LEXICAL_SCORE_NORMALIZATION: str = "minmax"  # same, for Atlas Search scores, which have no common scale across collections
+    DEDUP: bool = True  # keep one occurrence of a document returned by several targets
+    AUTO_FILTER: bool = False  # derive symbol/asset class/date pre-filters from each query (see `filters.prefilter`)
+    LOG_SAMPLE_RATE: float = 0.1  # share of queries whose per-stage timings are logged
+    MAX_CONCURRENT_SEARCHES: int = 32
+    CURSOR_BATCH_SIZE: int = 16
+    MAX_POOL_SIZE: int = 100
+    MAX_MANAGERS: int = 128  # search managers kept by a `TargetRegistry`, least recently used evicted first
+    LOCAL_INDEX_PATH: str = "indexes"
+    LOCAL_IVF_ITERATIONS: int = 10
+
+
+class RetryBalancer:
+    DEADLINE: float = 3.0  # seconds, for a whole query (embedding and every target)
+    TARGET_TIMEOUT: float = 1.5  # seconds, per search attempt on one target
+    TARGET_RETRIES: int = 2
+    BACKOFF_BASE: float = 0.05  # seconds
+    BACKOFF_MAX: float = 0.5  # seconds
+    PARTIAL_RESULTS: bool = True  # targets that fail or miss the deadline contribute no results instead of failing the query
+    HEDGE: bool = False  # duplicate a target search still running after its HEDGE_QUANTILE latency
+    HEDGE_QUANTILE: float = 0.95
+    HEDGE_MIN_DELAY: float = 0.02  # seconds
+    HEDGE_MIN_SAMPLES: int = 50  # observed searches needed before the quantile is trusted
+
+
+class TuningBalancer:
+    ENABLED: bool = False  # adjust num_candidates/limit per target from observed searches (see `builder.tuning`)
+    LATENCY_BUDGET: float = 0.25  # seconds, for one target search at LATENCY_QUANTILE
+    LATENCY_QUANTILE: float = 0.95
+    TARGET_RECALL: float = 0.95  # share of searches whose contribution to the top STOP_INDEX is not cut by `limit`
+    CANDIDATE_RATIO: float = 5.0  # num_candidates per result when the budget allows; measure it with `bench.sweep`
+    MIN_LIMIT: int = 5
+    MAX_LIMIT: int = 200
+    MIN_NUM_CANDIDATES: int = 10
+    MAX_NUM_CANDIDATES: int = 2000  # Atlas accepts up to 10000
+    WINDOW: int = 200  # recent searches kept per target
+    ADJUST_EVERY: int = 20  # searches between two adjustments of a target
+    STEP: float = 1.25  # largest change of a parameter per adjustment
+    MARGIN: float = 0.25  # `limit` headroom above the results actually used
+    HEADROOM: float = 0.5  # num_candidates only grows while latency is under this share of the budget
+
+
+class RoutingBalancer:
+    ENABLED: bool = True  # search each query's relevant targets only, under concurrency limits (see `builder.routing`)
+    MARGIN: float = 0.03  # targets scoring within this of the best one are searched too
+    MAX_TARGETS: int = 2  # targets chosen by score per query, besides the `always` ones (see `RouteArgs`)
+    CENTROIDS: int = 8  # centroids summarizing each target; compute them with `bench.routing`
+    MAX_CONCURRENT_TARGETS: int = 64  # target searches in flight in the process, below MAX_POOL_SIZE
+    MAX_CONCURRENT_PER_TARGET: int = 24  # target searches in flight on one collection
+
+
+class EmbeddingBalancer:
+    API_URL: str = "https://api.openai.com/v1/embeddings"
+    MODEL: str = "text-embedding-ada-002"
+    MAX_INPUTS_PER_REQUEST: int = 2048
+    COALESCE_MAX_BATCH_SIZE: int = 64
+    COALESCE_MAX_DELAY: float = 0.005  # seconds
+    POOL_SIZE: int = 100
+    KEEPALIVE_TIMEOUT: float = 60  # seconds
+    DNS_CACHE_TTL: int = 300  # seconds
+    REQUEST_TIMEOUT: float = 10  # seconds
+
+
+class CacheBalancer:
+    MEMORY_MAX_SIZE: int = 4096
+    MEMORY_TTL: float = 60 * 60  # seconds
+    DISK_MAX_SIZE: int = 100_000
+    DISK_TTL: float = 7 * 24 * 60 * 60  # seconds
+    DISK_TOUCH_BATCH: int = 256  # disk hits whose access time is written at once
+    SEMANTIC_SIMILARITY: float = 0.95
+    SEMANTIC_MAX_ENTRIES: int = 4096
+    SEMANTIC_MAX_BYTES: int = 64 * 1024 * 1024
+    SEMANTIC_TTL: float = 10 * 60  # seconds
+
+
+class SearchBackend(Enum):
+    # Selected per target with a "backend" key in its `SearchArgs` entry.
+    # "local" targets may also set "local_path" and "local_mode" (see `LocalIndexMode`).
+    SYNC = "sync"
+    ASYNC = "async"
+    LOCAL = "local"
+
+class LocalIndexMode(Enum):
+    EXACT = "exact"
+    IVF = "ivf"
 
 class SearchStrategy(Enum):
-    FILTER = None
+    FILTER = "filter"  # pre-filters pushed into `$vectorSearch.filter` (see `FilterArgs`)
     ORDER_BY = None
 
 class SearchArgs(Enum):
@@ -55,4 +145,102 @@ class SearchArgs(Enum):
         "index" : "crypto_index",
         "num_candidates" : SearchBalancer.DEFAULT_NUM_CANDIDATES,
         "limit" : SearchBalancer.DEFAULT_LIMIT_PER_GROUP,
-    }
\ No newline at end of file
+    }
+
+class TextSearchArgs(Enum):
+    # Atlas Search (full-text) settings of the `SearchArgs` member of the same name, used by hybrid search.
+    ARTICLES = {
+        "text_index" : "article_text_index",
+        "text_paths" : ["content", "contentStr"],
+    }
+
+    TICKERS = {
+        "text_index" : "ticker_text_index",
+        "text_paths" : ["name", "description"],
+    }
+
+    FOREX = {
+        "text_index" : "forex_text_index",
+        "text_paths" : ["name", "description"],
+    }
+
+    CRYPTOS = {
+        "text_index" : "crypto_text_index",
+        "text_paths" : ["name", "description"],
+    }
+
+class FilterArgs(Enum):
+    # Pre-filter settings of the `SearchArgs` member of the same name: the document fields a `FilterSpec`
+    # constrains ("symbols", "asset_class", "date"). Each one must be indexed with type "filter" in the
+    # target's Atlas vector index; targets without an entry are never pre-filtered.
+    ARTICLES = {
+        "strategy" : SearchStrategy.FILTER,
+        "symbols" : "symbols",
+        "date" : "published_at",
+    }
+
+    TICKERS = {
+        "strategy" : SearchStrategy.FILTER,
+        "symbols" : "symbol",
+        "asset_class" : "asset_class",
+    }
+
+    FOREX = {
+        "strategy" : SearchStrategy.FILTER,
+        "symbols" : "symbol",
+        "asset_class" : "asset_class",
+        "date" : "date",
+    }
+
+    CRYPTOS = {
+        "strategy" : SearchStrategy.FILTER,
+        "symbols" : "symbol",
+        "asset_class" : "asset_class",
+        "date" : "date",
+    }
+
+class RouteArgs(Enum):
+    # Routing settings of the `SearchArgs` member of the same name (see `builder.routing.TargetRouter`).
+    # `priority`: higher goes first when search slots are short. `weight`: scales the target's routing score.
+    # `always`: searched for every query, whatever its score. `optional`: only searched when routed to, so
+    # never without centroids for it (routing must be able to prune it before it adds to every query's fan-out).
+    ARTICLES = {
+        "priority" : 2,
+        "weight" : 1.0,
+        "always" : True,
+        "optional" : False,
+    }
+
+    TICKERS = {
+        "priority" : 1,
+        "weight" : 1.0,
+        "always" : False,
+        "optional" : False,
+    }
+
+    FOREX = {
+        "priority" : 0,
+        "weight" : 1.0,
+        "always" : False,
+        "optional" : True,
+    }
+
+    CRYPTOS = {
+        "priority" : 0,
+        "weight" : 1.0,
+        "always" : False,
+        "optional" : True,
+    }
+
+
+def target_settings(settings: Type[Enum], target: Mapping[str, Any], default: Optional[Dict[str, Any]] = None) -> Optional[Dict[str, Any]]:
+    """
+    Returns the settings of a target configuration in a per-target enum (`TextSearchArgs`, `FilterArgs`,
+    `RouteArgs`): the member named like the `SearchArgs` member of the target's collection, over `default`.
+    Returns `default` if the target has no such member.
+    """
+    for args in SearchArgs:
+        if args.value["collection_name"] == target.get("collection_name") and args.name in settings.__members__:
+            value = settings[args.name].value
+            return value if default is None else default | value
+    return default if default is None else dict(default)
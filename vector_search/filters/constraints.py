@@ -1,12 +1,12 @@
-import time
-from concurrent.futures import ThreadPoolExecutor
-from typing import List, Any
-from dataclasses import dataclass
+from concurrent.futures import ProcessPoolExecutor
+from typing import List, Any, Optional, Sequence, Dict
+from dataclasses import dataclass, field
 
+import numpy as np
 import nltk
 from nltk.corpus import stopwords
 from nltk.tokenize import word_tokenize
-from nltk import pos_tag
+from nltk import pos_tag_sents
 from functools import lru_cache
 
 from vector_search.utils.logs import timer
@@ -19,27 +19,90 @@ def download_nltk_data():
     nltk.download('averaged_perceptron_tagger')
 
 
-class Parser:
-    def __init__(self):
-        self.stop_words = set(stopwords.words('english'))
+# Worker-process state, loaded once per worker by `_init_worker`.
+_worker_stop_words: frozenset = frozenset()
 
-    @lru_cache(maxsize=1024)  # Cache results for repeated calls
-    @timer()
-    def minimize(self, text: str) -> str:
+
+def _init_worker():
+    global _worker_stop_words
+    _worker_stop_words = frozenset(stopwords.words('english'))
+    pos_tag_sents([["warm", "up"]])  # loads the tagger model once for this worker
+
+
+def _minimized_tokens(text: str, stop_words: frozenset) -> List[str]:
+    return [word for word in word_tokenize(text) if word.isalpha() and word.lower() not in stop_words]
+
+
+def _nouns(tagged_words) -> List[str]:
+    return [word for word, pos in tagged_words if pos.startswith('NN')]
+
+
+def _keywords_chunk(texts: Sequence[str]) -> List[List[str]]:
+    tokens = [_minimized_tokens(text, _worker_stop_words) for text in texts]
+    return [_nouns(tagged) for tagged in pos_tag_sents(tokens)]
+
+
+class Parser:
+    """
+    Extracts keywords (nouns left once stop words are removed) from text.
+
+    Single texts go through `minimize`/`extract_kwds`, which are cached per instance. Many texts at once
+    should go through `keywords_batch`, which tags them in one `pos_tag_sents` call, optionally spread
+    across a process pool whose workers load the tagger once.
+    """
+    def __init__(self, cache_size: int = 1024, workers: int = 0, chunk_size: int = 64):
+        """
+        Initializes the Parser class.
+
+        Args:
+            cache_size (int, optional): The number of texts whose results are cached per method. Defaults to 1024.
+            workers (int, optional): The number of worker processes used by `keywords_batch`. 0 or 1 keeps
+                batches in-process. Defaults to 0.
+            chunk_size (int, optional): The number of texts sent to a worker at once. Defaults to 64.
+        """
+        self.stop_words = frozenset(stopwords.words('english'))
+        self.workers = workers
+        self.chunk_size = chunk_size
+        self._pool: Optional[ProcessPoolExecutor] = None
+
+        # Per-instance caches: unlike `lru_cache` on the methods, they do not keep every parser alive.
+        self.minimize = lru_cache(maxsize=cache_size)(self._minimize)
+        self.extract_kwds = lru_cache(maxsize=cache_size)(self._extract_kwds)
+
+    def _minimize(self, text: str) -> str:
         """Remove stop words and non-alphabetic tokens from the text."""
-        words = word_tokenize(text)
-        min_qx = [word for word in words if word.isalpha() and word.lower() not in self.stop_words]
-        return " ".join(min_qx)
+        return " ".join(_minimized_tokens(text, self.stop_words))
 
-    @lru_cache(maxsize=1024)
-    @timer()
-    def extract_kwds(self, text: str) -> List[str]:
+    def _extract_kwds(self, text: str) -> List[str]:
         """Extract nouns from the text."""
-        words = word_tokenize(text)
-        tagged_words = pos_tag(words)
-        return [word for word, pos in tagged_words if pos.startswith('NN')]
+        return _nouns(pos_tag_sents([word_tokenize(text)])[0])
+
+    def keywords(self, text: str) -> List[str]:
+        """Extract the keywords of a single text, i.e. the nouns of its minimized form."""
+        return self.extract_kwds(self.minimize(text))
+
+    def keywords_batch(self, texts: Sequence[str]) -> List[List[str]]:
+        """
+        Extract the keywords of many texts, in order.
+
+        All texts are tagged together with `pos_tag_sents`; with `workers > 1` the batch is split into
+        chunks of `chunk_size` texts processed by the pool.
+        """
+        if self.workers > 1 and len(texts) > self.chunk_size:
+            if self._pool is None:
+                self._pool = ProcessPoolExecutor(max_workers=self.workers, initializer=_init_worker)
+            chunks = [texts[i:i + self.chunk_size] for i in range(0, len(texts), self.chunk_size)]
+            return [kwds for chunk in self._pool.map(_keywords_chunk, chunks) for kwds in chunk]
+
+        tokens = [_minimized_tokens(text, self.stop_words) for text in texts]
+        return [_nouns(tagged) for tagged in pos_tag_sents(tokens)]
+
+    def close(self):
+        """Shuts the worker pool down, if one was started."""
+        if self._pool is not None:
+            self._pool.shutdown()
+            self._pool = None
 
-    @timer()
     def similarity(self, *kwds: str) -> float:
         """Calculate the similarity score based on the intersection of keyword sets."""
         if not kwds:
@@ -57,36 +120,92 @@ class Parser:
         return len(x) / min_len if min_len else 0.0
 
 
+class KeywordIndex:
+    """
+    An inverted index from keyword to the ids of the contexts containing it.
+
+    Scoring a target walks only the postings of the target's own keywords, so the cost grows with the
+    number of matching contexts rather than with every (target, context) pair. Scores are the same as
+    `Parser.similarity(target_keywords, context_keywords)`.
+    """
+    def __init__(self, parser: Parser):
+        self.parser = parser
+        self.contexts: List[str] = []
+        self.postings: Dict[str, List[int]] = {}
+        self._sizes: List[int] = []
+
+    def __len__(self) -> int:
+        return len(self.contexts)
+
+    def add(self, contexts: Sequence[str]) -> List[int]:
+        """
+        Indexes more contexts. Returns their ids, i.e. their positions in `contexts`.
+        """
+        start = len(self.contexts)
+        for offset, kwds in enumerate(self.parser.keywords_batch(contexts)):
+            for kw in set(kwds):
+                self.postings.setdefault(kw, []).append(start + offset)
+            self._sizes.append(len(kwds))
+        self.contexts.extend(contexts)
+        return list(range(start, len(self.contexts)))
+
+    def similarities(self, kwds: List[str]) -> np.ndarray:
+        """
+        Returns the similarity of every indexed context to the given keywords, indexed by context id.
+        """
+        overlaps = np.zeros(len(self.contexts), dtype=np.int32)
+        if not kwds:
+            return overlaps.astype(np.float64)
+        for kw in set(kwds):
+            posting = self.postings.get(kw)
+            if posting:
+                overlaps[posting] += 1
+
+        sizes = np.asarray(self._sizes, dtype=np.float64)
+        min_len = np.minimum(sizes, len(kwds))
+        return np.divide(overlaps, min_len, out=np.zeros(len(self.contexts)), where=min_len > 0)
+
+    def search(self, target: str, threshold: float) -> List[str]:
+        """
+        Returns the contexts whose similarity to `target` reaches `threshold`, in index order.
+        """
+        scores = self.similarities(self.parser.keywords(target))
+        return [self.contexts[i] for i in np.flatnonzero(scores >= threshold)]
+
+
 @dataclass
 class Filter:
     ctx: List[str]
     threshold: float
     parser: Parser
+    indexed: bool = False
+    index: Optional[KeywordIndex] = field(default=None, repr=False)
+
+    def add(self, contexts: Sequence[str]):
+        """Adds contexts to filter; in indexed mode they are indexed incrementally."""
+        self.ctx.extend(contexts)
+        if self.index is not None:
+            self.index.add(contexts)
 
     @timer()
     def __call__(self, target: str) -> Any:
-        s = time.perf_counter()
-
-        # Preprocess the target once
-        min_tx = self.parser.minimize(target)
-        tx_kwds = self.parser.extract_kwds(min_tx)
 
-        # Function to process each context in parallel
-        def process_context(idx, ctx):
-            min_qx = self.parser.minimize(ctx)
-            kwds = self.parser.extract_kwds(min_qx)
-            return idx, kwds, ctx
+        if self.indexed:
+            # The index is built once per context set and reused by later calls
+            if self.index is None:
+                self.index = KeywordIndex(self.parser)
+                self.index.add(self.ctx)
+            results = self.index.search(target, self.threshold)
+        else:
+            # Preprocess the target once
+            tx_kwds = self.parser.keywords(target)
 
-        # Use parallel processing to minimize and extract keywords
-        with ThreadPoolExecutor() as executor:
-            futures = [executor.submit(process_context, idx, ctx) for idx, ctx in enumerate(self.ctx)]
-            extracted_kwds = {str(idx): {'kwds': kwds, 'c': ctx} for idx, kwds, ctx in [f.result() for f in futures]}
+            # Minimize and extract keywords of all contexts in one batch
+            extracted_kwds = self.parser.keywords_batch(self.ctx)
 
-        # Filter results based on similarity
-        results = [v['c'] for v in extracted_kwds.values() if self.parser.similarity(tx_kwds, v['kwds']) >= self.threshold]
+            # Filter results based on similarity
+            results = [c for c, kwds in zip(self.ctx, extracted_kwds) if self.parser.similarity(tx_kwds, kwds) >= self.threshold]
 
-        e = time.perf_counter()
-        print(f"Time for filtering: {e-s} seconds")
         return results
 
 
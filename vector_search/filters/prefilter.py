@@ -0,0 +1,275 @@
+import re
+from dataclasses import dataclass, replace
+from datetime import datetime, timedelta, timezone
+from typing import TYPE_CHECKING, Any, Dict, Iterable, List, Mapping, Optional, Tuple, Union
+
+from vector_search.config.static import FilterArgs, SearchStrategy, target_settings
+
+if TYPE_CHECKING:
+    from vector_search.filters.constraints import Parser
+
+
+@dataclass(frozen=True)
+class FilterSpec:
+    """
+    Metadata constraints on the documents a vector search may return: ticker symbols, asset classes and a
+    publication date range. Empty fields do not constrain anything.
+
+    A spec is compiled per target into a `$vectorSearch.filter` document (see `compile`), using the document
+    fields declared for the target in `FilterArgs`; constraints on fields a target does not declare are
+    dropped for that target.
+    """
+    symbols: Tuple[str, ...] = ()
+    asset_classes: Tuple[str, ...] = ()
+    date_from: Optional[datetime] = None
+    date_to: Optional[datetime] = None
+
+    def __post_init__(self):
+        object.__setattr__(self, "symbols", tuple(sorted({symbol.upper() for symbol in self.symbols})))
+        object.__setattr__(self, "asset_classes", tuple(sorted({kind.lower() for kind in self.asset_classes})))
+
+    def __bool__(self) -> bool:
+        return bool(self.symbols or self.asset_classes or self.date_from or self.date_to)
+
+    def updated(self, other: Optional["FilterSpec"]) -> "FilterSpec":
+        """Returns this spec with the fields set in `other` replacing its own."""
+        if not other:
+            return self
+        return replace(
+            self,
+            symbols=other.symbols or self.symbols,
+            asset_classes=other.asset_classes or self.asset_classes,
+            date_from=other.date_from or self.date_from,
+            date_to=other.date_to or self.date_to,
+        )
+
+    def compile(self, fields: Mapping[str, Any]) -> Optional[Dict[str, Any]]:
+        """
+        Builds the `$vectorSearch.filter` document of this spec.
+
+        Args:
+            fields (Mapping[str, Any]): The target's document fields, as in `FilterArgs`.
+
+        Returns:
+            Optional[Dict[str, Any]]: The MQL filter, or None if nothing constrains the target.
+        """
+        clauses = []
+        if self.symbols and fields.get("symbols"):
+            clauses.append({fields["symbols"]: {"$in": list(self.symbols)}})
+        if self.asset_classes and fields.get("asset_class"):
+            clauses.append({fields["asset_class"]: {"$in": list(self.asset_classes)}})
+        if (self.date_from or self.date_to) and fields.get("date"):
+            bounds = {}
+            if self.date_from:
+                bounds["$gte"] = self.date_from
+            if self.date_to:
+                bounds["$lte"] = self.date_to
+            clauses.append({fields["date"]: bounds})
+        if not clauses:
+            return None
+        return clauses[0] if len(clauses) == 1 else {"$and": clauses}
+
+
+def target_prefilters(
+    targets: Iterable[Mapping[str, Any]],
+    filters: Union[FilterSpec, Mapping[str, FilterSpec], None] = None,
+    extracted: Optional[FilterSpec] = None
+) -> Dict[str, Dict[str, Any]]:
+    """
+    Compiles the pre-filter of every target that has one.
+
+    Args:
+        targets (Iterable[Mapping[str, Any]]): The target configurations.
+        filters (Union[FilterSpec, Mapping[str, FilterSpec], None], optional): One spec for every target, or
+            specs by collection name.
+        extracted (Optional[FilterSpec], optional): A spec derived from the query (see `extract_filter_spec`),
+            whose fields are overridden by those of `filters`.
+
+    Returns:
+        Dict[str, Dict[str, Any]]: The `$vectorSearch.filter` of each pre-filtered target, by collection name.
+    """
+    prefilters = {}
+    for target in targets:
+        args = target_settings(FilterArgs, target)
+        if args is None or args.get("strategy") is not SearchStrategy.FILTER:
+            continue
+        spec = filters.get(target["collection_name"]) if isinstance(filters, Mapping) else filters
+        compiled = (extracted or FilterSpec()).updated(spec).compile(args)
+        if compiled:
+            prefilters[target["collection_name"]] = compiled
+    return prefilters
+
+
+CASHTAG = re.compile(r"\$([A-Za-z]{1,6})\b")
+TICKER = re.compile(r"\b[A-Z]{2,5}\b")
+
+# Upper-case words that are not tickers.
+COMMON_ACRONYMS = frozenset({
+    "AI", "CEO", "CFO", "CTO", "EPS", "ETF", "EU", "FED", "GDP", "IPO", "IT", "OK", "PE",
+    "SEC", "UK", "UN", "US", "USA", "YOY", "YTD",
+})
+
+# Query terms naming an asset class, mapped to the `asset_class` values of the collections.
+ASSET_CLASS_TERMS: Dict[str, str] = {
+    "stock": "equity", "stocks": "equity", "share": "equity", "shares": "equity", "equity": "equity", "equities": "equity",
+    "forex": "forex", "fx": "forex", "currency": "forex", "currencies": "forex",
+    "crypto": "crypto", "cryptos": "crypto", "cryptocurrency": "crypto", "cryptocurrencies": "crypto",
+}
+
+_UNITS = {"day": timedelta(days=1), "week": timedelta(weeks=1), "month": timedelta(days=30), "year": timedelta(days=365)}
+_RELATIVE = re.compile(r"\b(?:last|past)\s+(\d+\s+)?(day|week|month|year)s?\b", re.IGNORECASE)
+_CURRENT = re.compile(r"\b(?:this|current)\s+(week|month|year)\b", re.IGNORECASE)
+_SINCE = re.compile(r"\b(?:since|after|from)\s+(\d{4}-\d{2}-\d{2})\b", re.IGNORECASE)
+_UNTIL = re.compile(r"\b(?:before|until|till|to)\s+(\d{4}-\d{2}-\d{2})\b", re.IGNORECASE)
+_YEAR = re.compile(r"\bin\s+((?:19|20)\d{2})\b", re.IGNORECASE)
+
+
+def _date(text: str) -> datetime:
+    return datetime.strptime(text, "%Y-%m-%d").replace(tzinfo=timezone.utc)
+
+
+def extract_dates(query: str, now: Optional[datetime] = None) -> Tuple[Optional[datetime], Optional[datetime]]:
+    """
+    Returns the `(from, to)` date range a query refers to, e.g. "today", "last 3 days", "this month",
+    "since 2024-01-01" or "in 2023", as UTC datetimes (None where open).
+    """
+    now = now or datetime.now(timezone.utc)
+    today = now.replace(hour=0, minute=0, second=0, microsecond=0)
+    date_from = date_to = None
+
+    if re.search(r"\btoday\b", query, re.IGNORECASE):
+        date_from = today
+    elif re.search(r"\byesterday\b", query, re.IGNORECASE):
+        date_from, date_to = today - timedelta(days=1), today
+    elif match := _RELATIVE.search(query):
+        date_from = now - int(match.group(1) or 1) * _UNITS[match.group(2).lower()]
+    elif match := _CURRENT.search(query):
+        unit = match.group(1).lower()
+        if unit == "week":
+            date_from = today - timedelta(days=today.weekday())
+        elif unit == "month":
+            date_from = today.replace(day=1)
+        else:
+            date_from = today.replace(month=1, day=1)
+    elif match := _YEAR.search(query):
+        year = int(match.group(1))
+        date_from = datetime(year, 1, 1, tzinfo=timezone.utc)
+        date_to = datetime(year + 1, 1, 1, tzinfo=timezone.utc) - timedelta(microseconds=1)
+
+    if match := _SINCE.search(query):
+        date_from = _date(match.group(1))
+    if match := _UNTIL.search(query):
+        date_to = _date(match.group(1))
+    return date_from, date_to
+
+
+def extract_filter_spec(query: str, parser: Optional["Parser"] = None, now: Optional[datetime] = None) -> FilterSpec:
+    """
+    Derives a `FilterSpec` from a query: cashtags ("$AAPL") and upper-case tickers ("AAPL") as symbols,
+    asset class terms ("crypto", "stocks") and date expressions (see `extract_dates`).
+
+    With a `parser`, upper-case words and asset class terms only count when they are among the query's
+    keywords (nouns), which rules out most acronyms used as other parts of speech. Without it, or when the
+    NLTK data it needs is missing, every word is considered.
+    """
+    symbols = {symbol.upper() for symbol in CASHTAG.findall(query)}
+    tickers = {word for word in TICKER.findall(query) if word not in COMMON_ACRONYMS}
+    words: List[str] = re.findall(r"[A-Za-z]+", query)
+
+    if parser is not None:
+        try:
+            nouns = parser.keywords(query)
+        except LookupError:
+            nouns = None
+        if nouns is not None:
+            tickers &= set(nouns)
+            words = nouns
+
+    date_from, date_to = extract_dates(query, now)
+    return FilterSpec(
+        symbols=tuple(symbols | tickers),
+        asset_classes=tuple({ASSET_CLASS_TERMS[word.lower()] for word in words if word.lower() in ASSET_CLASS_TERMS}),
+        date_from=date_from,
+        date_to=date_to,
+    )
+
+
+def _field(document: Mapping[str, Any], path: str) -> Any:
+    value: Any = document
+    for part in path.split("."):
+        if not isinstance(value, Mapping):
+            return None
+        value = value.get(part)
+    return value
+
+
+def _comparable(value: Any) -> Any:
+    # Naive datetimes are UTC, as BSON dates are.
+    if isinstance(value, datetime) and value.tzinfo is None:
+        return value.replace(tzinfo=timezone.utc)
+    return value
+
+
+def _test(operator: str, value: Any, argument: Any) -> bool:
+    if operator == "$ne":
+        return not _test("$eq", value, argument)
+    if operator == "$nin":
+        return not _test("$in", value, argument)
+    if operator == "$not":
+        return not _matches_value(value, argument)
+
+    # As in MQL, an array matches when it or one of its elements does.
+    if operator == "$eq" and isinstance(value, list) and value == argument:
+        return True
+    candidates = value if isinstance(value, list) else [value]
+    for candidate in candidates:
+        candidate = _comparable(candidate)
+        try:
+            if operator == "$eq" and candidate == _comparable(argument):
+                return True
+            if operator == "$in" and any(candidate == _comparable(option) for option in argument):
+                return True
+            if candidate is None:
+                continue
+            if operator == "$gt" and candidate > _comparable(argument):
+                return True
+            if operator == "$gte" and candidate >= _comparable(argument):
+                return True
+            if operator == "$lt" and candidate < _comparable(argument):
+                return True
+            if operator == "$lte" and candidate <= _comparable(argument):
+                return True
+        except TypeError:
+            continue  # values of different types never compare
+    if operator not in ("$eq", "$in", "$gt", "$gte", "$lt", "$lte"):
+        raise ValueError(f"Unsupported filter operator {operator}.")
+    return False
+
+
+def _matches_value(value: Any, condition: Any) -> bool:
+    if isinstance(condition, Mapping) and condition and all(key.startswith("$") for key in condition):
+        return all(_test(operator, value, argument) for operator, argument in condition.items())
+    return _test("$eq", value, condition)
+
+
+def match_filter(document: Mapping[str, Any], prefilter: Mapping[str, Any]) -> bool:
+    """
+    Evaluates a `$vectorSearch.filter` document against a document, for backends that search in-process.
+    Supports the operators Atlas accepts there: `$eq`, `$ne`, `$gt`, `$gte`, `$lt`, `$lte`, `$in`, `$nin`,
+    `$not`, `$and`, `$or` and `$nor`.
+    """
+    for key, condition in prefilter.items():
+        if key == "$and":
+            if not all(match_filter(document, clause) for clause in condition):
+                return False
+        elif key == "$or":
+            if not any(match_filter(document, clause) for clause in condition):
+                return False
+        elif key == "$nor":
+            if any(match_filter(document, clause) for clause in condition):
+                return False
+        elif key.startswith("$"):
+            raise ValueError(f"Unsupported filter operator {key}.")
+        elif not _matches_value(_field(document, key), condition):
+            return False
+    return True
@@ -1,7 +1,19 @@
 import os
-import dotenv
 
-dotenv.load_dotenv(dotenv_path=".env")
+_env_loaded = False
+
+def load_env(dotenv_path: str = ".env", override: bool = False) -> bool:
+    """
+    Loads `dotenv_path` into the environment. Called by the first `get_env`, so that importing the package
+    neither reads files nor imports dotenv; call it explicitly to load another file or to reload.
+    """
+    global _env_loaded
+    import dotenv
+
+    _env_loaded = True
+    return dotenv.load_dotenv(dotenv_path=dotenv_path, override=override)
 
 def get_env(key: str, default: str = None) -> str:
+    if not _env_loaded:
+        load_env()
     return os.getenv(key, default)
@@ -1,23 +1,48 @@
+import atexit
+import queue
 import logging
-from typing import Any
+import logging.handlers
+import threading
+from typing import Any, Dict, List
 from pathlib import Path
 
 class Logger(object):
-    def __init__(self, name: str = None):
+    # One background writer per logger name: records are formatted and written off the caller's thread.
+    _listeners: Dict[str, logging.handlers.QueueListener] = {}
+    _start_lock = threading.Lock()
+
+    def __init__(self, name: str = None, level: int = logging.DEBUG):
         self.name = name
         self.logger = logging.getLogger(name)
-        self.logger.setLevel(logging.DEBUG)
+        self.logger.setLevel(level)
         self.formatter = logging.Formatter('%(asctime)s - %(name)s - %(levelname)s - %(message)s')
-        
-        # Ensure handlers are not duplicated
-        if not self.logger.hasHandlers():
-            self._add_console_handler()
-            self._add_file_handler()
+        self.handlers: List[logging.Handler] = []
+        # Handlers, the log file and the writer thread are only created by `start`, so that importing a
+        # module that declares a logger has no side effect.
+        self.started = False
+        self._refresh_enabled()
+
+    def start(self):
+        """
+        Creates the console and file handlers and starts the background writer, unless the logger (or one of
+        its ancestors) already has handlers. Called by the first record; idempotent.
+        """
+        if self.started:
+            return
+        with self._start_lock:
+            if self.started:
+                return
+            # Ensure handlers are not duplicated
+            if not self.logger.hasHandlers():
+                self._add_console_handler()
+                self._add_file_handler()
+                self._start_listener()
+            self.started = True
 
     def _add_console_handler(self):
         console_handler = logging.StreamHandler()
         console_handler.setFormatter(self.formatter)
-        self.logger.addHandler(console_handler)
+        self.handlers.append(console_handler)
 
     def _add_file_handler(self):
         log_dir = Path(r"logs")
@@ -25,16 +50,43 @@ class Logger(object):
         log_file_path = log_dir / f"{self.name}.log"
         file_handler = logging.FileHandler(log_file_path)
         file_handler.setFormatter(self.formatter)
-        self.logger.addHandler(file_handler)
+        self.handlers.append(file_handler)
+
+    def _start_listener(self):
+        # The logger only enqueues records; a listener thread drains the queue into the real handlers.
+        log_queue = queue.SimpleQueue()
+        self.logger.addHandler(logging.handlers.QueueHandler(log_queue))
+        listener = logging.handlers.QueueListener(log_queue, *self.handlers, respect_handler_level=True)
+        listener.start()
+        atexit.register(listener.stop)  # flush pending records on exit
+        self._listeners[self.name] = listener
+
+    def _refresh_enabled(self):
+        # Plain flags, so that level-gated timers cost a dict lookup when their level is disabled.
+        self.enabled = {
+            level: self.logger.isEnabledFor(getattr(logging, level.upper()))
+            for level in ("debug", "info", "warning", "error", "critical")
+        }
+
+    def set_level(self, level: int | str):
+        """Changes the logger's level. Prefer this to the underlying logger's `setLevel` so that
+        level-gated timers see the change."""
+        self.logger.setLevel(level)
+        self._refresh_enabled()
+
+    def is_enabled(self, level: str) -> bool:
+        return self.enabled.get(level.lower(), False)
 
     def get_logger(self):
+        self.start()
         return self.logger
-    
+
     def log(self, level: str, message: str, error: Any = None, params: Any = None):
         if error:
             message = f"{message} | Error: {error}"
         if params:
             message = f"{message} | Params: {params}"
+        self.start()
 
         log_method = getattr(self.logger, level.lower(), None)
         if callable(log_method):
@@ -45,13 +97,55 @@ class Logger(object):
 
 
 import time
+import itertools
 from functools import wraps
 
+# Timers without a logger report here, at debug level: silent unless the application configures it.
+_fallback_logger = logging.getLogger("vector_search.timers")
+
+
+def _enabled(logger, level: str) -> bool:
+    if logger is not None:
+        return logger.enabled.get(level, False)
+    return _fallback_logger.isEnabledFor(logging.DEBUG)
+
+
+# One call counter per decorated function, shared by the wrappers of a function decorated on every call
+# (such as a nested one), so that its sampling still spans calls.
+_call_counters: Dict[str, "itertools.count"] = {}
+
+
+def _call_counter(func) -> "itertools.count":
+    return _call_counters.setdefault(f"{func.__module__}.{func.__qualname__}", itertools.count())
+
+
+def _sampling_period(sample_rate: float) -> int:
+    if not 0 < sample_rate <= 1:
+        raise ValueError(f"sample_rate must be in (0, 1], got {sample_rate}")
+    return max(1, round(1 / sample_rate))
+
+
 # Define the timer decorator that accepts a logger
-def timer(logger=None):
+def timer(logger=None, level: str = "info", sample_rate: float = 1.0):
+    """
+    Logs the runtime of the decorated function.
+
+    Args:
+        logger (Logger, optional): The logger to report to. Without one, runtimes go to the
+            "vector_search.timers" logger at debug level.
+        level (str, optional): The level to log at. When it is disabled the function is called untimed.
+        sample_rate (float, optional): The fraction of calls that are logged at this call site.
+    """
+    every = _sampling_period(sample_rate)
+    level = level.lower()
+
     def decorator(func):
+        calls = _call_counter(func)
+
         @wraps(func)
         def wrapper(*args, **kwargs):
+            if not _enabled(logger, level) or (every > 1 and next(calls) % every):
+                return func(*args, **kwargs)
             start_time = time.time()  # Record the start time
             result = func(*args, **kwargs)  # Call the function
             end_time = time.time()  # Record the end time
@@ -59,23 +153,29 @@ def timer(logger=None):
 
             # Log the execution time using the provided logger
             if logger:
-                logger.log("info", f"> Function(s): '[{func.__name__}]'. Runtime: [<OK> in {execution_time:.4f} seconds]. Mode [Sync]. Environment: [{func.__module__}].")
+                logger.log(level, f"> Function(s): '[{func.__name__}]'. Runtime: [<OK> in {execution_time:.4f} seconds]. Mode [Sync]. Environment: [{func.__module__}].")
             else:
-                print("No logger provided. Execution time will not be logged.")
-                print(f"Function '{func.__name__}' executed in {execution_time:.4f} seconds")
-            
+                _fallback_logger.debug(f"Function '{func.__name__}' executed in {execution_time:.4f} seconds")
+
             return result
         return wrapper
     return decorator
 
-# Set up a custom logger
-logging
 
+def async_timer(logger=None, level: str = "info", sample_rate: float = 1.0):
+    """
+    Logs the runtime of the decorated coroutine function. See `timer` for the arguments.
+    """
+    every = _sampling_period(sample_rate)
+    level = level.lower()
 
-def async_timer(logger=None):
     def decorator(func):
+        calls = _call_counter(func)
+
         @wraps(func)
         async def wrapper(*args, **kwargs):
+            if not _enabled(logger, level) or (every > 1 and next(calls) % every):
+                return await func(*args, **kwargs)
             start_time = time.time()  # Record the start time
             result = await func(*args, **kwargs)  # Await the async function
             end_time = time.time()  # Record the end time
@@ -83,11 +183,10 @@ def async_timer(logger=None):
 
             # Log the execution time using the provided logger
             if logger:
-                logger.log("info", f"> Function(s): '[{func.__name__}]'. Runtime: [<OK> in {execution_time:.4f} seconds]. Mode [Async]. Environment: [{func.__module__}].")
+                logger.log(level, f"> Function(s): '[{func.__name__}]'. Runtime: [<OK> in {execution_time:.4f} seconds]. Mode [Async]. Environment: [{func.__module__}].")
             else:
-                print("No logger provided. Execution time will not be logged.")
-                print(f"Async function '{func.__name__}' executed in {execution_time:.4f} seconds")
-            
+                _fallback_logger.debug(f"Async function '{func.__name__}' executed in {execution_time:.4f} seconds")
+
             return result
         return wrapper
-    return decorator
\ No newline at end of file
+    return decorator
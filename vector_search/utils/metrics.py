@@ -0,0 +1,270 @@
+import time
+import bisect
+import threading
+from contextlib import contextmanager
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Callable, Dict, Iterator, List, Optional, Sequence, Tuple
+
+# Latency buckets, in seconds, covering in-process work (sub-millisecond) up to slow network calls.
+DEFAULT_BUCKETS: Tuple[float, ...] = (
+    0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0
+)
+
+LabelValues = Tuple[str, ...]
+
+
+def _format_labels(names: Sequence[str], values: Sequence[str], extra: Optional[Tuple[str, str]] = None) -> str:
+    pairs = list(zip(names, values))
+    if extra:
+        pairs.append(extra)
+    if not pairs:
+        return ""
+    escaped = (str(v).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"') for _, v in pairs)
+    return "{" + ",".join(f'{k}="{v}"' for (k, _), v in zip(pairs, escaped)) + "}"
+
+
+def _format_value(value: float) -> str:
+    if value == float("inf"):
+        return "+Inf"
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+
+class _Metric:
+    kind = ""
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = ()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._lock = threading.Lock()
+
+    def _key(self, labels: Dict[str, str]) -> LabelValues:
+        if set(labels) != set(self.labelnames):
+            raise ValueError(f"{self.name} expects labels {self.labelnames}, got {tuple(labels)}")
+        return tuple(str(labels[name]) for name in self.labelnames)
+
+    def header(self) -> List[str]:
+        return [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} {self.kind}"]
+
+
+class Counter(_Metric):
+    """
+    A monotonically increasing count, e.g. cache hits or retries.
+    """
+    kind = "counter"
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = ()):
+        super().__init__(name, documentation, labelnames)
+        self._values: Dict[LabelValues, float] = {}
+
+    def inc(self, amount: float = 1, **labels: str):
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+    def value(self, **labels: str) -> float:
+        return self._values.get(self._key(labels), 0)
+
+    def render(self) -> List[str]:
+        with self._lock:
+            values = dict(self._values)
+        return self.header() + [
+            f"{self.name}{_format_labels(self.labelnames, key)} {_format_value(value)}" for key, value in values.items()
+        ]
+
+
+class CallbackCounter(_Metric):
+    """
+    A counter whose values are read from `callback` at render time, e.g. counts kept by a cache.
+    The callback returns a mapping from label values to the current count.
+    """
+    kind = "counter"
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str], callback: Callable[[], Dict[LabelValues, float]]):
+        super().__init__(name, documentation, labelnames)
+        self.callback = callback
+
+    def render(self) -> List[str]:
+        return self.header() + [
+            f"{self.name}{_format_labels(self.labelnames, key)} {_format_value(value)}" for key, value in self.callback().items()
+        ]
+
+
+class CallbackGauge(CallbackCounter):
+    """
+    A value that can go up and down, read from `callback` at render time, e.g. a tuned parameter.
+    """
+    kind = "gauge"
+
+
+class Histogram(_Metric):
+    """
+    A distribution of observed values (typically latencies in seconds) over fixed buckets.
+    """
+    kind = "histogram"
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = (), buckets: Sequence[float] = DEFAULT_BUCKETS):
+        super().__init__(name, documentation, labelnames)
+        self.buckets = tuple(sorted(buckets)) + (float("inf"),)
+        # Per label set: [bucket counts..., sum]
+        self._values: Dict[LabelValues, List[float]] = {}
+        # Per label set: every observed value, only while `keep_samples` is on.
+        self._samples: Optional[Dict[LabelValues, List[float]]] = None
+
+    def observe(self, value: float, **labels: str):
+        key = self._key(labels)
+        index = bisect.bisect_left(self.buckets, value)
+        with self._lock:
+            counts = self._values.get(key)
+            if counts is None:
+                counts = self._values[key] = [0] * len(self.buckets) + [0.0]
+            counts[index] += 1
+            counts[-1] += value
+            if self._samples is not None:
+                self._samples.setdefault(key, []).append(value)
+
+    def keep_samples(self, enabled: bool = True):
+        """
+        Starts (or stops) keeping every observed value, for exact quantiles over a bounded run such as a
+        benchmark: `quantile` only interpolates within buckets, and can exceed the largest value observed.
+        """
+        with self._lock:
+            self._samples = {} if enabled else None
+
+    def samples(self, **labels: str) -> List[float]:
+        """Returns the values observed since `keep_samples` was turned on (none if it is off)."""
+        key = self._key(labels)
+        with self._lock:
+            return list(self._samples.get(key, [])) if self._samples is not None else []
+
+    @contextmanager
+    def time(self, **labels: str) -> Iterator[None]:
+        """Observes the time spent in the `with` block."""
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(time.perf_counter() - start, **labels)
+
+    def count(self, **labels: str) -> int:
+        counts = self._values.get(self._key(labels))
+        return int(sum(counts[:-1])) if counts else 0
+
+    def quantile(self, q: float, **labels: str) -> Optional[float]:
+        """
+        Estimates the `q` quantile (e.g. 0.99) by linear interpolation within buckets, like PromQL's
+        `histogram_quantile`. Returns None before any observation.
+        """
+        with self._lock:
+            counts = list(self._values.get(self._key(labels), []))[:-1]
+        total = sum(counts)
+        if not total:
+            return None
+
+        rank = q * total
+        cumulative = 0
+        for i, count in enumerate(counts):
+            if cumulative + count >= rank and count:
+                upper = self.buckets[i]
+                lower = self.buckets[i - 1] if i > 0 else 0.0
+                if upper == float("inf"):
+                    return lower
+                return lower + (upper - lower) * (rank - cumulative) / count
+            cumulative += count
+        return self.buckets[-2]
+
+    def render(self) -> List[str]:
+        with self._lock:
+            values = {key: list(counts) for key, counts in self._values.items()}
+        lines = self.header()
+        for key, counts in values.items():
+            cumulative = 0
+            for bound, count in zip(self.buckets, counts[:-1]):
+                cumulative += count
+                lines.append(f"{self.name}_bucket{_format_labels(self.labelnames, key, ('le', _format_value(bound)))} {cumulative}")
+            lines.append(f"{self.name}_sum{_format_labels(self.labelnames, key)} {_format_value(counts[-1])}")
+            lines.append(f"{self.name}_count{_format_labels(self.labelnames, key)} {cumulative}")
+        return lines
+
+
+class MetricsRegistry:
+    """
+    An in-process registry of metrics, rendered in the Prometheus text exposition format.
+    """
+    def __init__(self):
+        self._metrics: Dict[str, _Metric] = {}
+        self._lock = threading.Lock()
+
+    def _register(self, metric: _Metric) -> _Metric:
+        with self._lock:
+            existing = self._metrics.get(metric.name)
+            if existing is not None:
+                if type(existing) is not type(metric):
+                    raise ValueError(f"Metric {metric.name} is already registered as a {existing.kind}.")
+                return existing
+            self._metrics[metric.name] = metric
+            return metric
+
+    def counter(self, name: str, documentation: str, labelnames: Sequence[str] = ()) -> Counter:
+        return self._register(Counter(name, documentation, labelnames))
+
+    def callback_counter(self, name: str, documentation: str, labelnames: Sequence[str], callback: Callable[[], Dict[LabelValues, float]]) -> CallbackCounter:
+        return self._register(CallbackCounter(name, documentation, labelnames, callback))
+
+    def callback_gauge(self, name: str, documentation: str, labelnames: Sequence[str], callback: Callable[[], Dict[LabelValues, float]]) -> CallbackGauge:
+        return self._register(CallbackGauge(name, documentation, labelnames, callback))
+
+    def histogram(self, name: str, documentation: str, labelnames: Sequence[str] = (), buckets: Sequence[float] = DEFAULT_BUCKETS) -> Histogram:
+        return self._register(Histogram(name, documentation, labelnames, buckets))
+
+    def render(self) -> str:
+        with self._lock:
+            metrics = list(self._metrics.values())
+        return "\n".join(line for metric in metrics for line in metric.render()) + "\n"
+
+    def serve(self, port: int = 9464, host: str = "127.0.0.1") -> ThreadingHTTPServer:
+        """
+        Serves `render()` over HTTP (any path) from a daemon thread. Call `shutdown()` on the result to stop.
+        """
+        registry = self
+
+        class MetricsHandler(BaseHTTPRequestHandler):
+            def do_GET(self):
+                body = registry.render().encode("utf-8")
+                self.send_response(200)
+                self.send_header("Content-Type", "text/plain; version=0.0.4; charset=utf-8")
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, format, *args):
+                pass  # scrapes are not worth a log line
+
+        server = ThreadingHTTPServer((host, port), MetricsHandler)
+        threading.Thread(target=server.serve_forever, name="metrics-http", daemon=True).start()
+        return server
+
+
+registry = MetricsRegistry()
+
+STAGE_SECONDS = registry.histogram(
+    "vector_search_stage_seconds", "Time spent in each stage of a search.", ["stage"]
+)
+TARGET_SECONDS = registry.histogram(
+    "vector_search_target_seconds", "Time spent in completed searches of one target collection.", ["collection"]
+)
+RETRIES = registry.counter(
+    "vector_search_retries_total", "Searches retried after a connection error or timeout.", ["scope"]
+)
+RESULTS_ABOVE_THRESHOLD = registry.counter(
+    "vector_search_results_above_threshold_total", "Results kept after filtering on the similarity threshold.", ["collection"]
+)
+HEDGES = registry.counter(
+    "vector_search_hedged_requests_total", "Duplicate searches sent to a target slower than its usual latency.", ["collection"]
+)
+TARGET_FAILURES = registry.counter(
+    "vector_search_target_failures_total", "Target searches given up on (errors or deadline), leaving partial results.", ["collection"]
+)
+ROUTED_TARGETS = registry.counter(
+    "vector_search_routed_targets_total", "Targets searched or skipped for a query by the target router.", ["collection", "decision"]
+)